@@ -0,0 +1,5 @@
+from agent.registry import get_chain, get_memory
+
+
+def analytics_agent(user_id:str):
+    return get_chain("analytics"), get_memory(user_id)
@@ -0,0 +1,5 @@
+from agent.registry import get_chain, get_memory
+
+
+def predictive_availability_agent(user_id:str):
+    return get_chain("predictive_availability"), get_memory(user_id)
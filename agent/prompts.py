@@ -46,10 +46,12 @@ def build_search_hotels_prompt() -> PromptTemplate:
         template=(
             "You're a hotel search assistant helping guests find their perfect stay.\n\n"
             "Our conversation so far:\n{history}\n\n"
-            "Available hotels (already filtered by location):\n{data}\n\n"
+            "Matching hotels (already filtered to the request, one page at a time):\n{data}\n\n"
             "How to help:\n"
             "• Understand what we've been discussing from our conversation\n"
             "• Help filter further by price, room type, amenities, etc.\n"
+            "• If 'relaxed' is true, say no exact match was found and these are the closest options\n"
+            "• Mention 'total_matches' and offer the next page when there are more pages\n"
             "• Handle range requests like 'under $150' or 'between $100-200'\n"
             "• Give clear, organized results\n\n"
             "Guest's search request: {question}\n"
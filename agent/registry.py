@@ -0,0 +1,94 @@
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.runnables import RunnablePassthrough
+from langchain_core.output_parsers import StrOutputParser
+from cachetools import TTLCache
+from agent.prompts import get_prompt_registry
+from agent.session_memory import WindowedSessionMemory
+from config.tracing import LLMMetricsCallback, record_cache
+from dotenv import load_dotenv
+import threading
+import redis
+import os
+load_dotenv()
+
+models = os.getenv("MODEL")
+api_key = os.getenv("API_KEY")
+redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# "fake" swaps Gemini for the deterministic local model in benchmarks/fake_llm.py
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+
+MEMORY_CACHE_SIZE = int(os.getenv("MEMORY_CACHE_SIZE", "1024"))
+MEMORY_CACHE_TTL_SEC = float(os.getenv("MEMORY_CACHE_TTL_SEC", "1800"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "32"))
+
+_lock = threading.Lock()
+_llm = None
+_redis_pool = None
+_prompts = None
+_chains = {}
+_memories = TTLCache(maxsize=MEMORY_CACHE_SIZE, ttl=MEMORY_CACHE_TTL_SEC)
+
+
+def get_llm():
+    global _llm
+    with _lock:
+        if _llm is None and LLM_BACKEND == "fake":
+            from benchmarks.fake_llm import FakeChatModel
+            _llm = FakeChatModel(callbacks=[LLMMetricsCallback("fake")])
+        elif _llm is None:
+            _llm = ChatGoogleGenerativeAI(model=models, google_api_key=api_key, temperature=0,
+                                          callbacks=[LLMMetricsCallback(models)])
+        return _llm
+
+
+def get_redis_client():
+    global _redis_pool
+    if redis_url.startswith("fakeredis://"):
+        # In-process Redis for benchmarks; each process gets its own
+        import fakeredis
+        with _lock:
+            if _redis_pool is None:
+                _redis_pool = fakeredis.FakeServer()
+        return fakeredis.FakeRedis(server=_redis_pool)
+    with _lock:
+        if _redis_pool is None:
+            _redis_pool = redis.ConnectionPool.from_url(redis_url, max_connections=REDIS_MAX_CONNECTIONS)
+    return redis.Redis(connection_pool=_redis_pool)
+
+
+def get_chain(name: str):
+    """Prompt | LLM | parser chain for a registry prompt, built once per process"""
+    global _prompts
+    chain = _chains.get(name)
+    if chain is not None:
+        return chain
+    llm = get_llm()
+    with _lock:
+        if _prompts is None:
+            _prompts = get_prompt_registry()
+        if name not in _chains:
+            _chains[name] = (
+                RunnablePassthrough()
+                | _prompts[name]
+                | llm
+                | StrOutputParser()
+            )
+        return _chains[name]
+
+
+def get_memory(user_id: str | None = None):
+    """Windowed conversation memory for a session, cached with LRU + TTL eviction"""
+    session_id = user_id or "default-session"
+    with _lock:
+        memory = _memories.get(session_id)
+    record_cache("memory", "hit" if memory is not None else "miss")
+    if memory is not None:
+        return memory
+    try:
+        redis_client = get_redis_client()
+        redis_client.ping()
+    except Exception:
+        redis_client = None
+    memory = WindowedSessionMemory(session_id, redis_client=redis_client)
+    with _lock:
+        return _memories.setdefault(session_id, memory)
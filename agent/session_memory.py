@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, message_to_dict, messages_from_dict
+from server.search_filter import count_tokens
+from config.concurrency import run_blocking
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("SESSION_HISTORY_TOKENS", "2000"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SESSION_SUMMARY_TOKENS", "400"))
+SUMMARY_LINE_WORDS = 30
+SESSION_TTL_SEC = int(os.getenv("SESSION_TTL_SEC", "0")) or None
+
+
+def compress(message) -> str:
+    """One summary line for a message: its role and the first few words"""
+    role = "User" if isinstance(message, HumanMessage) else "Assistant"
+    words = str(message.content).split()
+    text = " ".join(words[:SUMMARY_LINE_WORDS])
+    return f"{role}: {text}{' ...' if len(words) > SUMMARY_LINE_WORDS else ''}"
+
+
+def fold_into_summary(summary: str, messages: list, budget: int = SUMMARY_TOKEN_BUDGET) -> str:
+    """Append compressed messages to the summary, dropping its oldest lines past the budget"""
+    lines = [line for line in summary.splitlines() if line] + [compress(m) for m in messages]
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class WindowedSessionMemory:
+    """Conversation memory holding a token-budgeted window plus a rolling summary.
+
+    Redis keys for a session (``{prefix}{session_id}`` is the raw log, kept in
+    the RedisChatMessageHistory format for audit and replay):
+
+    - ``{prefix}{session_id}:window``: recent messages with their token counts
+    - ``{prefix}{session_id}:summary``: compressed lines for evicted turns
+
+    Loading reads only the window and the summary, so a turn costs
+    O(window) however long the session has been running. Whenever the
+    window goes over ``token_budget``, its oldest messages are folded into
+    the summary.
+    """
+
+    def __init__(self, session_id: str, redis_client=None, key_prefix: str = "message_store:",
+                 token_budget: int = HISTORY_TOKEN_BUDGET, summary_budget: int = SUMMARY_TOKEN_BUDGET,
+                 ttl: int | None = SESSION_TTL_SEC):
+        self.session_id = session_id
+        self.redis_client = redis_client
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.ttl = ttl
+        self.log_key = f"{key_prefix}{session_id}"
+        self.window_key = f"{self.log_key}:window"
+        self.summary_key = f"{self.log_key}:summary"
+        # Used when Redis is unavailable
+        self._window: list[str] = []
+        self._summary = ""
+        self._lock = threading.Lock()
+
+    @property
+    def memory_variables(self) -> list[str]:
+        return ["history"]
+
+    def _read(self) -> tuple[str, list[str]]:
+        if self.redis_client is None:
+            with self._lock:
+                return self._summary, list(self._window)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.get(self.summary_key)
+        pipe.lrange(self.window_key, 0, -1)
+        summary, window = pipe.execute()
+        summary = summary.decode("utf-8") if isinstance(summary, bytes) else (summary or "")
+        return summary, [w.decode("utf-8") if isinstance(w, bytes) else w for w in window]
+
+    def messages(self) -> list:
+        summary, window = self._read()
+        messages = messages_from_dict([json.loads(entry)["message"] for entry in window])
+        if summary:
+            messages.insert(0, SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+        return messages
+
+    def load_memory_variables(self, inputs: dict) -> dict:
+        return {"history": self.messages()}
+
+    async def aload_memory_variables(self, inputs: dict) -> dict:
+        """``load_memory_variables`` with the Redis round trip off the event loop"""
+        if self.redis_client is None:
+            return self.load_memory_variables(inputs)
+        return await run_blocking(self.load_memory_variables, inputs)
+
+    def _trim(self, summary: str, window: list[str]) -> tuple[str, int]:
+        """New summary and how many entries to drop from the front of the window"""
+        tokens = [json.loads(entry)["tokens"] for entry in window]
+        total = sum(tokens)
+        drop = 0
+        while drop < len(window) - 2 and total > self.token_budget:
+            total -= tokens[drop]
+            drop += 1
+        if not drop:
+            return summary, 0
+        evicted = messages_from_dict([json.loads(entry)["message"] for entry in window[:drop]])
+        return fold_into_summary(summary, evicted, self.summary_budget), drop
+
+    def save_context(self, inputs: dict, outputs: dict):
+        new = [HumanMessage(content=str(inputs.get("input", ""))), AIMessage(content=str(outputs.get("output", "")))]
+        entries = [json.dumps({"tokens": count_tokens(str(m.content)), "message": message_to_dict(m)}) for m in new]
+
+        if self.redis_client is None:
+            with self._lock:
+                self._window.extend(entries)
+                self._summary, drop = self._trim(self._summary, self._window)
+                del self._window[:drop]
+            return
+
+        pipe = self.redis_client.pipeline()
+        pipe.lpush(self.log_key, *(json.dumps(message_to_dict(m)) for m in new))
+        pipe.rpush(self.window_key, *entries)
+        if self.ttl:
+            for key in (self.log_key, self.window_key, self.summary_key):
+                pipe.expire(key, self.ttl)
+        pipe.execute()
+
+        def fold(pipe):
+            summary, window = pipe.get(self.summary_key), pipe.lrange(self.window_key, 0, -1)
+            summary = summary.decode("utf-8") if isinstance(summary, bytes) else (summary or "")
+            window = [w.decode("utf-8") if isinstance(w, bytes) else w for w in window]
+            new_summary, drop = self._trim(summary, window)
+            if drop:
+                pipe.multi()
+                pipe.set(self.summary_key, new_summary, ex=self.ttl)
+                pipe.ltrim(self.window_key, drop, -1)
+
+        # Folding is optimistic: retried if another worker saved to the session meanwhile
+        self.redis_client.transaction(fold, self.window_key)
+
+    async def asave_context(self, inputs: dict, outputs: dict):
+        if self.redis_client is None:
+            return self.save_context(inputs, outputs)
+        await run_blocking(self.save_context, inputs, outputs)
+
+    def clear(self):
+        if self.redis_client is None:
+            with self._lock:
+                self._window.clear()
+                self._summary = ""
+            return
+        self.redis_client.delete(self.log_key, self.window_key, self.summary_key)
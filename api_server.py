@@ -2,19 +2,44 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 import asyncio
+from collections import deque
 import json
 import logging
 import subprocess
 import sys
 from pathlib import Path
+from contextlib import asynccontextmanager
 import os
+import uuid
+
+from chat_engine import ChatEngine
+from config.concurrency import LoopLagMonitor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="HotelHive Chat API")
+engine = ChatEngine()
+loop_monitor = LoopLagMonitor("api-server")
+
+# Seconds a single websocket send may take before the client is treated as gone
+WS_SEND_TIMEOUT_SEC = float(os.getenv("WS_SEND_TIMEOUT_SEC", "10"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_monitor.start()
+    try:
+        await engine.start()
+    except Exception as e:
+        logger.error(f"Chat engine unavailable, falling back to client subprocess: {e}")
+    yield
+    await engine.stop()
+    await loop_monitor.stop()
+
+
+app = FastAPI(title="HotelHive Chat API", lifespan=lifespan)
 
 
 app.add_middleware(
@@ -46,7 +71,81 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
-async def run_client_with_input(user_input: str) -> str:
+
+class StreamSender:
+    """Relays frames to one websocket without letting a slow client stall the agent.
+
+    The agent side only calls ``push``, which never blocks. A ``delta`` that
+    arrives while the previous one is still waiting to be sent is merged into
+    it, so a slow reader gets fewer, larger frames and the buffer only grows
+    with the handful of tool frames. A send that takes longer than
+    ``WS_SEND_TIMEOUT_SEC`` closes the stream.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.pending: deque[dict] = deque()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.coalesced = 0
+        self._task = asyncio.create_task(self._run())
+
+    def push(self, frame: dict):
+        if self.closed:
+            return
+        last = self.pending[-1] if self.pending else None
+        if frame["type"] == "delta" and last is not None and last["type"] == "delta":
+            last["content"] += frame["content"]
+            self.coalesced += 1
+        else:
+            self.pending.append(frame)
+        self.ready.set()
+
+    async def _run(self):
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.pending:
+                    frame = self.pending.popleft()
+                    if frame is None:
+                        return
+                    await asyncio.wait_for(self.websocket.send_json(frame), WS_SEND_TIMEOUT_SEC)
+        except Exception as e:
+            logger.warning(f"Dropping stream to slow or closed client: {e}")
+            self.closed = True
+            self.pending.clear()
+
+    async def close(self):
+        """Flush what is buffered and wait for the sender to finish"""
+        if not self.closed:
+            self.pending.append(None)
+            self.ready.set()
+        await self._task
+        if self.coalesced:
+            logger.info(f"Merged {self.coalesced} delta frames for a slow client")
+
+
+async def stream_response(user_input: str, session_id: str, websocket: WebSocket):
+    """Stream delta and tool frames from the engine, ending with the full message"""
+    sender = StreamSender(websocket)
+    sender.push({"type": "typing", "isTyping": True})
+    try:
+        async for frame in engine.stream_message(user_input, session_id):
+            if frame["type"] == "message":
+                frame["sender"] = "bot"
+            sender.push(frame)
+    except Exception as e:
+        logger.error(f"Error streaming message: {e}")
+        sender.push({
+            "type": "message",
+            "content": "Sorry, I encountered an error processing your request.",
+            "sender": "bot"
+        })
+    sender.push({"type": "typing", "isTyping": False})
+    await sender.close()
+
+async def run_client_with_input(user_input: str, session_id: str) -> str:
     """Run the client.py with the given input and capture the output"""
     try:
         input_file = "temp_input.txt"
@@ -59,6 +158,7 @@ async def run_client_with_input(user_input: str) -> str:
         input=f"{user_input}\nexit\n", 
         text=True, 
         capture_output=True,
+        env={**os.environ, "CHAT_SESSION_ID": session_id},
         timeout=30)
         
         output_lines = result.stdout.split('\n')
@@ -86,6 +186,16 @@ async def run_client_with_input(user_input: str) -> str:
         logger.error(f"Error running client: {e}")
         return f"Error processing your request: {str(e)}"
 
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+async def get_response(user_input: str, session_id: str) -> str:
+    """Answer from the in-process engine, or the client subprocess if it is down"""
+    if engine.is_ready:
+        return await engine.process_message(user_input, session_id)
+    return await run_client_with_input(user_input, session_id)
+
 @app.get("/")
 async def read_root():
     return FileResponse("static/index.html")
@@ -93,6 +203,9 @@ async def read_root():
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
+    # Each connection is its own conversation; the page passes its id back to resume after a reconnect
+    session_id = websocket.query_params.get("session_id") or new_session_id()
+    await websocket.send_json({"type": "session", "sessionId": session_id})
     try:
         while True:
             data = await websocket.receive_text()
@@ -101,6 +214,10 @@ async def websocket_endpoint(websocket: WebSocket):
             if message_data["type"] == "message":
                 user_message = message_data["content"]
                 
+                if engine.is_ready:
+                    await stream_response(user_message, session_id, websocket)
+                    continue
+                
                 await websocket.send_json({
                     "type": "typing",
                     "isTyping": True
@@ -108,7 +225,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 
                 
                 try:
-                    response = await run_client_with_input(user_message)
+                    response = await get_response(user_message, session_id)
                     
                     
                     await websocket.send_json({
@@ -133,6 +250,16 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
+@app.get("/api/router/stats")
+async def router_stats():
+    """Hit rates and latency saved by the local intent router"""
+    return engine.router_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: stage, tool and LLM latency histograms, token and cache counters"""
+    return PlainTextResponse(await engine.metrics(), media_type="text/plain; version=0.0.4")
+
 @app.post("/api/message")
 async def send_message(message: dict):
     """REST endpoint for sending messages"""
@@ -141,8 +268,9 @@ async def send_message(message: dict):
         if not user_input:
             return {"error": "No message content provided"}
         
-        response = await run_client_with_input(user_input)
-        return {"response": response}
+        session_id = message.get("session_id") or new_session_id()
+        response = await get_response(user_input, session_id)
+        return {"response": response, "session_id": session_id}
         
     except Exception as e:
         logger.error(f"Error in REST API: {e}")
@@ -0,0 +1,124 @@
+"""Fire concurrent bookings at a few hot rooms and check inventory never goes negative.
+
+Run from the project root:
+
+    python -m benchmarks.bench_booking_contention --bookings 4000 --processes 4 --threads 8
+
+Each process plays one ``server.data_server`` worker with its own inventory
+index, all sharing one journal in a temporary directory. Inside a process,
+several threads each run their own event loop of concurrent ``book()`` calls.
+Afterwards the journal is replayed from scratch and every (series, night) is
+checked to be >= 0, and every hot stay to have no more bookings than it had
+free rooms.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from server.booking_journal import BookingJournal
+from server.inventory import InventoryIndex
+from server.snapshot import load_frame
+from server.transactions import BookingTransactions
+
+EMPTY_ROOMS_FILE = "./data/empty_rooms_5000.xlsx"
+
+
+def hot_stays(inventory: InventoryIndex, count: int, seed: int) -> list[dict]:
+    """Two-night stays that currently have between 1 and 3 free rooms"""
+    rng = random.Random(seed)
+    stays = []
+    for (hotel, room_type), row in inventory.series.items():
+        counts = inventory.counts[row]
+        nights = np.flatnonzero((counts[:-1] > 0) & (counts[1:] > 0) & (counts[:-1] <= 3))
+        if len(nights):
+            night = int(rng.choice(nights))
+            stays.append({
+                "hotel_name": inventory.display[hotel],
+                "room_type": inventory.display[room_type],
+                "check_in": str(inventory.start + night),
+                "check_out": str(inventory.start + night + 2),
+            })
+    rng.shuffle(stays)
+    return stays[:count]
+
+
+def worker(excel_path: str, stays: list[dict], bookings: int, threads: int, seed: int, compact_interval: float):
+    inventory = InventoryIndex.from_frame(load_frame(EMPTY_ROOMS_FILE))
+    journal = BookingJournal(excel_path, commit_window=0.002, compact_interval=compact_interval)
+    journal.recover(inventory)
+    journal.start()
+    transactions = BookingTransactions(inventory, journal)
+
+    def run_thread(index: int) -> list:
+        rng = random.Random(seed * 1000 + index)
+        share = [rng.choice(stays) for _ in range(bookings // threads)]
+
+        async def run():
+            return await asyncio.gather(*(
+                transactions.book({**stay, "guest_name": f"guest-{seed}-{index}-{i}", "status": "confirmed"})
+                for i, stay in enumerate(share)
+            ))
+
+        return asyncio.run(run())
+
+    with ThreadPoolExecutor(threads) as pool:
+        results = [r for batch in pool.map(run_thread, range(threads)) for r in batch]
+    journal.close()
+    return [(r.ok, r.reason, r.attempts, r.booking and r.booking["booking_id"]) for r in results], transactions.conflicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=4000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--stays", type=int, default=20)
+    parser.add_argument("--compact-interval", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    baseline = InventoryIndex.from_frame(load_frame(EMPTY_ROOMS_FILE))
+    stays = hot_stays(baseline, args.stays, args.seed)
+    supply = sum(baseline.min_available(s["hotel_name"], s["room_type"], s["check_in"], s["check_out"]) for s in stays)
+    print(f"{len(stays)} hot stays with {supply} rooms in total, {args.bookings} booking attempts")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        excel_path = os.path.join(tmp, "bookings.xlsx")
+        per_process = args.bookings // args.processes
+        started = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            outputs = pool.starmap(worker, [
+                (excel_path, stays, per_process, args.threads, args.seed + p, args.compact_interval)
+                for p in range(args.processes)
+            ])
+        elapsed = time.perf_counter() - started
+
+        results = [r for batch, _ in outputs for r in batch]
+        conflicts = sum(c for _, c in outputs)
+        booked = [r for r in results if r[0]]
+        outcomes = Counter("booked" if ok else reason for ok, reason, _, _ in results)
+        attempts = Counter(a for _, _, a, _ in results)
+        print(f"{len(results)} attempts in {elapsed:.2f}s ({len(results) / elapsed:,.0f}/s): {dict(outcomes)}")
+        print(f"CAS conflicts retried: {conflicts}, attempts per booking: {dict(sorted(attempts.items()))}")
+
+        replayed = InventoryIndex.from_frame(load_frame(EMPTY_ROOMS_FILE))
+        BookingJournal(excel_path).recover(replayed)
+        negative = int((replayed.counts < 0).sum())
+        ids = [booking_id for _, _, _, booking_id in booked]
+        print(f"booked {len(booked)} of {supply} free rooms; unique booking ids: {len(set(ids)) == len(ids)}")
+        print(f"negative (series, night) cells after replay: {negative}")
+        if negative or len(booked) > supply or len(set(ids)) != len(ids):
+            raise SystemExit("FAILED: inventory oversold")
+        print("OK: inventory never went negative")
+
+
+if __name__ == "__main__":
+    main()
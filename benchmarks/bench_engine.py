@@ -0,0 +1,74 @@
+"""Compare the in-process chat engine with the per-message client subprocess.
+
+Run from the project root:
+
+    python -m benchmarks.bench_engine --messages 5 --concurrency 2
+
+The engine pays process start, tool discovery and agent compilation once; the
+subprocess path pays all of that on every message.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from api_server import run_client_with_input
+from chat_engine import ChatEngine
+
+BENCH_SESSION_ID = "bench"
+
+DEFAULT_MESSAGES = [
+    "hi",
+    "hotels under 150 in chicago",
+    "is Hotel_1 available?",
+]
+
+
+def summarize(label: str, samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return (
+        f"{label:<12} n={len(samples):<4} mean={statistics.mean(samples):7.3f}s "
+        f"p50={statistics.median(samples):7.3f}s p95={p95:7.3f}s max={ordered[-1]:7.3f}s"
+    )
+
+
+async def timed(fn, message: str, semaphore: asyncio.Semaphore) -> float:
+    async with semaphore:
+        started = time.perf_counter()
+        await fn(message)
+        return time.perf_counter() - started
+
+
+async def run_batch(fn, messages: list[str], concurrency: int) -> tuple[list[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    samples = await asyncio.gather(*(timed(fn, m, semaphore) for m in messages))
+    return list(samples), time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=len(DEFAULT_MESSAGES))
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--skip-subprocess", action="store_true")
+    args = parser.parse_args()
+
+    messages = [DEFAULT_MESSAGES[i % len(DEFAULT_MESSAGES)] for i in range(args.messages)]
+
+    engine = ChatEngine()
+    await engine.start()
+    try:
+        print(f"engine startup: {engine.startup_seconds:.3f}s (paid once)")
+        samples, wall = await run_batch(lambda m: engine.process_message(m, BENCH_SESSION_ID), messages, args.concurrency)
+        print(summarize("engine", samples), f"wall={wall:.3f}s")
+    finally:
+        await engine.stop()
+
+    if not args.skip_subprocess:
+        samples, wall = await run_batch(lambda m: run_client_with_input(m, BENCH_SESSION_ID), messages, args.concurrency)
+        print(summarize("subprocess", samples), f"wall={wall:.3f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+"""Measure availability-forecast fit throughput (series per second) for several process-pool sizes.
+
+Run from the project root:
+
+    python -m benchmarks.bench_forecast --series 20000 --workers 1 2 4
+
+The booking history of ``data/hotel_bookings.xlsx`` is tiled, with Poisson
+noise, up to ``--series`` series so larger catalogs can be simulated.
+Nothing is persisted.
+"""
+import argparse
+import time
+import numpy as np
+
+from server.analytics import BookingAnalytics
+from server.forecast import FORECAST_HORIZON_DAYS, fit_all
+from server.snapshot import load_frame
+import server.forecast as forecast
+
+
+def history(series: int, seed: int) -> np.ndarray:
+    _, _, base = BookingAnalytics(load_frame(forecast.BOOKINGS_HISTORY)).series_history()
+    rng = np.random.default_rng(seed)
+    tiled = np.tile(base, (int(np.ceil(series / len(base))), 1))[:series]
+    return rng.poisson(tiled + 0.1).astype(np.float64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--series", type=int, default=10000)
+    parser.add_argument("--horizon", type=int, default=FORECAST_HORIZON_DAYS)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    data = history(args.series, args.seed)
+    print(f"{len(data)} series x {data.shape[1]} nights, {args.horizon}-day horizon")
+    # Let the pool run at any size, so the crossover point is visible
+    forecast.MIN_SERIES_PER_WORKER = 1
+    reference = None
+    for workers in args.workers:
+        started = time.perf_counter()
+        sold, _ = fit_all(data, args.horizon, workers)
+        elapsed = time.perf_counter() - started
+        if reference is None:
+            reference = sold
+        same = "ok" if np.allclose(sold, reference) else "MISMATCH"
+        print(f"workers={workers:<3} {elapsed:8.2f}s {len(data) / elapsed:10.0f} series/s  {same}")
+
+
+if __name__ == "__main__":
+    main()
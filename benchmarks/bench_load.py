@@ -0,0 +1,320 @@
+"""Load-test the chat stack end to end with a fake LLM and in-process Redis, against a stored baseline.
+
+Run from the project root:
+
+    python -m benchmarks.bench_load --conversations 40 --concurrency 8
+    python -m benchmarks.bench_load --save-baseline      # record benchmarks/load_baseline.json
+    python -m benchmarks.bench_load --targets tools ws   # compare a subset against it
+
+Every process, MCP workers included, uses ``benchmarks.fake_llm`` (latency
+``--llm-latency-ms``, ``--llm-tokens`` tokens per answer) and fakeredis, and
+bookings go to a temporary journal, so runs are repeatable and free.
+Conversations follow a search -> availability -> booking funnel built from
+the workbooks; ``--mix`` weighs how deep they go. Each target replays the
+same conversations:
+
+- ``tools``: MCP tool calls on a worker session, no agent
+- ``client``: ``client.process_message`` (router or ReAct agent, then tools)
+- ``api``: ``POST /api/message`` on an in-process uvicorn
+- ``ws``: the ``/ws`` websocket, streaming
+
+Reported per target: turns per second, p50/p95/p99 turn latency, errors,
+the RSS of this process afterwards and the peak RSS of the MCP workers. With a baseline, a
+throughput drop or a p95 or memory rise beyond ``--tolerance`` is a
+regression and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "load_baseline.json")
+TARGETS = ("tools", "client", "api", "ws")
+DEFAULT_MIX = "search=4,availability=3,booking=3"
+TURN_TIMEOUT_SEC = 60
+GUESTS = ["Ada Lovelace", "Alan Turing", "Grace Hopper", "Edsger Dijkstra", "Barbara Liskov", "Donald Knuth"]
+
+
+def configure(args, data_dir: str):
+    """Environment for this process and, through the server params, every MCP worker; set before app imports"""
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_LLM_TOKENS": str(args.llm_tokens),
+        "REDIS_URL": "fakeredis://",
+        "BOOKINGS_FILE": os.path.join(data_dir, "bookings.xlsx"),
+        "TRACE_SPANS": "0",
+        "MCP_POOL_SIZE": str(args.workers),
+    })
+
+
+def conversations(count: int, mix: dict, seed: int) -> list[list[dict]]:
+    """Scripted sessions; each turn has the chat ``message`` and the direct ``tool`` call it maps to"""
+    from server.inventory import InventoryIndex
+    from server.snapshot import load_frame
+
+    rng = random.Random(seed)
+    hotels = load_frame("./data/hotels.xlsx")
+    inventory = InventoryIndex.from_frame(load_frame("./data/empty_rooms_5000.xlsx"))
+    stays = []
+    for (hotel, room_type), row in inventory.series.items():
+        counts = inventory.counts[row]
+        nights = np.flatnonzero((counts[:-1] > 0) & (counts[1:] > 0))
+        if len(nights):
+            night = int(rng.choice(nights))
+            stays.append((inventory.display[hotel], inventory.display[room_type],
+                          str(inventory.start + night), str(inventory.start + night + 2)))
+    cities = sorted(set(hotels["City"].astype(str)))
+    kinds, weights = zip(*mix.items())
+
+    sessions = []
+    for i in range(count):
+        depth = ("search", "availability", "booking").index(rng.choices(kinds, weights)[0]) + 1
+        hotel, room_type, check_in, check_out = rng.choice(stays)
+        city = rng.choice(cities)
+        question = f"find a hotel in {city} under {rng.choice([100, 150, 200, 300])}"
+        turns = [{"message": question, "tool": ("hotel_search", {"question": question})}]
+        if depth >= 2:
+            question = f"is {hotel} available from {check_in} to {check_out}?"
+            turns.append({"message": question, "tool": ("hotel_availability", {"question": question, "hotel_name": hotel})})
+        if depth >= 3:
+            guest = rng.choice(GUESTS)
+            question = f"book a {room_type} room at {hotel} from {check_in} to {check_out} for {guest}"
+            turns.append({"message": question, "tool": ("create_booking", {
+                "booking_request": question, "hotel_name": hotel, "room_type": room_type,
+                "check_in": check_in, "check_out": check_out, "guest_name": guest,
+            })})
+        sessions.append(turns)
+    return sessions
+
+
+def rss_mb(pid: int | str = "self", peak: bool = True) -> float:
+    """Peak (or current) resident memory of a process from /proc; 0 where that is unavailable"""
+    field = "VmHWM" if peak else "VmRSS"
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def worker_pids() -> list[int]:
+    """MCP worker processes spawned by this process"""
+    pids = []
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat", "r", encoding="utf-8") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == os.getpid():
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return pids
+
+
+async def replay(sessions: list[list[dict]], concurrency: int, turn) -> dict:
+    """Run every session (turns in order) with ``concurrency`` sessions at once; ``turn(session_id, turn)`` answers one"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def run_session(index: int, turns: list[dict]):
+        nonlocal errors
+        async with semaphore:
+            session_id = f"bench-{index}-{os.getpid()}"
+            for step in turns:
+                started = time.perf_counter()
+                try:
+                    ok = await asyncio.wait_for(turn(session_id, step), TURN_TIMEOUT_SEC)
+                except Exception:
+                    ok = False
+                latencies.append(time.perf_counter() - started)
+                errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(i, turns) for i, turns in enumerate(sessions)))
+    wall = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    return {
+        "turns": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / wall, 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p95_ms": round(float(np.percentile(ms, 95)), 1),
+        "p99_ms": round(float(np.percentile(ms, 99)), 1),
+    }
+
+
+def answered(text) -> bool:
+    return bool(text) and not str(text).startswith(("Error", "Connection error", "The request timed out"))
+
+
+async def bench_tools(sessions, concurrency: int, workers: int) -> dict:
+    from client import SERVER_PARAMS, build_agent
+    from session_pool import MCPSessionPool
+
+    pool = MCPSessionPool(SERVER_PARAMS, build_agent, size=workers)
+    await pool.start()
+
+    async def turn(session_id, step):
+        name, arguments = step["tool"]
+        async with pool.checkout() as worker:
+            result = await worker.session.call_tool(name, {**arguments, "session_id": session_id})
+        return not result.isError and '"error"' not in (result.content[0].text if result.content else "")
+
+    try:
+        return {**await replay(sessions, concurrency, turn), "workers_rss_mb": sum(rss_mb(p) for p in worker_pids())}
+    finally:
+        await pool.stop()
+
+
+async def bench_client(sessions, concurrency: int, workers: int) -> dict:
+    import client
+
+    client.get_pool(size=workers)
+    await client.get_pool().start()
+
+    async def turn(session_id, step):
+        return answered(await client.process_message(step["message"], session_id))
+
+    try:
+        return {**await replay(sessions, concurrency, turn), "workers_rss_mb": sum(rss_mb(p) for p in worker_pids())}
+    finally:
+        await client.close_pool()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def bench_api(sessions, concurrency: int, websocket: bool) -> dict:
+    import httpx
+    import uvicorn
+    import websockets
+    import api_server
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(api_server.app, host="127.0.0.1", port=port, log_level="warning", ws="websockets"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=TURN_TIMEOUT_SEC) as http:
+        async def rest_turn(session_id, step):
+            body = (await http.post("/api/message", json={"content": step["message"], "session_id": session_id})).json()
+            return answered(body.get("response"))
+
+        async def ws_turn(session_id, step):
+            async with websockets.connect(f"ws://127.0.0.1:{port}/ws?session_id={session_id}") as ws:
+                await ws.recv()  # session frame
+                await ws.send(json.dumps({"type": "message", "content": step["message"]}))
+                while True:
+                    frame = json.loads(await ws.recv())
+                    if frame["type"] == "message":
+                        return answered(frame["content"])
+
+        try:
+            result = await replay(sessions, concurrency, ws_turn if websocket else rest_turn)
+            return {**result, "workers_rss_mb": sum(rss_mb(p) for p in worker_pids())}
+        finally:
+            server.should_exit = True
+            await serving
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lines describing each metric against the baseline, regressions marked"""
+    regressions, lines = [], []
+    checks = [("throughput", -1), ("p95_ms", 1), ("p99_ms", 1), ("workers_rss_mb", 1)]
+    for target, result in results.items():
+        base = baseline.get("results", {}).get(target)
+        if not base:
+            lines.append(f"{target:<7} no baseline")
+            continue
+        parts = []
+        for metric, direction in checks:
+            if not base.get(metric):
+                continue
+            change = result[metric] / base[metric] - 1
+            worse = change * direction > tolerance
+            parts.append(f"{metric} {change:+.1%}{' REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append(f"{target}.{metric}")
+        lines.append(f"{target:<7} " + ", ".join(parts))
+    if regressions:
+        lines.append("regressions: " + ", ".join(regressions))
+    return lines
+
+
+async def run(args) -> int:
+    sessions = conversations(args.conversations, dict(
+        (kind, float(weight)) for kind, weight in (item.split("=") for item in args.mix.split(","))
+    ), args.seed)
+    from client import SERVER_PARAMS
+    # MCP workers only inherit an explicit environment
+    SERVER_PARAMS.env = dict(os.environ)
+
+    results = {}
+    for target in args.targets:
+        if target == "tools":
+            result = await bench_tools(sessions, args.concurrency, args.workers)
+        elif target == "client":
+            result = await bench_client(sessions, args.concurrency, args.workers)
+        else:
+            result = await bench_api(sessions, args.concurrency, websocket=target == "ws")
+        result["rss_mb"] = round(rss_mb(peak=False), 1)
+        result["workers_rss_mb"] = round(result["workers_rss_mb"], 1)
+        results[target] = result
+        print(f"{target:<7} turns={result['turns']:<4} errors={result['errors']:<3} {result['throughput']:7.2f} turns/s "
+              f"p50={result['p50_ms']:8.1f}ms p95={result['p95_ms']:8.1f}ms p99={result['p99_ms']:8.1f}ms "
+              f"rss={result['rss_mb']:.0f}MB workers={result['workers_rss_mb']:.0f}MB", flush=True)
+
+    config = {key: getattr(args, key) for key in ("conversations", "concurrency", "workers", "mix", "llm_latency_ms", "llm_tokens", "seed")}
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != config:
+        print(f"warning: baseline was recorded with {baseline.get('config')}")
+    lines = compare(results, baseline, args.tolerance)
+    print("\n".join(lines))
+    return 1 if lines and lines[-1].startswith("regressions") else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--conversations", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2, help="MCP worker processes per target")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weights of conversations ending at each funnel step")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-tokens", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        configure(args, data_dir)
+        sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
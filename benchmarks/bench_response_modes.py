@@ -0,0 +1,111 @@
+"""Compare p50/p99 latency of hotel_availability and create_booking in each response mode.
+
+Run from the project root:
+
+    python -m benchmarks.bench_response_modes --calls 200 --llm-latency-ms 800
+
+The tools are called in-process, the way the MCP server runs them. Bookings
+go to a journal in a temporary directory, so ``data/`` is left untouched.
+With ``--llm-latency-ms`` the Gemini model is replaced by a stand-in that
+sleeps for that long, so no API key is needed; without it the real model
+from ``.env`` is called.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+MODES = ("llm", "structured", "template", "background")
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize(label: str, samples: list[float]) -> str:
+    return (
+        f"{label:<32} n={len(samples):<4} p50={statistics.median(samples) * 1000:9.2f}ms "
+        f"p99={percentile(samples, 0.99) * 1000:9.2f}ms max={max(samples) * 1000:9.2f}ms"
+    )
+
+
+def use_fake_llm(latency: float):
+    import agent.registry as registry
+    from benchmarks.fake_llm import FakeChatModel
+    from config.tracing import LLMMetricsCallback
+
+    registry._llm = FakeChatModel(latency_ms=latency * 1000, callbacks=[LLMMetricsCallback("fake")])
+
+
+def stays(inventory, count: int, seed: int) -> list[dict]:
+    """Two-night stays with at least one free room, spread over the inventory"""
+    rng = random.Random(seed)
+    keys = list(inventory.series.items())
+    found = []
+    while len(found) < count:
+        (hotel, room_type), row = rng.choice(keys)
+        counts = inventory.counts[row]
+        nights = [i for i in range(len(counts) - 1) if counts[i] > 0 and counts[i + 1] > 0]
+        if nights:
+            night = rng.choice(nights)
+            found.append({
+                "hotel_name": inventory.display[hotel],
+                "room_type": inventory.display[room_type],
+                "check_in": str(inventory.start + night),
+                "check_out": str(inventory.start + night + 2),
+            })
+    return found
+
+
+async def timed(coro, errors: list) -> float:
+    started = time.perf_counter()
+    result = await coro
+    elapsed = time.perf_counter() - started
+    if isinstance(result, dict) and "error" in result:
+        errors.append(result["error"])
+    return elapsed
+
+
+async def run(args):
+    from server import data_server
+
+    sample = stays(data_server.inventory, args.calls * len(MODES), args.seed)
+    for index, mode in enumerate(MODES):
+        data_server.RESPONSE_MODE = mode
+        batch = sample[index * args.calls:(index + 1) * args.calls]
+        availability, booking, errors = [], [], []
+        for i, stay in enumerate(batch):
+            question = f"Is a {stay['room_type']} free at {stay['hotel_name']} from {stay['check_in']} to {stay['check_out']}?"
+            availability.append(await timed(data_server.hotel_availability(question, stay["hotel_name"], f"bench-{mode}-{i}"), errors))
+            booking.append(await timed(data_server.create_booking(
+                f"Book {stay['hotel_name']} {stay['room_type']} {stay['check_in']} to {stay['check_out']} for Bench Guest",
+                guest_name=f"Bench Guest {i}", session_id=f"bench-{mode}-{i}", **stay,
+            ), errors))
+        await asyncio.gather(*list(data_server._background_tasks))
+        print(summarize(f"hotel_availability [{mode}]", availability))
+        print(summarize(f"create_booking     [{mode}]", booking))
+        if errors:
+            print(f"  {len(errors)} calls returned errors, e.g. {errors[0]!r}")
+    data_server.journal.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100, help="calls per tool per mode")
+    parser.add_argument("--llm-latency-ms", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.llm_latency_ms is not None:
+        use_fake_llm(args.llm_latency_ms / 1000)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["BOOKINGS_FILE"] = os.path.join(tmp, "bookings.xlsx")
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Deterministic local stand-in for ``ChatGoogleGenerativeAI``, for benchmarks.
+
+Enabled for every process (the MCP workers inherit the environment) with
+``LLM_BACKEND=fake``; see ``agent.registry.get_llm``. Latency and answer
+length come from ``FAKE_LLM_LATENCY_MS`` and ``FAKE_LLM_TOKENS``.
+
+With tools bound (the ReAct agent), the first call on a user message picks
+a tool by keyword and fills its arguments from the message; the call after
+the tool result answers in text. Without tools (the prompt chains) it
+answers in text.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))
+FAKE_LLM_TOKENS = int(os.getenv("FAKE_LLM_TOKENS", "60"))
+
+# First keyword match wins; anything else goes to conversation_assistant
+TOOL_KEYWORDS = [
+    ("create_booking", ("book", "reserve")),
+    ("hotel_availability", ("available", "availability", "free rooms")),
+    ("hotel_search", ("hotel", "find", "search", "under", "near")),
+]
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_HOTEL = re.compile(r"hotel_\d+", re.IGNORECASE)
+_ROOM = re.compile(r"\b(single|double|twin|king|queen|suite|deluxe)\b", re.IGNORECASE)
+_GUEST = re.compile(r"\bfor ([A-Z][a-z]+(?: [A-Z][a-z]+)+)")
+
+
+def _argument(name: str, text: str):
+    dates = _DATE.findall(text)
+    if name in ("question", "user_message", "booking_request"):
+        return text
+    if name == "hotel_name":
+        match = _HOTEL.search(text)
+        return match.group().title() if match else ""
+    if name == "room_type":
+        match = _ROOM.search(text)
+        return match.group().title() if match else ""
+    if name in ("check_in", "check_out"):
+        return dates[0 if name == "check_in" else 1] if len(dates) > 1 else ""
+    if name == "guest_name":
+        match = _GUEST.search(text)
+        return match.group(1) if match else "Guest"
+    return None
+
+
+class FakeChatModel(BaseChatModel):
+    latency_ms: float = FAKE_LLM_LATENCY_MS
+    tokens: int = FAKE_LLM_TOKENS
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _reply(self, messages: list, tools: list | None) -> AIMessage:
+        prompt_tokens = sum(len(str(m.content).split()) for m in messages)
+        last = messages[-1] if messages else None
+        if tools and isinstance(last, HumanMessage):
+            text = str(last.content)
+            lowered = text.lower()
+            available = {t["function"]["name"]: t["function"] for t in tools}
+            name = next(
+                (tool for tool, words in TOOL_KEYWORDS if tool in available and any(w in lowered for w in words)),
+                "conversation_assistant" if "conversation_assistant" in available else next(iter(available)),
+            )
+            properties = available[name].get("parameters", {}).get("properties", {})
+            args = {arg: value for arg in properties if (value := _argument(arg, text)) is not None}
+            return AIMessage(
+                content="",
+                tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}],
+                usage_metadata={"input_tokens": prompt_tokens, "output_tokens": 20, "total_tokens": prompt_tokens + 20},
+            )
+        return AIMessage(
+            content=" ".join(f"word{i}" for i in range(self.tokens)),
+            usage_metadata={"input_tokens": prompt_tokens, "output_tokens": self.tokens,
+                            "total_tokens": prompt_tokens + self.tokens},
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, tools))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, tools))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, tools=None, **kwargs: Any):
+        reply = self._reply(messages, tools)
+        if reply.tool_calls:
+            await asyncio.sleep(self.latency_ms / 1000)
+            call = reply.tool_calls[0]
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[{"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0}],
+                usage_metadata=reply.usage_metadata,
+            ))
+            return
+        # Time to first token is half the latency; the rest is spread over the tokens
+        words = reply.content.split(" ")
+        await asyncio.sleep(self.latency_ms / 2000)
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency_ms / 2000 / len(words))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=word if i == 0 else f" {word}",
+                usage_metadata=reply.usage_metadata if i == len(words) - 1 else None,
+            ))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -0,0 +1,80 @@
+import logging
+import time
+
+from client import DEFAULT_SESSION_ID, SERVER_PARAMS, answer_turn, build_agent, stream_answer
+from config.tracing import registry, render_prometheus, span
+from intent_router import ROUTER_ENABLED, get_router
+from session_pool import MCPSessionPool, PoolBusyError, POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class ChatEngine:
+    """In-process chat engine serving requests from a pool of warm MCP workers.
+
+    Each worker keeps one long-lived MCP session, its loaded tools and the
+    compiled ReAct graph, so a request only pays for the agent run itself.
+    """
+
+    def __init__(self, server_params=SERVER_PARAMS, pool_size: int = POOL_SIZE):
+        self.pool = MCPSessionPool(server_params, build_agent, size=pool_size)
+        self.startup_seconds: float | None = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.pool.started
+
+    @property
+    def tools(self):
+        return self.pool.tools
+
+    async def start(self):
+        """Spawn the MCP workers, load their tools and compile the agents once"""
+        if self.pool.started:
+            return
+        started = time.perf_counter()
+        await self.pool.start()
+        if ROUTER_ENABLED:
+            get_router()
+        self.startup_seconds = time.perf_counter() - started
+        logger.info(f"Chat engine ready with {len(self.tools)} tools in {self.startup_seconds:.2f}s")
+
+    def router_stats(self) -> dict:
+        """Per-route hit rates of the local intent router and the latency it saved"""
+        if not ROUTER_ENABLED:
+            return {"enabled": False}
+        return {"enabled": True, **get_router().stats.snapshot()}
+
+    async def metrics(self) -> str:
+        """Prometheus text for this process and every MCP worker, labelled by ``process``"""
+        snapshots = [({"process": "api"}, registry.snapshot())]
+        if self.pool.started:
+            snapshots += await self.pool.metrics_snapshots()
+        return render_prometheus(snapshots)
+
+    async def stop(self):
+        await self.pool.stop()
+
+    async def process_message(self, user_input: str, session_id: str = DEFAULT_SESSION_ID) -> str:
+        """Answer one message on whichever worker is free"""
+        if not self.is_ready:
+            return "The assistant is still starting up. Please try again in a moment."
+        try:
+            with span("turn", session_id=session_id):
+                async with self.pool.checkout() as worker:
+                    return await answer_turn(worker, user_input, session_id)
+        except PoolBusyError as e:
+            return str(e)
+
+    async def stream_message(self, user_input: str, session_id: str = DEFAULT_SESSION_ID):
+        """Stream one message's delta/tool frames, ending with the full ``message`` frame"""
+        if not self.is_ready:
+            yield {"type": "message", "content": "The assistant is still starting up. Please try again in a moment."}
+            return
+        try:
+            with span("turn", session_id=session_id, streamed=True):
+                async with self.pool.checkout() as worker:
+                    async for frame in stream_answer(worker, user_input, session_id):
+                        yield frame
+        except PoolBusyError as e:
+            yield {"type": "message", "content": str(e)}
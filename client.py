@@ -1,18 +1,21 @@
 import asyncio
-from mcp.client.stdio import stdio_client
-from mcp import ClientSession, StdioServerParameters
-from langchain_mcp_adapters.tools import load_mcp_tools
+from mcp import StdioServerParameters
 from langgraph.prebuilt import create_react_agent
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.memory import ConversationBufferMemory
-from langchain_community.chat_message_histories import RedisChatMessageHistory
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool
+from agent.registry import get_llm, get_memory
+from config.concurrency import run_blocking
+from config.tracing import record_cache, span
 import os
 import sys
 import json
 from dotenv import load_dotenv
 import logging
 import re
+from session_pool import MCPSessionPool, POOL_SIZE
+from intent_router import ROUTER_ENABLED, Route, get_router, render_tool_output
+import time
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -20,119 +23,325 @@ logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
-models = os.getenv("MODEL")
-api_key = os.getenv("API_KEY")
-redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
-async def process_message(user_input: str) -> str:
+SERVER_PARAMS = StdioServerParameters(
+    command="python",
+    args=["-m", "server.data_server"],
+)
+
+TURN_TIMEOUT_SEC = 30
+
+# Routed calls that may have committed before failing; retrying them through the agent could repeat the write
+NON_IDEMPOTENT_TOOLS = frozenset({"create_booking", "update_booking_status"})
+
+# Session used by the console client; api_server gives every connection its own
+DEFAULT_SESSION_ID = "console"
+
+# System instructions for tool routing with enhanced history parsing
+SYSTEM_PROMPT = SystemMessage(content="""
+You are HotelHive, a hotel booking assistant. Review the FULL conversation history (all messages) to extract details like hotel name, room type, check-in/check-out dates, and guest name. Do NOT re-ask for details already provided in history.
+
+Routing policy:
+(A) If the message is a greeting/small talk (e.g., "hi", "hello") → call 'conversation_assistant' with {"user_message": <message>}.
+
+(B) If the message is about searching hotels (e.g., mentions city, price, amenities) → 
+    call 'hotel_search' with {"question": <message>}. Use history to fill in missing details like location or budget if available.
+
+(C) If the message is about checking availability for a specific hotel → 
+    extract 'hotel_name' from history or message, then call 'hotel_availability' with {"question": <message>, "hotel_name": <hotel_name>}.
+    If it asks about several hotels or a range of dates (e.g., "which of Hotel_1, Hotel_2 have a Double free any weekend in October") →
+    call 'batch_availability' once with {"question": <message>, "hotel_names": [...], "room_types": [...], "start_date", "end_date", "nights", "weekdays": ["Fri", "Sat"]}.
+    If the guest asks for other options for a stay that was sold out → call 'find_alternatives' with {"question": <message>, "hotel_name", "room_type", "check_in", "check_out"}.
+
+(D) If the message indicates booking intent (e.g., contains "book", "reserve", "stay", or includes room type/dates/guest name):
+    - Extract ALL details from FULL history and current message:
+        • hotel_name (e.g., "Hotel_1")
+        • room_type (e.g., "Single")
+        • check_in (YYYY-MM-DD, e.g., "2025-09-20")
+        • check_out (YYYY-MM-DD, e.g., "2025-09-23")
+        • guest_name (e.g., "John Doe")
+    - If ALL details are present, call 'create_booking' with:
+        {"booking_request": <original message>,
+         "hotel_name": <hotel_name>,
+         "room_type": <room_type>,
+         "check_in": <check_in>,
+         "check_out": <check_out>,
+         "guest_name": <guest_name>}.
+    - If ANY details are missing, call 'conversation_assistant' to ask ONLY for missing details, referencing known ones (e.g., "I have Hotel_1 and John Doe, but need room type and dates.").
+
+(E) If the message doesn't fit above → call 'conversation_assistant' with {"user_message": <message>}.
+
+Rules:
+- Use exactly one tool per turn.
+- Assume YYYY-MM-DD date format.
+- Today’s date is September 12, 2025.
+- Use history to avoid re-asking for known details.
+- For flexible queries (e.g., "anywhere"), suggest hotels based on history or default to broad search.
+""")
+
+
+def build_memory(session_id: str = DEFAULT_SESSION_ID):
+    """Windowed conversation memory (recent turns + rolling summary) of a session"""
+    return get_memory(session_id)
+
+
+def bind_session(tool):
+    """Hide a tool's ``session_id`` argument from the LLM and fill it from the turn's config"""
+    schema = tool.args_schema
+    if not isinstance(schema, dict) or "session_id" not in schema.get("properties", {}):
+        return tool
+    visible = {
+        **schema,
+        "properties": {k: v for k, v in schema["properties"].items() if k != "session_id"},
+        "required": [r for r in schema.get("required", []) if r != "session_id"],
+    }
+    call = tool.coroutine
+
+    async def call_with_session(config: RunnableConfig, **arguments):
+        session_id = config.get("configurable", {}).get("session_id", DEFAULT_SESSION_ID)
+        return await call(**arguments, session_id=session_id)
+
+    return StructuredTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=visible,
+        coroutine=call_with_session,
+        response_format=tool.response_format,
+        metadata=tool.metadata,
+    )
+
+
+def build_agent(tools):
+    """Compile the ReAct agent graph over the given MCP tools"""
+    return create_react_agent(model=get_llm(), tools=[bind_session(tool) for tool in tools])
+
+
+async def run_turn(agent, user_input: str, session_id: str = DEFAULT_SESSION_ID) -> str:
+    """Run one user turn through a compiled agent and persist it to memory"""
+    # Load the recent window and rolling summary of the session
+    with span("memory.load"):
+        memory = await run_blocking(build_memory, session_id)
+        memory_vars = await memory.aload_memory_variables({})
+    past_messages = memory_vars.get('history', [])
+
+    try:
+        # Build initial state with the session history
+        initial_messages = past_messages + [SYSTEM_PROMPT, HumanMessage(content=user_input)]
+        
+        with span("agent.run"):
+            state = await asyncio.wait_for(
+                agent.ainvoke(
+                    {"messages": initial_messages},
+                    config={"recursion_limit": 10, "configurable": {"session_id": session_id}}, 
+                ),
+                timeout=TURN_TIMEOUT_SEC,
+            )
+
+        messages = state.get("messages", [])
+        final_text = ""
+        
+        # Extract the last AI message content
+        for msg in reversed(messages):
+            if isinstance(msg, AIMessage):
+                final_text = msg.content
+                break
+        
+        if not final_text:
+            final_text = "I'm not sure how to respond to that. Can you try rephrasing?"
+        
+        # Save to memory
+        if memory:
+            with span("memory.save"):
+                await memory.asave_context({"input": user_input}, {"output": final_text})
+        return final_text
+        
+    except asyncio.TimeoutError:
+        return "The request timed out. Please try again."
+    except Exception as e:
+        logger.error(f"Agent error: {e}")
+        return f"Error processing your request: {str(e)}"
+
+
+def _chunk_text(chunk) -> str:
+    """Text of a streamed model chunk; Gemini may send a list of content parts"""
+    content = getattr(chunk, "content", "")
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
+
+async def stream_turn(agent, user_input: str, session_id: str = DEFAULT_SESSION_ID):
+    """Run one user turn, yielding frames as the agent works.
+
+    Yields ``{"type": "delta", "content": ...}`` for every LLM token chunk,
+    ``{"type": "tool", "name": ..., "status": "start"|"end"}`` around tool
+    calls, and finally ``{"type": "message", "content": ...}`` with the full
+    answer, which is what gets saved to memory.
+    """
+    with span("memory.load"):
+        memory = await run_blocking(build_memory, session_id)
+        past_messages = (await memory.aload_memory_variables({})).get('history', [])
+    initial_messages = past_messages + [SYSTEM_PROMPT, HumanMessage(content=user_input)]
+
+    root_run = None
+    final_text = ""
+    streamed = ""
+    try:
+        with span("agent.run"):
+            async with asyncio.timeout(TURN_TIMEOUT_SEC):
+                async for event in agent.astream_events(
+                    {"messages": initial_messages},
+                    config={"recursion_limit": 10, "configurable": {"session_id": session_id}},
+                    version="v2",
+                ):
+                    kind = event["event"]
+                    if root_run is None:
+                        root_run = event["run_id"]
+                    if kind == "on_chat_model_stream":
+                        text = _chunk_text(event["data"].get("chunk"))
+                        if text:
+                            streamed += text
+                            yield {"type": "delta", "content": text}
+                    elif kind == "on_tool_start":
+                        streamed = ""
+                        yield {"type": "tool", "name": event["name"], "status": "start"}
+                    elif kind == "on_tool_end":
+                        yield {"type": "tool", "name": event["name"], "status": "end"}
+                    elif kind == "on_chain_end" and event["run_id"] == root_run:
+                        output = event["data"].get("output") or {}
+                        for msg in reversed(output.get("messages", []) if isinstance(output, dict) else []):
+                            if isinstance(msg, AIMessage):
+                                final_text = _chunk_text(msg)
+                                break
+    except TimeoutError:
+        yield {"type": "message", "content": "The request timed out. Please try again."}
+        return
+    except Exception as e:
+        logger.error(f"Agent error: {e}")
+        yield {"type": "message", "content": f"Error processing your request: {str(e)}"}
+        return
+
+    final_text = final_text or streamed
+    if not final_text:
+        final_text = "I'm not sure how to respond to that. Can you try rephrasing?"
+    if memory:
+        await memory.asave_context({"input": user_input}, {"output": final_text})
+    yield {"type": "message", "content": final_text}
+
+
+def route_message(user_input: str) -> Route | None:
+    """Tool call for a message the local router is sure about, else None for the ReAct agent"""
+    if not ROUTER_ENABLED:
+        return None
+    with span("router") as current:
+        try:
+            route = get_router().route(user_input)
+        except Exception as e:
+            logger.error(f"Router error: {e}")
+            route = None
+        current.set(route=route.name if route else None)
+        record_cache("router", "hit" if route else "miss")
+        return route
+
+
+async def run_route(tools, route: Route, user_input: str, session_id: str = DEFAULT_SESSION_ID) -> str:
+    """Call the routed MCP tool directly, skipping the tool-choice and answer LLM calls"""
+    tool = next(t for t in tools if t.name == route.tool)
+    # The raw MCP tool ignores RunnableConfig, so the session goes in the arguments
+    output = await asyncio.wait_for(
+        tool.ainvoke({**route.arguments, "session_id": session_id}),
+        timeout=TURN_TIMEOUT_SEC,
+    )
+    text, saved = render_tool_output(output)
+    if not saved:
+        memory = await run_blocking(build_memory, session_id)
+        await memory.asave_context({"input": user_input}, {"output": text})
+    return text
+
+
+async def unconfirmed_reply(route: Route, user_input: str, session_id: str, error: Exception) -> str:
+    """Reply for a failed non-idempotent routed call, which must not be retried"""
+    logger.error(f"Routed {route.tool} call failed, not retrying: {error!r}")
+    text = (
+        "Sorry, I couldn't confirm whether that change went through. "
+        "Please look up your booking before trying again."
+    )
+    memory = await run_blocking(build_memory, session_id)
+    await memory.asave_context({"input": user_input}, {"output": text})
+    return text
+
+
+async def answer_turn(worker, user_input: str, session_id: str = DEFAULT_SESSION_ID) -> str:
+    """Answer through the local router when it is sure, otherwise through the ReAct agent"""
+    stats = get_router().stats if ROUTER_ENABLED else None
+    started = time.perf_counter()
+    route = route_message(user_input)
+    if route is not None:
+        try:
+            text = await run_route(worker.tools, route, user_input, session_id)
+            stats.record_route(route.name, time.perf_counter() - started)
+            return text
+        except Exception as e:
+            if route.tool in NON_IDEMPOTENT_TOOLS:
+                return await unconfirmed_reply(route, user_input, session_id, e)
+            logger.error(f"Routed {route.tool} call failed, falling back to the agent: {e}")
+    text = await run_turn(worker.agent, user_input, session_id)
+    if stats is not None:
+        stats.record_fallback(time.perf_counter() - started)
+    return text
+
+
+async def stream_answer(worker, user_input: str, session_id: str = DEFAULT_SESSION_ID):
+    """Streaming counterpart of ``answer_turn``; routed turns yield tool frames and the message"""
+    stats = get_router().stats if ROUTER_ENABLED else None
+    started = time.perf_counter()
+    route = route_message(user_input)
+    if route is not None:
+        yield {"type": "tool", "name": route.tool, "status": "start"}
+        try:
+            text = await run_route(worker.tools, route, user_input, session_id)
+        except Exception as e:
+            if route.tool in NON_IDEMPOTENT_TOOLS:
+                text = await unconfirmed_reply(route, user_input, session_id, e)
+                yield {"type": "tool", "name": route.tool, "status": "end"}
+                yield {"type": "message", "content": text}
+                return
+            logger.error(f"Routed {route.tool} call failed, falling back to the agent: {e}")
+        else:
+            stats.record_route(route.name, time.perf_counter() - started)
+            yield {"type": "tool", "name": route.tool, "status": "end"}
+            yield {"type": "message", "content": text}
+            return
+    async for frame in stream_turn(worker.agent, user_input, session_id):
+        yield frame
+    if stats is not None:
+        stats.record_fallback(time.perf_counter() - started)
+
+
+_pool: MCPSessionPool | None = None
+
+
+def get_pool(size: int = POOL_SIZE) -> MCPSessionPool:
+    """Process-wide pool of warm MCP workers, started lazily on first use"""
+    global _pool
+    if _pool is None:
+        _pool = MCPSessionPool(SERVER_PARAMS, build_agent, size=size)
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
+
+
+async def process_message(user_input: str, session_id: str = DEFAULT_SESSION_ID) -> str:
     """Process a single message and return the response"""
     try:
-        server_params = StdioServerParameters(
-            command="python",
-            args=["-m", "server.data_server"],
-        )
-
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                
-                tools = await load_mcp_tools(session)
-                session_id = "ved"
-                history = RedisChatMessageHistory(session_id=session_id, url=redis_url)
-                memory = ConversationBufferMemory(
-                    chat_memory=history,
-                    return_messages=True,
-                    memory_key="history",
-                    input_key="input",
-                )
-                
-                # Load full message history
-                memory_vars = memory.load_memory_variables({})
-                past_messages = memory_vars.get('history', [])
-                
-                google_llm = ChatGoogleGenerativeAI(
-                    temperature=0,
-                    model=models,
-                    google_api_key=api_key
-                )
-
-                # System instructions for tool routing with enhanced history parsing
-                system_prompt = SystemMessage(content="""
-                You are HotelHive, a hotel booking assistant. Review the FULL conversation history (all messages) to extract details like hotel name, room type, check-in/check-out dates, and guest name. Do NOT re-ask for details already provided in history.
-
-                Routing policy:
-                (A) If the message is a greeting/small talk (e.g., "hi", "hello") → call 'conversation_assistant' with {"user_message": <message>}.
-
-                (B) If the message is about searching hotels (e.g., mentions city, price, amenities) → 
-                    call 'hotel_search' with {"question": <message>}. Use history to fill in missing details like location or budget if available.
-
-                (C) If the message is about checking availability for a specific hotel → 
-                    extract 'hotel_name' from history or message, then call 'hotel_availability' with {"question": <message>, "hotel_name": <hotel_name>}.
-
-                (D) If the message indicates booking intent (e.g., contains "book", "reserve", "stay", or includes room type/dates/guest name):
-                    - Extract ALL details from FULL history and current message:
-                        • hotel_name (e.g., "Hotel_1")
-                        • room_type (e.g., "Single")
-                        • check_in (YYYY-MM-DD, e.g., "2025-09-20")
-                        • check_out (YYYY-MM-DD, e.g., "2025-09-23")
-                        • guest_name (e.g., "John Doe")
-                    - If ALL details are present, call 'create_booking' with:
-                        {"booking_request": <original message>,
-                         "hotel_name": <hotel_name>,
-                         "room_type": <room_type>,
-                         "check_in": <check_in>,
-                         "check_out": <check_out>,
-                         "guest_name": <guest_name>}.
-                    - If ANY details are missing, call 'conversation_assistant' to ask ONLY for missing details, referencing known ones (e.g., "I have Hotel_1 and John Doe, but need room type and dates.").
-
-                (E) If the message doesn't fit above → call 'conversation_assistant' with {"user_message": <message>}.
-
-                Rules:
-                - Use exactly one tool per turn.
-                - Assume YYYY-MM-DD date format.
-                - Today’s date is September 12, 2025.
-                - Use history to avoid re-asking for known details.
-                - For flexible queries (e.g., "anywhere"), suggest hotels based on history or default to broad search.
-                """)
-
-                agent = create_react_agent(model=google_llm, tools=tools)
-
-                TURN_TIMEOUT_SEC = 30
-                
-                try:
-                    # Build initial state with full history
-                    initial_messages = past_messages + [system_prompt, HumanMessage(content=user_input)]
-                    
-                    state = await asyncio.wait_for(
-                        agent.ainvoke(
-                            {"messages": initial_messages},
-                            config={"recursion_limit": 10}, 
-                        ),
-                        timeout=TURN_TIMEOUT_SEC,
-                    )
-
-                    messages = state.get("messages", [])
-                    final_text = ""
-                    
-                    # Extract the last AI message content
-                    for msg in reversed(messages):
-                        if isinstance(msg, AIMessage):
-                            final_text = msg.content
-                            break
-                    
-                    if not final_text:
-                        final_text = "I'm not sure how to respond to that. Can you try rephrasing?"
-                    
-                    # Save to memory
-                    if memory:
-                        memory.save_context({"input": user_input}, {"output": final_text})
-                    return final_text
-                    
-                except asyncio.TimeoutError:
-                    return "The request timed out. Please try again."
-                except Exception as e:
-                    logger.error(f"Agent error: {e}")
-                    return f"Error processing your request: {str(e)}"
+        with span("turn", session_id=session_id):
+            async with get_pool().checkout() as worker:
+                return await answer_turn(worker, user_input, session_id)
                     
     except Exception as e:
         logger.error(f"Session error: {e}")
@@ -140,10 +349,14 @@ async def process_message(user_input: str) -> str:
 
 async def main():
     """Main function for standalone use"""
+    session_id = os.getenv("CHAT_SESSION_ID", DEFAULT_SESSION_ID)
+    # A console session is a single conversation, one warm worker is enough
+    get_pool(size=1)
     if len(sys.argv) > 1:
         user_input = " ".join(sys.argv[1:])
-        response = await process_message(user_input)
+        response = await process_message(user_input, session_id)
         print(response)
+        await close_pool()
     else:
         while True:
             try:
@@ -153,11 +366,12 @@ async def main():
                 if user_input.lower() in {"exit", "quit", "q"}:
                     break
 
-                response = await process_message(user_input)
+                response = await process_message(user_input, session_id)
                 print("Agent:", response)
 
             except Exception as e:
                 print(f"Error: {e}")
+        await close_pool()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,84 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.logging import setup_logger
+
+BLOCKING_IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", "8"))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "50"))
+
+logger = setup_logger("event-loop")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Bounded pool for disk, Redis and lock waits that must not run on the event loop"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io")
+        return _executor
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run ``fn(*args, **kwargs)`` on the blocking-I/O pool, keeping the caller's context vars"""
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), call)
+
+
+class LoopLagMonitor:
+    """Wakes up every ``interval`` and reports when the loop was late by more than ``threshold``.
+
+    A late wake-up means something ran on the event loop thread for that long
+    without yielding, stalling every other request on it.
+    """
+
+    def __init__(self, name: str, threshold_ms: float = LOOP_LAG_THRESHOLD_MS,
+                 interval_ms: float = LOOP_LAG_INTERVAL_MS):
+        self.name = name
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name=f"loop-lag-{self.name}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                logger.warning("%s event loop stalled for %.0f ms", self.name, lag * 1000)
+
+    def stats(self) -> dict:
+        return {
+            "stalls": self.stalls,
+            "threshold_ms": self.threshold * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+        }
@@ -1,29 +1,235 @@
+"""Per-component loggers behind one background writer.
+
+``setup_logger`` returns a logger whose records go onto a queue; a single
+``QueueListener`` thread per process formats them and writes them to
+``logs/<name>.log`` (JSON lines by default, ``LOG_FORMAT=text`` for the old
+layout) and, from INFO up, to the console. The caller only pays for:
+
+- ``%`` formatting, which is deferred to the writer thread. String arguments
+  are first cut to ``LOG_MAX_FIELD_CHARS`` and over-long containers replaced
+  by a bounded repr, so a long conversation history costs the same as a
+  short one.
+- Sampling of DEBUG records: only one in ``LOG_DEBUG_SAMPLE_EVERY`` of each
+  message template is kept. A call site can override that with
+  ``extra={"sample_every": n}``.
+- A full queue (``LOG_QUEUE_SIZE``), which drops records rather than blocking.
+
+Files rotate at ``LOG_MAX_BYTES``, or on ``LOG_ROTATE_WHEN`` (e.g. ``midnight``)
+when that is set, keeping ``LOG_BACKUP_COUNT`` old files.
+"""
+import atexit
+import datetime
+import json
 import logging
+import numbers
 import os
+import queue
+import reprlib
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
 
-def setup_logger(log_file_name):
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "2000"))
+LOG_DEBUG_SAMPLE_EVERY = int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "10"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
 
-    log_file = os.path.join(log_dir, f"{log_file_name}.log")
-    
-    logger = logging.getLogger(log_file_name)
-    logger.setLevel(logging.DEBUG)
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Attributes every LogRecord has; anything else on a record came from ``extra``
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "sample_every"}
+
+_repr = reprlib.Repr()
+_repr.maxstring = _repr.maxother = LOG_MAX_FIELD_CHARS
+_repr.maxlist = _repr.maxtuple = _repr.maxdict = _repr.maxset = 20
+_repr.maxlevel = 3
+_CONTAINERS = (list, tuple, dict, set, frozenset)
+
+
+def _too_long(value) -> bool:
+    if len(value) > _repr.maxlist:
+        return True
+    items = value.values() if isinstance(value, dict) else value
+    return any(isinstance(item, str) and len(item) > LOG_MAX_FIELD_CHARS or isinstance(item, _CONTAINERS) for item in items)
+
+
+def truncate(value):
+    """Bounded-cost stand-in for ``value`` in a log record.
+
+    Long strings are cut and over-long containers become a bounded repr; numbers
+    (numpy scalars included), exceptions and everything else pass through, so
+    ``%d`` and ``%s`` format them as usual.
+    """
+    if isinstance(value, str):
+        if len(value) <= LOG_MAX_FIELD_CHARS:
+            return value
+        return f"{value[:LOG_MAX_FIELD_CHARS]}... [{len(value) - LOG_MAX_FIELD_CHARS} more chars]"
+    if isinstance(value, _CONTAINERS) and _too_long(value):
+        return _repr.repr(value)
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    return truncate(str(value))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, trace ids and any ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = truncate(value) if isinstance(value, str) else value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=_json_default)
+
+
+class DebugSampler(logging.Filter):
+    """Keeps the first of every ``sample_every`` DEBUG records per logger and message template"""
+
+    def __init__(self, every: int = LOG_DEBUG_SAMPLE_EVERY):
+        super().__init__()
+        self.every = every
+        self._seen: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every = getattr(record, "sample_every", self.every)
+        if record.levelno > logging.DEBUG or every <= 1:
+            return True
+        key = (record.name, str(record.msg))
+        with self._lock:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+        if seen % every:
+            return False
+        record.sampled = every
+        return True
 
-    if not logger.handlers:
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(logging.DEBUG)
 
+class DeferredQueueHandler(QueueHandler):
+    """Enqueues records without formatting them.
+
+    ``QueueHandler`` renders the message on the calling thread; this only
+    truncates the arguments, captures the current trace ids and renders any
+    traceback, leaving ``msg % args`` to the writer thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        if isinstance(record.args, dict):
+            record.args = {key: truncate(value) for key, value in record.args.items()}
+        elif record.args:
+            record.args = tuple(truncate(arg) for arg in record.args)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        # Looked up rather than imported: config.tracing imports this module
+        tracing = sys.modules.get("config.tracing")
+        current = tracing.current_span() if tracing else None
+        if current is not None and not hasattr(record, "trace_id"):
+            record.trace_id, record.span_id = current.trace_id, current.span_id
+        if self.dropped:
+            record.dropped_before, self.dropped = self.dropped, 0
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _FileRouter(logging.Handler):
+    """Sends each record to the file of the logger that produced it"""
+
+    def __init__(self):
+        super().__init__()
+        self.files: dict[str, logging.Handler] = {}
+
+    def handle(self, record: logging.LogRecord):
+        handler = self.files.get(record.name)
+        if handler is not None:
+            handler.handle(record)
+
+    def close(self):
+        for handler in self.files.values():
+            handler.close()
+        super().close()
+
+
+def _file_handler(path: str) -> logging.Handler:
+    if LOG_ROTATE_WHEN:
+        handler = TimedRotatingFileHandler(path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, delay=True)
+    else:
+        handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True)
+    handler.setLevel(logging.DEBUG)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+_router = _FileRouter()
+_listener: QueueListener | None = None
+_handler: DeferredQueueHandler | None = None
+_setup_lock = threading.Lock()
+
+
+def _queue_handler() -> DeferredQueueHandler:
+    """The process-wide queue handler, starting its writer thread on first use"""
+    global _listener, _handler
+    if _handler is None:
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        _listener = QueueListener(_queue, _router, console_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(flush_logs)
+        _handler = DeferredQueueHandler(_queue)
+        _handler.addFilter(DebugSampler())
+    return _handler
+
 
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
+def flush_logs():
+    """Write out everything queued and stop the writer thread"""
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _router.close()
+            _listener = _handler = None
+
+
+def setup_logger(log_file_name):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logger = logging.getLogger(log_file_name)
+    logger.setLevel(logging.DEBUG)
+    # Root handlers (FastMCP installs one) would format on the caller's thread and print twice
+    logger.propagate = False
 
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+    with _setup_lock:
+        if not logger.handlers:
+            _router.files[log_file_name] = _file_handler(os.path.join(LOG_DIR, f"{log_file_name}.log"))
+            logger.addHandler(_queue_handler())
 
     return logger
 
@@ -36,7 +242,7 @@ def log_exception(logger, exception, message):
         Exception: logging.ERROR
     }
     log_level = exception_level_map.get(type(exception), logging.ERROR)
-    logger.log(log_level, f"{message}: {str(exception)}")
+    logger.log(log_level, "%s: %s", message, exception)
 
 if __name__ == "__main__":
     logger = setup_logger("auto_level_app")
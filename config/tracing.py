@@ -0,0 +1,274 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from langchain_core.callbacks import BaseCallbackHandler
+from mcp.server.fastmcp import FastMCP
+
+from config.logging import setup_logger
+
+TRACE_SPANS = os.getenv("TRACE_SPANS", "1") == "1"
+METRICS_PREFIX = "hotelhive"
+METRICS_URI = "metrics://snapshot"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+logger = setup_logger("traces")
+
+
+# Metrics
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"type": "counter", "help": self.help, "labels": list(self.labels),
+                    "series": [[list(key), value] for key, value in self.values.items()]}
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, tuple(buckets)
+        # Per label set: [count per bucket (last is +Inf), sum]
+        self.values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self.values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[i] += 1
+            self.values[key] = [counts, total + value]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"type": "histogram", "help": self.help, "labels": list(self.labels), "buckets": list(self.buckets),
+                    "series": [[list(key), list(counts), total] for key, (counts, total) in self.values.items()]}
+
+
+class MetricsRegistry:
+    """Process-wide counters and histograms, exported as JSON or Prometheus text"""
+
+    def __init__(self):
+        self.metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels: tuple[str, ...], **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labels, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._get(Counter, f"{METRICS_PREFIX}_{name}", help, labels)
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, f"{METRICS_PREFIX}_{name}", help, labels, buckets=buckets)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self.metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+def _label_text(names: list[str], values: list[str]) -> str:
+    pairs = [f'{n}="{str(v)}"'.replace("\n", " ") for n, v in zip(names, values) if v != ""]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render_prometheus(snapshots: list[tuple[dict, dict]]) -> str:
+    """Prometheus text format for ``(extra labels, registry snapshot)`` pairs, one pair per process"""
+    merged: dict[str, list] = {}
+    for extra, snapshot in snapshots:
+        for name, metric in snapshot.items():
+            merged.setdefault(name, []).append((extra, metric))
+    lines = []
+    for name in sorted(merged):
+        first = merged[name][0][1]
+        lines.append(f"# HELP {name} {first['help']}")
+        lines.append(f"# TYPE {name} {first['type']}")
+        for extra, metric in merged[name]:
+            names = list(metric["labels"]) + list(extra)
+            for series in metric["series"]:
+                values = list(series[0]) + list(extra.values())
+                if metric["type"] == "counter":
+                    lines.append(f"{name}{_label_text(names, values)} {series[1]:g}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(metric["buckets"]) + ["+Inf"], series[1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_label_text(names + ['le'], values + [f'{bound:g}' if bound != '+Inf' else bound])} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(names, values)} {series[2]:.6f}")
+                lines.append(f"{name}_count{_label_text(names, values)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+span_seconds = registry.histogram("span_seconds", "Duration of each traced stage", ("span",))
+llm_seconds = registry.histogram("llm_call_seconds", "LLM call latency", ("model",))
+llm_tokens = registry.counter("llm_tokens_total", "LLM tokens used", ("model", "kind"))
+cache_requests = registry.counter("cache_requests_total", "Cache lookups by outcome", ("cache", "result"))
+
+
+def record_cache(cache: str, result: str):
+    cache_requests.inc(cache=cache, result=result)
+
+
+# Spans
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    attributes: dict = field(default_factory=dict)
+    start: float = field(default_factory=time.perf_counter)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def traceparent(self) -> str:
+        """W3C trace context of this span, for the next hop to continue the trace"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str] | None:
+    """``(trace_id, parent span_id)`` from a W3C traceparent header, None if malformed"""
+    parts = (value or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+@contextmanager
+def span(name: str, traceparent: str | None = None, **attributes):
+    """Time a stage as a child of the current span (or of ``traceparent`` from another process).
+
+    The duration goes to the ``span_seconds`` histogram and, with
+    ``TRACE_SPANS``, the span itself to ``logs/traces.log``.
+    """
+    parent = _current.get()
+    remote = parse_traceparent(traceparent)
+    if remote is not None:
+        trace_id, parent_id = remote
+    elif parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+    current = Span(name, trace_id, secrets.token_hex(8), parent_id, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass  # an async generator closed from another context
+        elapsed = time.perf_counter() - current.start
+        span_seconds.observe(elapsed, span=name)
+        if TRACE_SPANS:
+            # Traces must stay whole, so spans are exempt from debug sampling
+            logger.debug("span %s %.2fms", name, elapsed * 1000, extra={
+                "trace_id": current.trace_id, "span_id": current.span_id, "parent_id": current.parent_id,
+                "duration_ms": round(elapsed * 1000, 2), "attributes": current.attributes, "sample_every": 1,
+            })
+
+
+def traced(name: str | None = None):
+    """Decorator form of ``span`` for sync and async functions"""
+    def decorate(fn):
+        label = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with span(label):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with span(label):
+                    return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Times every chat model call and counts its tokens, in whichever process runs it"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._started: dict = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is not None:
+            llm_seconds.observe(time.perf_counter() - started, model=self.model)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                for kind in ("input_tokens", "output_tokens"):
+                    if usage.get(kind):
+                        llm_tokens.inc(usage[kind], model=self.model, kind=kind.split("_")[0])
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._started.pop(run_id, None)
+
+
+class TracedFastMCP(FastMCP):
+    """FastMCP server whose tool calls continue the caller's trace.
+
+    The client puts its span's ``traceparent`` in the request ``_meta``; each
+    tool then runs inside a ``tool.<name>`` span of that trace. The process's
+    metrics are served as JSON at ``METRICS_URI``, a resource rather than a
+    tool, so the LLM never sees it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resource(METRICS_URI, name="metrics", mime_type="application/json")(lambda: json.dumps(registry.snapshot()))
+
+    async def call_tool(self, name: str, arguments: dict):
+        meta = self.get_context().request_context.meta
+        with span(f"tool.{name}", traceparent=getattr(meta, "traceparent", None)):
+            return await super().call_tool(name, arguments)
@@ -0,0 +1,276 @@
+import datetime
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from server.search_filter import HotelCatalog
+from server.snapshot import load_frame
+from server.text_index import TextIndex
+
+ROUTER_ENABLED = os.getenv("INTENT_ROUTER", "1") == "1"
+CLASSIFIER_ENABLED = os.getenv("INTENT_ROUTER_CLASSIFIER", "0") == "1"
+CLASSIFIER_THRESHOLD = float(os.getenv("INTENT_ROUTER_CLASSIFIER_THRESHOLD", "0.85"))
+HOTELS_FILE = "./data/hotels.xlsx"
+
+_GREETING = re.compile(
+    r"^\s*(hi|hello|hey|hiya|howdy|good (morning|afternoon|evening)|thanks|thank you|bye|goodbye)"
+    r"\b[\s,]*(there|team|hotelhive)?[\s!.]*$"
+)
+_BOOK = re.compile(r"\b(book|reserve|reservation)\b")
+# Negated, conditional or question-form booking messages are not instructions to book
+_NOT_A_BOOKING = re.compile(
+    r"\b(do not|don['\u2019]?t|never|cancel|should i|shall i|should we|if|unless|whether)\b|\?\s*$"
+)
+_AVAILABILITY = re.compile(r"\b(available|availability|vacanc(y|ies)|free rooms?|open rooms?)\b")
+_SEARCH = re.compile(r"\b(hotels?|stays?|rooms?|places?|accommodations?|lodging)\b")
+# References that only make sense with the conversation so far
+_FOLLOW_UP = re.compile(r"\b(it|that one|this one|those|them|the same|first one|second one|the above|previous|instead)\b")
+_DATE = re.compile(r"\b(\d{4}-\d{1,2}-\d{1,2})\b")
+_GUEST = re.compile(
+    r"\b(?:for|guest(?: name)?(?: is)?|name is|under(?: the name(?: of)?)?)\s+"
+    r"([A-Z][a-zA-Z'-]+(?:\s+[A-Z][a-zA-Z'-]+)+)"
+)
+
+# Seed examples for the optional classifier; rules still extract the arguments
+_TRAINING = {
+    "greeting": [
+        "hi", "hello there", "hey", "good morning", "good evening team", "thanks a lot", "thank you so much",
+        "hello how are you", "hey whats up", "bye", "see you later", "cheers", "nice to meet you",
+    ],
+    "search": [
+        "hotels in chicago", "find me a hotel in miami", "cheap stays in texas", "suggest hotels under 150 in chicago",
+        "any hotels with a pool in austin", "list all hotels in miami", "where can i stay in denver",
+        "show rooms in king county", "luxury hotel in new york with spa", "budget places to stay in ohio",
+        "i need a room in seattle", "looking for accommodation in boston",
+    ],
+    "other": [
+        "what can you do", "tell me about your services", "how do i cancel", "what about the second one",
+        "yes please", "no thanks i changed my mind", "book it", "what is the refund policy", "can you help me",
+        "is breakfast included there", "same dates as before", "my name is john",
+    ],
+}
+
+
+def _features(text: str) -> list[str]:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesClassifier:
+    """Tiny multinomial naive Bayes over word uni/bigrams; CPU-only, trains in microseconds"""
+
+    def __init__(self, examples: dict[str, list[str]] = _TRAINING):
+        self.labels = list(examples)
+        self.counts = {label: Counter() for label in self.labels}
+        self.totals = {}
+        self.priors = {}
+        total_examples = sum(len(v) for v in examples.values())
+        for label, texts in examples.items():
+            for text in texts:
+                self.counts[label].update(_features(text))
+            self.totals[label] = sum(self.counts[label].values())
+            self.priors[label] = math.log(len(texts) / total_examples)
+        self.vocabulary = len(set().union(*self.counts.values()))
+
+    def predict(self, text: str) -> tuple[str, float]:
+        features = _features(text)
+        scores = {
+            label: self.priors[label] + sum(
+                math.log((self.counts[label][f] + 1) / (self.totals[label] + self.vocabulary)) for f in features
+            )
+            for label in self.labels
+        }
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1.0 / norm
+
+
+@dataclass
+class Route:
+    """A tool call decided without the LLM"""
+
+    name: str
+    tool: str
+    arguments: dict
+    source: str = "rules"
+    confidence: float = 1.0
+
+
+@dataclass
+class RouterStats:
+    """Per-route hit counts and latencies, against the ReAct fallback"""
+
+    hits: Counter = field(default_factory=Counter)
+    route_seconds: dict = field(default_factory=lambda: defaultdict(float))
+    fallbacks: int = 0
+    fallback_seconds: float = 0.0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def record_route(self, name: str, seconds: float):
+        with self._lock:
+            self.hits[name] += 1
+            self.route_seconds[name] += seconds
+
+    def record_fallback(self, seconds: float):
+        with self._lock:
+            self.fallbacks += 1
+            self.fallback_seconds += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routed = sum(self.hits.values())
+            turns = routed + self.fallbacks
+            agent_avg = self.fallback_seconds / self.fallbacks if self.fallbacks else None
+            routes = {}
+            saved = 0.0
+            for name, hits in self.hits.items():
+                avg = self.route_seconds[name] / hits
+                routes[name] = {"hits": hits, "hit_rate": round(hits / turns, 3), "avg_ms": round(avg * 1000, 1)}
+                if agent_avg is not None:
+                    saved += hits * (agent_avg - avg)
+            return {
+                "turns": turns,
+                "routed": routed,
+                "fallbacks": self.fallbacks,
+                "hit_rate": round(routed / turns, 3) if turns else 0.0,
+                "agent_avg_ms": round(agent_avg * 1000, 1) if agent_avg is not None else None,
+                "latency_saved_sec": round(saved, 3) if agent_avg is not None else None,
+                "routes": routes,
+            }
+
+
+class IntentRouter:
+    """Picks the MCP tool and its arguments straight from a message when it can.
+
+    Only messages that carry everything a tool needs are routed; anything that
+    leans on earlier turns (missing dates, "the second one", ...) returns
+    ``None`` and goes to the ReAct agent, which reads the history.
+    """
+
+    def __init__(self, catalog: HotelCatalog, classifier: NaiveBayesClassifier | None = None,
+                 threshold: float = CLASSIFIER_THRESHOLD):
+        self.catalog = catalog
+        self.classifier = classifier
+        self.threshold = threshold
+        self.stats = RouterStats()
+
+    @classmethod
+    def from_data(cls) -> "IntentRouter":
+        classifier = NaiveBayesClassifier() if CLASSIFIER_ENABLED else None
+        frame = load_frame(HOTELS_FILE)
+        return cls(HotelCatalog(frame, TextIndex.load_or_build(HOTELS_FILE, frame)), classifier)
+
+    def _hotel_display(self, hotel: str) -> str:
+        return self.catalog.records[self.catalog.by_hotel[hotel][0]]["Hotel_Name"]
+
+    def _room_display(self, room_type: str) -> str:
+        return self.catalog.records[self.catalog.by_room_type[room_type][0]]["Room_Type"]
+
+    @staticmethod
+    def _stay(message: str) -> tuple[str, str] | None:
+        dates = []
+        for value in _DATE.findall(message):
+            try:
+                dates.append(datetime.datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d"))
+            except ValueError:
+                return None
+        if len(dates) != 2 or dates[0] >= dates[1]:
+            return None
+        return dates[0], dates[1]
+
+    def route(self, message: str) -> Route | None:
+        text = message.strip().lower()
+        if not text:
+            return None
+        if _GREETING.match(text):
+            return Route("greeting", "conversation_assistant", {"user_message": message})
+        if _FOLLOW_UP.search(text):
+            return None
+
+        query = self.catalog.parse(message)
+        if _BOOK.search(text):
+            if _NOT_A_BOOKING.search(text):
+                return None
+            stay = self._stay(message)
+            guest = _GUEST.search(message)
+            if len(query.hotel_names) == 1 and len(query.room_types) == 1 and stay and guest:
+                return Route("booking", "create_booking", {
+                    "booking_request": message,
+                    "hotel_name": self._hotel_display(query.hotel_names[0]),
+                    "room_type": self._room_display(query.room_types[0]),
+                    "check_in": stay[0],
+                    "check_out": stay[1],
+                    "guest_name": guest.group(1),
+                })
+            return None
+        if _AVAILABILITY.search(text) and len(query.hotel_names) == 1:
+            return Route("availability", "hotel_availability", {
+                "question": message, "hotel_name": self._hotel_display(query.hotel_names[0]),
+            })
+        # Month names and "next week" need the LLM to turn them into a date window
+        if _AVAILABILITY.search(text) and len(query.hotel_names) > 1 and _DATE.search(message):
+            return Route("batch_availability", "batch_availability", {
+                "question": message, "hotel_names": [self._hotel_display(hotel) for hotel in query.hotel_names],
+                "room_types": [self._room_display(room_type) for room_type in query.room_types],
+            })
+        if query.hotel_names:
+            return None
+        if (query.locations or query.counties) and _SEARCH.search(text):
+            return Route("search", "hotel_search", {"question": message})
+
+        if self.classifier is not None:
+            label, confidence = self.classifier.predict(text)
+            if confidence >= self.threshold:
+                if label == "greeting":
+                    return Route("greeting", "conversation_assistant", {"user_message": message},
+                                 source="classifier", confidence=confidence)
+                if label == "search" and (query.locations or query.counties):
+                    return Route("search", "hotel_search", {"question": message},
+                                 source="classifier", confidence=confidence)
+        return None
+
+
+def render_tool_output(output) -> tuple[str, bool]:
+    """Reply text for a tool result, and whether the tool already saved it to session memory.
+
+    Tools record their answers themselves, except errors and the "nothing
+    found" suggestions, which the caller has to save.
+    """
+    if isinstance(output, list):
+        output = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in output)
+    try:
+        result = json.loads(output) if isinstance(output, str) else output
+    except ValueError:
+        return output, True
+    if not isinstance(result, dict):
+        return output if isinstance(output, str) else json.dumps(result), True
+    if "error" in result:
+        text = f"Sorry, {result['error']}"
+        if result.get("suggestions"):
+            text += f" {result['suggestions']}"
+        return text, False
+    if "booking_confirmation" in result:
+        booking_id = (result.get("booking_details") or {}).get("booking_id")
+        return result["booking_confirmation"] + (f"\n\nBooking ID: {booking_id}" if booking_id else ""), True
+    if "message" in result:
+        text = " ".join(str(result[k]) for k in ("message", "suggestions") if result.get(k))
+        return text, "suggestions" not in result
+    return json.dumps(result), True
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> IntentRouter:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = IntentRouter.from_data()
+        return _router
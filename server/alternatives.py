@@ -0,0 +1,159 @@
+import os
+import numpy as np
+
+from server.inventory import InventoryIndex, normalize, to_day
+from server.search_filter import HotelCatalog
+from server.structured_responses import format_money, room_prices, stay_nights
+
+FLEX_DAYS = int(os.getenv("ALTERNATIVE_FLEX_DAYS", "14"))
+ALTERNATIVE_LIMIT = int(os.getenv("ALTERNATIVE_LIMIT", "5"))
+
+
+class AlternativesEngine:
+    """Nearest bookable options for a stay that cannot be booked as asked.
+
+    For the requested hotel, room type and dates it finds, in one
+    ``InventoryIndex.stay_matrix`` pass over check-in days within
+    ``flex_days`` of the original:
+
+    - other dates: the same room (any room type if none was asked), closest check-in first
+    - other room types at the same hotel on the same dates
+    - the same room type at other hotels in the same City, then the same County
+
+    Without a room type (or one the hotel does not list), any of the hotel's
+    rooms will do and the nearby hotels offer their cheapest free room.
+    Check-ins before ``as_of`` are never suggested.
+    """
+
+    def __init__(self, inventory: InventoryIndex, catalog: HotelCatalog, as_of=None,
+                 flex_days: int = FLEX_DAYS, limit: int = ALTERNATIVE_LIMIT):
+        self.inventory = inventory
+        self.catalog = catalog
+        self.as_of = to_day(as_of) if as_of is not None else None
+        self.flex_days = flex_days
+        self.limit = limit
+
+    def _nearby(self, hotel: str) -> list[tuple[str, str]]:
+        """(hotel, "city"|"county") for the other hotels near ``hotel``, same City first"""
+        rows = self.catalog.by_hotel.get(normalize(hotel))
+        if rows is None or not len(rows):
+            return []
+        record = self.catalog.records[rows[0]]
+        nearby = {}
+        for match, column, lookup in (("city", "City", self.catalog.by_city), ("county", "County", self.catalog.by_county)):
+            for row in lookup.get(normalize(record[column]), []):
+                name = str(self.catalog.records[row]["Hotel_Name"]).strip()
+                if normalize(name) != normalize(hotel) and self.inventory.has_hotel(name):
+                    nearby.setdefault(name, match)
+        return list(nearby.items())
+
+    def _option(self, hotel: str, room_type: str, rooms: int, prices: dict, nights: int) -> dict:
+        price = prices.get(normalize(room_type))
+        return {
+            "hotel_name": hotel,
+            "room_type": room_type,
+            "rooms": int(rooms),
+            "price_per_night": price,
+            "total_price": price * nights if price is not None else None,
+        }
+
+    def suggest(self, hotel_name: str, room_type: str | None, check_in, check_out, rooms: int = 1) -> dict:
+        nights = stay_nights(check_in, check_out)
+        if nights <= 0:
+            return {"error": "Check-out date must be after check-in date"}
+        if not self.inventory.has_hotel(hotel_name):
+            return {"error": f"Hotel {hotel_name} not found"}
+        hotel_types = self.inventory.room_types(hotel_name)
+        # A room type the hotel does not list is treated as no preference
+        asked = next((r for r in hotel_types if room_type and normalize(r) == normalize(room_type)), None)
+
+        requested = [(hotel_name, asked)] if asked else [(hotel_name, r) for r in hotel_types]
+        others = [(hotel_name, r) for r in hotel_types if asked and r != asked]
+        nearby = self._nearby(hotel_name)
+        nearby_pairs = [
+            (hotel, r) for hotel, _ in nearby for r in self.inventory.room_types(hotel)
+            if not asked or normalize(r) == normalize(asked)
+        ]
+        pairs = requested + others + nearby_pairs
+
+        first = to_day(check_in) - self.flex_days
+        matrix = self.inventory.stay_matrix(pairs, first, to_day(check_in) + self.flex_days, nights)
+        on_dates = matrix[:, self.flex_days]
+        prices = {hotel: room_prices(self.catalog, hotel) for hotel in {hotel_name, *(h for h, _ in nearby)}}
+
+        # Closest check-in first, later before earlier on ties
+        shifts = np.arange(matrix.shape[1]) - self.flex_days
+        best = matrix[:len(requested)].max(axis=0)
+        feasible = np.flatnonzero((best >= rooms) & (shifts != 0))
+        if self.as_of is not None:
+            feasible = feasible[first + feasible >= self.as_of]
+        closest = sorted(feasible, key=lambda d: (abs(shifts[d]), -shifts[d]))[:self.limit]
+        other_dates = []
+        for day in closest:
+            row = int(matrix[:len(requested), day].argmax())
+            start = first + int(day)
+            other_dates.append({
+                **self._option(hotel_name, requested[row][1], matrix[row, day], prices[hotel_name], nights),
+                "check_in": str(start),
+                "check_out": str(start + nights),
+                "shift_days": int(shifts[day]),
+            })
+
+        offset = len(requested)
+        other_room_types = sorted(
+            (
+                self._option(hotel_name, r, on_dates[offset + i], prices[hotel_name], nights)
+                for i, (_, r) in enumerate(others) if on_dates[offset + i] >= rooms
+            ),
+            key=lambda option: (option["total_price"] is None, option["total_price"] or 0),
+        )[:self.limit]
+
+        offset += len(others)
+        match_of = dict(nearby)
+        cheapest: dict[str, dict] = {}
+        for i, (hotel, r) in enumerate(nearby_pairs):
+            if on_dates[offset + i] < rooms:
+                continue
+            option = {**self._option(hotel, r, on_dates[offset + i], prices[hotel], nights), "match": match_of[hotel]}
+            current = cheapest.get(hotel)
+            if current is None or (option["total_price"] or np.inf) < (current["total_price"] or np.inf):
+                cheapest[hotel] = option
+        nearby_hotels = sorted(
+            cheapest.values(),
+            key=lambda option: (option["match"] != "city", option["total_price"] is None, option["total_price"] or 0),
+        )[:self.limit]
+
+        return {
+            "requested": {
+                "hotel_name": hotel_name, "room_type": asked, "check_in": str(to_day(check_in)),
+                "check_out": str(to_day(check_out)), "nights": nights, "rooms": rooms,
+            },
+            "other_dates": other_dates,
+            "other_room_types": other_room_types,
+            "nearby_hotels": nearby_hotels,
+            "flex_days": self.flex_days,
+        }
+
+
+def alternatives_message(alternatives: dict) -> str:
+    if "error" in alternatives:
+        return "Try different dates or another hotel."
+    parts = []
+    if alternatives["other_dates"]:
+        dates = ", ".join(
+            f"{option['check_in']} to {option['check_out']} ({option['room_type']}, {format_money(option['total_price'])})"
+            for option in alternatives["other_dates"][:3]
+        )
+        parts.append(f"Closest open dates: {dates}")
+    if alternatives["other_room_types"]:
+        rooms = ", ".join(f"{option['room_type']} ({format_money(option['total_price'])})" for option in alternatives["other_room_types"])
+        parts.append(f"Other rooms for your dates: {rooms}")
+    if alternatives["nearby_hotels"]:
+        hotels = ", ".join(
+            f"{option['hotel_name']} ({option['room_type']}, {format_money(option['total_price'])}, same {option['match']})"
+            for option in alternatives["nearby_hotels"][:3]
+        )
+        parts.append(f"Nearby for your dates: {hotels}")
+    if not parts:
+        return f"Nothing similar is free within {alternatives['flex_days']} days; try other dates or another city."
+    return ". ".join(parts) + "."
@@ -0,0 +1,358 @@
+import threading
+import numpy as np
+import pandas as pd
+
+from server.inventory import normalize, to_day
+
+PAYMENT_STATUSES = ["paid", "pending", "cancelled"]
+TOP_N = 10
+
+
+def _column(frame: pd.DataFrame, *names: str):
+    for name in names:
+        if name in frame:
+            return frame[name]
+    return pd.Series([None] * len(frame), index=frame.index)
+
+
+class BookingAnalytics:
+    """Precomputed rollups over all bookings, updated in place as bookings arrive.
+
+    Every booking is spread over the nights it covers, ``[check_in,
+    check_out)``, and cancelled bookings only count towards the payment mix.
+    Rollups:
+
+    - ``revenue[hotel, day]``: revenue earned per night
+    - ``room_nights[hotel, room_type, day]``: rooms occupied per night
+    - ``arrivals[hotel, day]``: bookings by check-in day
+    - ``room_bookings[hotel, room_type]``: bookings taken
+    - ``status_count`` and ``status_revenue[hotel, payment_status]``
+
+    The initial build is one vectorized pass over the workbook. New bookings
+    are only queued by ``add_bookings()``, which runs inside the journal lock,
+    and the next query folds them in at O(nights) each. A status change is
+    folded the same way, as the old booking taken out and the new one put
+    in. Only compact aggregates ever leave this class.
+    """
+
+    def __init__(self, frame: pd.DataFrame, price_lookup=None):
+        self.price_lookup = price_lookup
+        self._lock = threading.Lock()
+        self.hotels: dict[str, int] = {}
+        self.hotel_display: list[str] = []
+        self.room_types: dict[str, int] = {}
+        self.room_display: list[str] = []
+        self.start = np.datetime64("2025-01-01", "D")
+        self.revenue = np.zeros((0, 0))
+        self.room_nights = np.zeros((0, 0, 0), dtype=np.int32)
+        self.arrivals = np.zeros((0, 0), dtype=np.int32)
+        self.room_bookings = np.zeros((0, 0), dtype=np.int64)
+        self.status_count = np.zeros((0, len(PAYMENT_STATUSES)), dtype=np.int64)
+        self.status_revenue = np.zeros((0, len(PAYMENT_STATUSES)))
+        self.bookings = 0
+        self._pending: list[dict] = []
+        self._build(frame)
+
+    # Building and growing
+
+    def _normalized(self, frame: pd.DataFrame) -> dict:
+        """Columns of either the ``hotel_bookings`` workbook or journaled bookings"""
+        check_in = pd.to_datetime(_column(frame, "Check_In_Date", "check_in"), errors="coerce").to_numpy("datetime64[D]")
+        check_out = pd.to_datetime(_column(frame, "Check_Out_Date", "check_out"), errors="coerce").to_numpy("datetime64[D]")
+        hotels = _column(frame, "Hotel_Name", "hotel_name").map(normalize).to_numpy()
+        rooms = _column(frame, "Room_Type", "room_type").map(normalize).to_numpy()
+        payment = _column(frame, "Payment_Status", "payment_status").map(
+            lambda v: "pending" if v is None or pd.isna(v) else normalize(v)
+        ).to_numpy()
+        booking_status = _column(frame, "Status", "status").map(lambda v: "" if v is None or pd.isna(v) else normalize(v))
+        payment = np.where(booking_status.to_numpy() == "cancelled", "cancelled", payment)
+        price = pd.to_numeric(_column(frame, "Total_Price", "total_price"), errors="coerce").to_numpy(dtype=float, copy=True)
+        valid = ~np.isnat(check_in) & ~np.isnat(check_out) & (check_out > check_in)
+        nights = np.where(valid, (check_out - check_in).astype("timedelta64[D]").astype(np.int64), 0)
+        if self.price_lookup is not None and np.isnan(price).any():
+            missing = np.flatnonzero(np.isnan(price) & valid)
+            for i in missing:
+                nightly = self.price_lookup(hotels[i], rooms[i])
+                price[i] = nightly * nights[i] if nightly is not None else np.nan
+        price = np.nan_to_num(price)
+
+        for key, display in zip(hotels, _column(frame, "Hotel_Name", "hotel_name")):
+            if key not in self.hotels:
+                self.hotels[key] = len(self.hotels)
+                self.hotel_display.append(str(display))
+        for key, display in zip(rooms, _column(frame, "Room_Type", "room_type")):
+            if key not in self.room_types:
+                self.room_types[key] = len(self.room_types)
+                self.room_display.append(str(display))
+        status = np.array([PAYMENT_STATUSES.index(p) if p in PAYMENT_STATUSES else 1 for p in payment], dtype=np.int64)
+        return {
+            "hotel": np.array([self.hotels[h] for h in hotels], dtype=np.int64),
+            "room": np.array([self.room_types[r] for r in rooms], dtype=np.int64),
+            "check_in": check_in, "check_out": check_out, "nights": nights,
+            "price": price, "status": status, "valid": valid,
+            # -1 takes a booking back out of the rollups (see restate())
+            "weight": pd.to_numeric(_column(frame, "_weight"), errors="coerce").fillna(1).to_numpy(dtype=np.int64),
+        }
+
+    def _grow(self, first: np.datetime64, last: np.datetime64):
+        """Resize every rollup to cover all known hotels, room types and ``[first, last)``"""
+        days = self.revenue.shape[1]
+        end = self.start + days
+        new_start = min(self.start, first) if days else first
+        new_end = max(end, last) if days else last
+        before = int((self.start - new_start) // np.timedelta64(1, "D")) if days else 0
+        total = int((new_end - new_start) // np.timedelta64(1, "D"))
+        after = total - days - before
+        hotels, rooms = len(self.hotels), len(self.room_types)
+        grow_h = hotels - self.revenue.shape[0]
+        grow_r = rooms - self.room_nights.shape[1]
+        if before or after or grow_h or grow_r:
+            self.revenue = np.pad(self.revenue, ((0, grow_h), (before, after)))
+            self.arrivals = np.pad(self.arrivals, ((0, grow_h), (before, after)))
+            self.room_bookings = np.pad(self.room_bookings, ((0, grow_h), (0, grow_r)))
+            self.room_nights = np.pad(self.room_nights, ((0, grow_h), (0, grow_r), (before, after)))
+            self.status_count = np.pad(self.status_count, ((0, grow_h), (0, 0)))
+            self.status_revenue = np.pad(self.status_revenue, ((0, grow_h), (0, 0)))
+            self.start = new_start
+
+    def _build(self, frame: pd.DataFrame):
+        cols = self._normalized(frame)
+        valid = cols["valid"]
+        if not valid.any():
+            return
+        self._grow(cols["check_in"][valid].min(), cols["check_out"][valid].max())
+        self._add(cols)
+
+    def _add(self, cols: dict):
+        valid = cols["valid"]
+        h, s, price, w = cols["hotel"], cols["status"], cols["price"], cols["weight"]
+        np.add.at(self.status_count, (h[valid], s[valid]), w[valid])
+        np.add.at(self.status_revenue, (h[valid], s[valid]), w[valid] * price[valid])
+        self.bookings += int(w[valid].sum())
+
+        active = valid & (s != PAYMENT_STATUSES.index("cancelled"))
+        h, r, w = h[active], cols["room"][active], w[active]
+        lo = ((cols["check_in"][active] - self.start) // np.timedelta64(1, "D")).astype(np.int64)
+        hi = ((cols["check_out"][active] - self.start) // np.timedelta64(1, "D")).astype(np.int64)
+        rate = w * price[active] / cols["nights"][active]
+        days = self.revenue.shape[1]
+
+        if len(h) > 32:
+            revenue = np.zeros((self.revenue.shape[0], days + 1))
+            np.add.at(revenue, (h, lo), rate)
+            np.add.at(revenue, (h, hi), -rate)
+            self.revenue += np.cumsum(revenue, axis=1)[:, :days]
+            nights = np.zeros(self.room_nights.shape[:2] + (days + 1,), dtype=np.int32)
+            np.add.at(nights, (h, r, lo), w)
+            np.add.at(nights, (h, r, hi), -w)
+            self.room_nights += np.cumsum(nights, axis=2, dtype=np.int32)[:, :, :days]
+        else:
+            for i in range(len(h)):
+                self.revenue[h[i], lo[i]:hi[i]] += rate[i]
+                self.room_nights[h[i], r[i], lo[i]:hi[i]] += w[i]
+        np.add.at(self.arrivals, (h, lo), w)
+        np.add.at(self.room_bookings, (h, r), w)
+
+    def add_bookings(self, bookings: list[dict]):
+        """Queue new bookings (journal form: hotel_name, room_type, check_in, ...) for the rollups"""
+        with self._lock:
+            self._pending.extend(bookings)
+
+    def restate(self, before: dict, after: dict):
+        """Queue a status change of one booking: ``before`` comes out of the rollups, ``after`` goes in"""
+        with self._lock:
+            self._pending.extend([{**before, "_weight": -1}, after])
+
+    def _fold_pending(self):
+        """Apply queued bookings; called with the lock held"""
+        if not self._pending:
+            return
+        bookings, self._pending = self._pending, []
+        cols = self._normalized(pd.DataFrame(bookings))
+        valid = cols["valid"]
+        if valid.any():
+            self._grow(cols["check_in"][valid].min(), cols["check_out"][valid].max())
+            self._add(cols)
+
+    # Queries
+
+    def _hotel_rows(self, hotel: str | None) -> np.ndarray:
+        if not hotel:
+            return np.arange(len(self.hotels))
+        row = self.hotels.get(normalize(hotel))
+        return np.array([], dtype=np.int64) if row is None else np.array([row])
+
+    def _day_range(self, start=None, end=None) -> tuple[int, int]:
+        days = self.revenue.shape[1]
+        lo = 0 if start is None else int(np.clip((to_day(start) - self.start) // np.timedelta64(1, "D"), 0, days))
+        hi = days if end is None else int(np.clip((to_day(end) - self.start) // np.timedelta64(1, "D"), lo, days))
+        return lo, hi
+
+    def _months(self, lo: int, hi: int) -> tuple[list[str], np.ndarray]:
+        """Month labels of days ``[lo, hi)`` and the offsets where each month starts"""
+        months = (self.start + np.arange(lo, hi)).astype("datetime64[M]")
+        if not len(months):
+            return [], np.array([], dtype=np.int64)
+        starts = np.flatnonzero(np.concatenate([[True], months[1:] != months[:-1]]))
+        return [str(m) for m in months[starts]], starts
+
+    def _status_mix(self, rows: np.ndarray) -> dict:
+        counts = self.status_count[rows].sum(axis=0)
+        revenue = self.status_revenue[rows].sum(axis=0)
+        return {
+            status: {"bookings": int(counts[i]), "revenue": round(float(revenue[i]), 2)}
+            for i, status in enumerate(PAYMENT_STATUSES)
+        }
+
+    def demand(self, keys: list[tuple[str, str]], start, days: int) -> tuple[np.ndarray, np.ndarray]:
+        """Room-nights sold on each of ``days`` nights from ``start`` and average bookings per day.
+
+        ``keys`` are normalized ``(hotel, room_type)`` pairs; unknown pairs get zeros.
+        """
+        with self._lock:
+            self._fold_pending()
+            hotels = np.array([self.hotels.get(h, -1) for h, _ in keys], dtype=np.int64)
+            rooms = np.array([self.room_types.get(r, -1) for _, r in keys], dtype=np.int64)
+            known = (hotels >= 0) & (rooms >= 0)
+            nights = np.zeros((len(keys), days), dtype=np.int32)
+            daily = np.zeros(len(keys))
+            span = self.revenue.shape[1]
+            if not span or not known.any():
+                return nights, daily
+            offset = int((to_day(start) - self.start) // np.timedelta64(1, "D"))
+            lo, hi = max(0, offset), min(span, offset + days)
+            if hi > lo:
+                nights[known, lo - offset:hi - offset] = self.room_nights[hotels[known], rooms[known], lo:hi]
+            daily[known] = self.room_bookings[hotels[known], rooms[known]] / span
+            return nights, daily
+
+    def series_history(self) -> tuple[list[tuple[str, str]], np.datetime64, np.ndarray]:
+        """Nightly room-nights sold per booked (hotel, room_type), up to the last arrival.
+
+        Returns the normalized keys, the first night and a ``[series, night]`` matrix.
+        """
+        with self._lock:
+            self._fold_pending()
+            hotels, rooms = np.nonzero(self.room_bookings)
+            arrived = np.flatnonzero(self.arrivals.sum(axis=0))
+            end = int(arrived[-1]) + 1 if len(arrived) else 0
+            names = {i: key for key, i in self.hotels.items()}
+            types = {i: key for key, i in self.room_types.items()}
+            keys = [(names[h], types[r]) for h, r in zip(hotels, rooms)]
+            return keys, self.start, self.room_nights[hotels, rooms, :end].astype(np.float64)
+
+    def hotel_analytics(self, hotel: str | None = None, start=None, end=None) -> dict:
+        """Revenue, room-nights, average daily rate, room-type popularity and payment mix"""
+        with self._lock:
+            self._fold_pending()
+            rows = self._hotel_rows(hotel)
+            if not len(rows):
+                return {"error": f"No bookings found for {hotel}"}
+            lo, hi = self._day_range(start, end)
+            revenue = self.revenue[rows, lo:hi].sum(axis=1)
+            nights = self.room_nights[rows, :, lo:hi].sum(axis=2)
+            by_room = nights.sum(axis=0)
+            total_nights = int(by_room.sum())
+            report = {
+                "scope": self.hotel_display[rows[0]] if hotel else f"all {len(rows)} hotels",
+                "period": {"from": str(self.start + lo), "to": str(self.start + hi)},
+                "bookings": int(self.status_count[rows].sum()),
+                "revenue": round(float(revenue.sum()), 2),
+                "room_nights": total_nights,
+                "average_daily_rate": round(float(revenue.sum()) / total_nights, 2) if total_nights else None,
+                "room_nights_by_type": {
+                    self.room_display[i]: {"room_nights": int(n), "share": round(n / total_nights, 3) if total_nights else 0.0}
+                    for i, n in sorted(enumerate(by_room), key=lambda item: -item[1])
+                },
+                "payment_status": self._status_mix(rows),
+            }
+            if not hotel:
+                top = np.argsort(-revenue)[:TOP_N]
+                report["top_hotels_by_revenue"] = [
+                    {"hotel": self.hotel_display[rows[i]], "revenue": round(float(revenue[i]), 2)} for i in top
+                ]
+            return report
+
+    def revenue_report(self, hotel: str | None = None, period: str = "month", start=None, end=None) -> dict:
+        """Revenue per day or month, optionally for one hotel and a date range"""
+        with self._lock:
+            self._fold_pending()
+            rows = self._hotel_rows(hotel)
+            if not len(rows):
+                return {"error": f"No bookings found for {hotel}"}
+            lo, hi = self._day_range(start, end)
+            daily = self.revenue[rows, lo:hi].sum(axis=0)
+            if period == "day":
+                # Keep the payload compact: at most the last 92 days of the range
+                lo = max(lo, hi - 92)
+                daily = self.revenue[rows, lo:hi].sum(axis=0)
+                series = {str(self.start + lo + i): round(float(v), 2) for i, v in enumerate(daily)}
+            else:
+                labels, starts = self._months(lo, hi)
+                sums = np.add.reduceat(daily, starts) if len(starts) else []
+                series = {label: round(float(v), 2) for label, v in zip(labels, sums)}
+            return {
+                "scope": self.hotel_display[rows[0]] if hotel else "all hotels",
+                "period": period,
+                "total_revenue": round(float(sum(series.values())), 2),
+                "revenue": series,
+                "payment_status": self._status_mix(rows),
+            }
+
+    def booking_trends(self, hotel: str | None = None) -> dict:
+        """Monthly arrivals and revenue with month-over-month change, busiest months and cancellations"""
+        with self._lock:
+            self._fold_pending()
+            rows = self._hotel_rows(hotel)
+            if not len(rows):
+                return {"error": f"No bookings found for {hotel}"}
+            days = self.revenue.shape[1]
+            labels, starts = self._months(0, days)
+            if not labels:
+                return {"error": "No bookings recorded yet"}
+            arrivals = np.add.reduceat(self.arrivals[rows].sum(axis=0), starts)
+            revenue = np.add.reduceat(self.revenue[rows].sum(axis=0), starts)
+            change = np.concatenate([[np.nan], np.diff(revenue) / np.where(revenue[:-1] == 0, np.nan, revenue[:-1])])
+            monthly = [
+                {
+                    "month": label,
+                    "arrivals": int(arrivals[i]),
+                    "revenue": round(float(revenue[i]), 2),
+                    "revenue_change": None if np.isnan(change[i]) else round(float(change[i]), 3),
+                }
+                for i, label in enumerate(labels)
+            ]
+            counts = self.status_count[rows].sum(axis=0)
+            by_room = self.room_nights[rows].sum(axis=(0, 2))
+            busiest = np.argsort(-arrivals)[:3]
+            return {
+                "scope": self.hotel_display[rows[0]] if hotel else "all hotels",
+                "monthly": monthly,
+                "busiest_months": [labels[i] for i in busiest],
+                "most_booked_room_types": [self.room_display[i] for i in np.argsort(-by_room)[:3]],
+                "cancellation_rate": round(float(counts[2] / counts.sum()), 3) if counts.sum() else 0.0,
+            }
+
+
+def location_availability(inventory, catalog, location: str, date=None) -> dict:
+    """Free rooms per hotel and room type on one night for every hotel in a city, county or state"""
+    place = catalog.locations.resolve(location)
+    if place is None or not len(place.rows):
+        return {"error": f"No hotels found in {location}"}
+    rows = place.rows
+    night = to_day(date) if date else inventory.start
+    hotels = {}
+    for row in rows:
+        record = catalog.records[row]
+        room = inventory.nightly(record["Hotel_Name"], record["Room_Type"], night, night + 1)
+        free = int(room[0]) if len(room) else 0
+        hotels.setdefault(record["Hotel_Name"], {})[record["Room_Type"]] = free
+    totals = {hotel: sum(rooms.values()) for hotel, rooms in hotels.items()}
+    return {
+        "location": catalog.locations.display.get(place.name, location),
+        "date": str(night),
+        "hotels": len(hotels),
+        "hotels_with_rooms": sum(1 for total in totals.values() if total > 0),
+        "free_rooms": int(sum(totals.values())),
+        "by_hotel": dict(sorted(hotels.items(), key=lambda item: -totals[item[0]])[:20]),
+    }
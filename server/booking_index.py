@@ -0,0 +1,144 @@
+import bisect
+import threading
+import numpy as np
+import pandas as pd
+
+# hotel_bookings.xlsx columns -> the journal's booking keys
+HISTORY_COLUMNS = {
+    "Booking_ID": "booking_id",
+    "Hotel_ID": "hotel_id",
+    "Hotel_Name": "hotel_name",
+    "Room_Type": "room_type",
+    "Guest_Name": "guest_name",
+    "Contact_Email": "contact_email",
+    "Check_In_Date": "check_in",
+    "Check_Out_Date": "check_out",
+    "Guests_Count": "guests_count",
+    "Total_Price": "total_price",
+    "Payment_Status": "payment_status",
+}
+SEARCH_FIELDS = ("guest_name", "contact_email")
+SEARCH_LIMIT = 10
+
+
+def booking_key(value) -> str:
+    return str(value).strip().upper()
+
+
+def search_key(value) -> str:
+    return "" if value is None or pd.isna(value) else " ".join(str(value).lower().split())
+
+
+def _plain(value):
+    """numpy scalars and NaN to JSON-friendly values"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+class BookingIndex:
+    """Lookups into the booking history and every booking made since.
+
+    Rows are numbered history first (``hotel_bookings.xlsx``, read through
+    its memory-mapped snapshot), then live bookings in arrival order.
+
+    - ``Booking_ID`` -> row is a hash index.
+    - Guest names and contact emails are kept as sorted arrays with their
+      rows, so an exact or prefix search is two binary searches. Live
+      bookings go to a small sorted list per field beside the arrays.
+    - Status changes never touch the source rows: they are an overlay per
+      row, fed by the journal like the bookings themselves.
+    """
+
+    def __init__(self, history: pd.DataFrame):
+        self.history = {HISTORY_COLUMNS.get(c, c): history[c].to_numpy() for c in history.columns}
+        self.n_history = len(history)
+        self.by_id: dict[str, int] = {booking_key(b): row for row, b in enumerate(self.history["booking_id"])}
+        self.sorted_keys: dict[str, np.ndarray] = {}
+        self.sorted_rows: dict[str, np.ndarray] = {}
+        for name in SEARCH_FIELDS:
+            keys = np.array([search_key(v) for v in self.history[name]], dtype=str)
+            order = np.argsort(keys, kind="stable")
+            self.sorted_keys[name], self.sorted_rows[name] = keys[order], order
+        self.live: list[dict] = []
+        self.live_keys: dict[str, list[tuple[str, int]]] = {name: [] for name in SEARCH_FIELDS}
+        self.overlay: dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def add_bookings(self, bookings: list[dict]):
+        """Journal listener: index bookings recovered, replayed or appended"""
+        with self._lock:
+            for booking in bookings:
+                booking = {k: _plain(v) for k, v in booking.items() if k != "journal_seq" and _plain(v) is not None}
+                key = booking_key(booking.get("booking_id"))
+                if key in self.by_id:
+                    continue
+                row = self.n_history + len(self.live)
+                self.live.append(booking)
+                self.by_id[key] = row
+                for name in SEARCH_FIELDS:
+                    if booking.get(name):
+                        bisect.insort(self.live_keys[name], (search_key(booking[name]), row))
+
+    def apply_status(self, updates: list[dict]) -> list[tuple[dict, dict]]:
+        """Journal listener: overlay status updates; returns each booking as (before, after)"""
+        changes = []
+        with self._lock:
+            for update in updates:
+                row = self.by_id.get(booking_key(update["booking_id"]))
+                if row is None:
+                    continue
+                before = self._record(row)
+                self.overlay[row] = {**self.overlay.get(row, {}), **{k: v for k, v in update.items() if k != "booking_id"}}
+                changes.append((before, self._record(row)))
+        return changes
+
+    def _record(self, row: int) -> dict:
+        """One booking in journal form with its status overlay; called with the lock held"""
+        if row < self.n_history:
+            record = {name: _plain(values[row]) for name, values in self.history.items()}
+        else:
+            record = dict(self.live[row - self.n_history])
+        record.setdefault("payment_status", "Pending")
+        record.update(self.overlay.get(row, {}))
+        return record
+
+    def get(self, booking_id: str) -> dict | None:
+        with self._lock:
+            row = self.by_id.get(booking_key(booking_id))
+            return None if row is None else self._record(row)
+
+    def search(self, field: str, text: str, limit: int = SEARCH_LIMIT) -> tuple[int, list[dict]]:
+        """Bookings whose ``field`` starts with ``text`` (case-insensitive): total count and the first ``limit``"""
+        prefix = search_key(text)
+        if field not in SEARCH_FIELDS or not prefix:
+            return 0, []
+        keys = self.sorted_keys[field]
+        # Every key starting with ``prefix`` sorts before prefix + U+10FFFF
+        lo = int(np.searchsorted(keys, prefix, "left"))
+        hi = int(np.searchsorted(keys, prefix + "\U0010ffff", "left"))
+        with self._lock:
+            live = self.live_keys[field]
+            live_lo = bisect.bisect_left(live, (prefix, -1))
+            live_hi = bisect.bisect_left(live, (prefix + "\U0010ffff", -1))
+            # Exact matches first, then the rest in key order
+            rows = sorted(
+                [(keys[i], int(self.sorted_rows[field][i])) for i in range(lo, min(hi, lo + limit))]
+                + live[live_lo:min(live_hi, live_lo + limit)],
+                key=lambda item: (item[0] != prefix, item),
+            )[:limit]
+            return (hi - lo) + (live_hi - live_lo), [self._record(row) for _, row in rows]
+
+
+def booking_lookup_message(total: int, bookings: list[dict]) -> str:
+    if not bookings:
+        return "No matching bookings found."
+    lines = [
+        f"{b.get('booking_id')}: {b.get('guest_name')} at {b.get('hotel_name')} ({b.get('room_type')}), "
+        f"{b.get('check_in')} to {b.get('check_out')}, payment {b.get('payment_status')}"
+        for b in bookings
+    ]
+    more = f" (showing {len(bookings)} of {total})" if total > len(bookings) else ""
+    return f"Found {total} booking{'s' if total != 1 else ''}{more}:\n" + "\n".join(lines)
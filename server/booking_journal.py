@@ -0,0 +1,471 @@
+import asyncio
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+import pandas as pd
+
+from config.logging import log_exception, setup_logger
+from server.snapshot import load_frame
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single server process is assumed
+    fcntl = None
+
+logger = setup_logger("booking-journal")
+
+COMMIT_WINDOW_SEC = float(os.getenv("JOURNAL_COMMIT_WINDOW_MS", "5")) / 1000
+COMPACT_INTERVAL_SEC = float(os.getenv("JOURNAL_COMPACT_INTERVAL_SEC", "300"))
+MAX_BATCH = 256
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True):
+    """Exclusive advisory lock shared by every server process; yields None if busy"""
+    with open(path, "a+", encoding="utf-8") as handle:
+        if fcntl is None:
+            yield handle
+            return
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield None
+            return
+        try:
+            yield handle
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class BookingJournal:
+    """Write-ahead, append-only log of booking transactions.
+
+    Every transaction is one JSON line carrying the booking row and the
+    inventory deltas it applies. Several ``server.data_server`` workers share
+    one journal, so records are appended inside ``transaction()``, which holds
+    an advisory lock across processes and first replays whatever the other
+    workers appended since this one last looked. A record is visible to the
+    other workers as soon as the transaction ends; durability comes from a
+    writer thread that fsyncs every record written within ``commit_window`` in
+    one go (group commit).
+
+    A compactor thread periodically folds the log into ``bookings.xlsx`` and
+    records the last folded sequence number in a checkpoint file; replay skips
+    anything at or below it. Status updates are folded into a small
+    ``bookings.status.json`` overlay instead, so no workbook is ever rewritten
+    for them.
+
+    Callbacks registered with ``subscribe()`` see every booking exactly once,
+    and those registered with ``subscribe_status()`` every status update, whichever
+    worker committed it. That keeps derived state such as the analytics rollups
+    in step with the inventory.
+    """
+
+    def __init__(self, excel_path: str, commit_window: float = COMMIT_WINDOW_SEC,
+                 compact_interval: float = COMPACT_INTERVAL_SEC):
+        base, _ = os.path.splitext(excel_path)
+        self.excel_path = excel_path
+        self.path = f"{base}.journal.jsonl"
+        self.lock_path = f"{base}.journal.lock"
+        self.compact_lock_path = f"{base}.compact.lock"
+        self.checkpoint_path = f"{base}.checkpoint.json"
+        self.status_path = f"{base}.status.json"
+        self.commit_window = commit_window
+        self.compact_interval = compact_interval
+        self.origin = uuid.uuid4().hex
+        self.inventory = None
+        self.applied_seq = 0
+        self.checkpoint_seq = 0
+        self.booking_count = 0
+        self._offsets: dict[int, tuple[int, int]] = {}
+        self._listeners: list = []
+        self._status_listeners: list = []
+        self._thread_lock = threading.RLock()
+        self._handle = None
+        self._queue: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    # Shared counters
+
+    @staticmethod
+    def _read_counters(handle) -> dict:
+        handle.seek(0)
+        raw = handle.read()
+        return json.loads(raw) if raw.strip() else {"seq": 0, "bookings": 0}
+
+    @staticmethod
+    def _write_counters(handle, counters: dict):
+        handle.seek(0)
+        handle.truncate()
+        handle.write(json.dumps(counters))
+        handle.flush()
+
+    @contextmanager
+    def transaction(self):
+        """Hold the journal lock across threads and processes, caught up with other workers"""
+        with self._thread_lock:
+            if self._handle is not None:  # re-entered from the same thread
+                yield
+                return
+            with file_lock(self.lock_path) as handle:
+                self._handle = handle
+                try:
+                    self._catch_up()
+                    yield
+                finally:
+                    self._handle = None
+
+    def refresh(self):
+        """Catch up with other workers before a read.
+
+        Only peeks at the shared counter, without the lock, so a read costs one
+        small file read when no other worker has committed since.
+        """
+        if self.inventory is None:
+            return
+        try:
+            with open(self.lock_path, "r", encoding="utf-8") as f:
+                raw = f.read()
+            if raw.strip() and json.loads(raw)["seq"] <= self.applied_seq:
+                return
+        except (FileNotFoundError, ValueError, KeyError):
+            pass  # missing or mid-write; the locked read below settles it
+        with self.transaction():
+            pass
+
+    def next_booking_id(self) -> str:
+        with self.transaction():
+            counters = self._read_counters(self._handle)
+            counters["bookings"] += 1
+            self._write_counters(self._handle, counters)
+        self.booking_count = counters["bookings"]
+        return f"BK{counters['bookings']:06d}"
+
+    # Booking listeners
+
+    def subscribe(self, listener):
+        """Call ``listener(bookings)`` with each batch of bookings recovered, replayed or appended"""
+        self._listeners.append(listener)
+
+    def subscribe_status(self, listener):
+        """Call ``listener(updates)`` with each batch of booking status updates"""
+        self._status_listeners.append(listener)
+
+    def _notify(self, bookings: list[dict], listeners: list | None = None):
+        if not bookings:
+            return
+        for listener in self._listeners if listeners is None else listeners:
+            try:
+                listener(bookings)
+            except Exception as e:
+                log_exception(logger, e, "Booking listener failed")
+
+    # Status overlay
+
+    def _load_status(self) -> dict:
+        if os.path.exists(self.status_path):
+            with open(self.status_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _apply_status(self, overlay: dict, after: int, before: int | None = None):
+        """Replay compacted status updates with ``after < seq < before``, inventory releases included"""
+        updates = []
+        for entry in overlay.values():
+            if after < entry["seq"] and (before is None or entry["seq"] < before):
+                updates.append(entry["update"])
+            for delta in entry.get("deltas", []):
+                if after < delta["seq"] and (before is None or delta["seq"] < before):
+                    self.inventory.adjust(delta["hotel_name"], delta["room_type"], delta["check_in"],
+                                          delta["check_out"], delta["rooms"])
+        self._notify(updates, self._status_listeners)
+
+    # Reading the log
+
+    def _segments(self) -> list[str]:
+        """Rotated segments awaiting compaction, oldest first, then the live log"""
+        rotated = sorted(glob.glob(f"{self.path}.*[0-9]"), key=lambda p: int(p.rsplit(".", 1)[1]))
+        return rotated + ([self.path] if os.path.exists(self.path) else [])
+
+    @staticmethod
+    def _parse(lines, path: str):
+        for line in lines:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A torn tail from a crash mid-write; it was never acknowledged
+                logger.warning("Skipping torn journal record in %s", path)
+                return
+
+    def _read(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from self._parse(f, path)
+
+    def _scan(self) -> list[dict]:
+        """Records this worker has not applied yet, reading each file from where it left off.
+
+        Offsets are keyed by inode, which survives rotation, and checked
+        against the file's first sequence number in case an inode is reused.
+        """
+        records, seen = [], {}
+        for path in self._segments():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    inode = os.fstat(f.fileno()).st_ino
+                    first_line = f.readline()
+                    if not first_line:
+                        continue
+                    first_seq = json.loads(first_line)["seq"]
+                    known_first, offset = self._offsets.get(inode, (None, 0))
+                    f.seek(offset if known_first == first_seq else 0)
+                    for record in self._parse(iter(f.readline, ""), path):
+                        if record["seq"] > self.applied_seq:
+                            records.append(record)
+                    seen[inode] = (first_seq, f.tell())
+            except FileNotFoundError:
+                continue  # compacted away while listing; covered by the Excel export
+        self._offsets = seen
+        return records
+
+    def _load_checkpoint(self) -> int:
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("seq", 0)
+        return 0
+
+    def _apply(self, record: dict):
+        if record.get("booking"):
+            self.booking_count += 1
+            self._notify([record["booking"]])
+        if record.get("status_update"):
+            self._notify([record["status_update"]], self._status_listeners)
+        for delta in record.get("deltas", []):
+            self.inventory.adjust(delta["hotel_name"], delta["room_type"], delta["check_in"],
+                                  delta["check_out"], delta["rooms"])
+
+    def _catch_up(self):
+        """Apply records other workers committed since this worker last held the lock"""
+        if self.inventory is None:
+            return
+        latest = self._read_counters(self._handle)["seq"]
+        if latest <= self.applied_seq:
+            return
+        records = self._scan()
+        first = records[0]["seq"] if records else latest + 1
+        if first > self.applied_seq + 1:
+            # Part of the gap was compacted into the Excel export before we saw it
+            frame = load_frame(self.excel_path)
+            if "journal_seq" in frame:
+                missed = frame[(frame["journal_seq"] > self.applied_seq) & (frame["journal_seq"] < first)]
+                self.inventory.apply_bookings(missed)
+                self._notify(missed.to_dict(orient="records"))
+            self._apply_status(self._load_status(), self.applied_seq, first)
+        for record in records:
+            if record.get("origin") != self.origin:
+                self._apply(record)
+        self.applied_seq = latest
+
+    def recover(self, inventory) -> int:
+        """Rebuild state from the Excel checkpoint plus the journal; returns records replayed"""
+        self.inventory = inventory
+        with self._thread_lock, file_lock(self.lock_path) as handle:
+            self.checkpoint_seq = self._load_checkpoint()
+            if os.path.exists(self.excel_path):
+                bookings = load_frame(self.excel_path)
+                self.booking_count = len(bookings)
+                inventory.apply_bookings(bookings)
+                self._notify(bookings.to_dict(orient="records"))
+                # The export is replaced before the checkpoint file; trust whichever is newer
+                if "journal_seq" in bookings and bookings["journal_seq"].notna().any():
+                    self.checkpoint_seq = max(self.checkpoint_seq, int(bookings["journal_seq"].max()))
+
+            # Anything newer than the checkpoint is replayed from the log below
+            self._apply_status(self._load_status(), 0, self.checkpoint_seq + 1)
+            self.applied_seq = self.checkpoint_seq
+            records = self._scan()
+            for record in records:
+                self._apply(record)
+                self.applied_seq = max(self.applied_seq, record["seq"])
+
+            # Counters never move backwards, even if the counter file was lost
+            counters = self._read_counters(handle)
+            counters["seq"] = max(counters["seq"], self.applied_seq)
+            counters["bookings"] = max(counters["bookings"], self.booking_count)
+            self._write_counters(handle, counters)
+            self.applied_seq = counters["seq"]
+        logger.info("Replayed %d journal records (checkpoint seq %d)", len(records), self.checkpoint_seq)
+        return len(records)
+
+    # Appending
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._writer, name="journal-writer", daemon=True),
+            threading.Thread(target=self._compactor, name="journal-compactor", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        if not self._threads:
+            return
+        self._stop.set()
+        self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.compact()
+
+    def append_locked(self, booking: dict | None = None, deltas: list[dict] | None = None, **fields) -> Future:
+        """Write a record inside ``transaction()``; the future resolves with its seq once fsynced"""
+        if self._handle is None:
+            raise RuntimeError("append_locked() must be called inside journal.transaction()")
+        counters = self._read_counters(self._handle)
+        counters["seq"] += 1
+        record = {
+            "seq": counters["seq"],
+            "ts": time.time(),
+            "origin": self.origin,
+            "booking": booking,
+            "deltas": deltas or [],
+            **fields,
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+        self._write_counters(self._handle, counters)
+        self.applied_seq = counters["seq"]
+        if booking:
+            self._notify([booking])
+        if fields.get("status_update"):
+            self._notify([fields["status_update"]], self._status_listeners)
+
+        future: Future = Future()
+        future.seq = record["seq"]
+        self._queue.put(future)
+        return future
+
+    async def append(self, booking: dict | None = None, deltas: list[dict] | None = None, **fields) -> int:
+        """Durably append one transaction and return its sequence number.
+
+        The caller's own in-memory state must already reflect ``deltas``.
+        """
+        with self.transaction():
+            future = self.append_locked(booking=booking, deltas=deltas, **fields)
+        return await asyncio.wrap_future(future)
+
+    def _writer(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.commit_window
+            while len(batch) < MAX_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._sync(batch)
+
+    def _sync(self, batch: list[Future]):
+        """One fsync for every record written so far; rotation fsyncs the segments it moves"""
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                os.fsync(f.fileno())
+        except Exception as e:
+            log_exception(logger, e, "Journal group commit failed")
+            for future in batch:
+                future.set_exception(e)
+            return
+        for future in batch:
+            future.set_result(future.seq)
+
+    # Compaction
+
+    def _compactor(self):
+        while not self._stop.wait(self.compact_interval):
+            try:
+                self.compact()
+            except Exception as e:
+                log_exception(logger, e, "Journal compaction failed")
+
+    def _rotate(self):
+        """Move the live log aside so new commits start a fresh one"""
+        with self.transaction():
+            if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                os.fsync(f.fileno())
+            seq = self._read_counters(self._handle)["seq"]
+            os.replace(self.path, f"{self.path}.{seq}")
+
+    def compact(self):
+        """Fold journaled bookings into the Excel export and drop the folded segments"""
+        with file_lock(self.compact_lock_path, blocking=False) as acquired:
+            if acquired is None:
+                return  # another worker is compacting
+            self._rotate()
+            self.checkpoint_seq = max(self.checkpoint_seq, self._load_checkpoint())
+            segments = [p for p in self._segments() if p != self.path]
+            records = [r for path in segments for r in self._read(path) if r["seq"] > self.checkpoint_seq]
+            if records:
+                # The overlay goes first: recovery trusts the export's newest journal_seq
+                self._compact_status(records)
+                bookings = [{**r["booking"], "journal_seq": r["seq"]} for r in records if r.get("booking")]
+                if bookings:
+                    frame = pd.read_excel(self.excel_path) if os.path.exists(self.excel_path) else pd.DataFrame()
+                    frame = pd.concat([frame, pd.DataFrame(bookings)], ignore_index=True)
+
+                    tmp_path = f"{self.excel_path}.tmp.xlsx"
+                    frame.to_excel(tmp_path, index=False)
+                    os.replace(tmp_path, self.excel_path)
+
+                last_seq = records[-1]["seq"]
+                tmp_path = f"{self.checkpoint_path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"seq": last_seq, "compacted_at": time.time()}, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.checkpoint_path)
+                self.checkpoint_seq = last_seq
+                logger.info("Compacted %d journal records into %s", len(records), self.excel_path)
+
+            for path in segments:
+                os.remove(path)
+
+    def _compact_status(self, records: list[dict]):
+        """Fold status updates into the overlay: latest state per booking, every inventory release kept"""
+        updates = [r for r in records if r.get("status_update")]
+        if not updates:
+            return
+        overlay = self._load_status()
+        for record in updates:
+            update = record["status_update"]
+            entry = overlay.setdefault(str(update["booking_id"]), {"deltas": []})
+            entry["update"] = update
+            entry["seq"] = record["seq"]
+            entry["deltas"] += [{**delta, "seq": record["seq"]} for delta in record.get("deltas", [])]
+        tmp_path = f"{self.status_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(overlay, f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.status_path)
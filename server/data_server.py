@@ -1,36 +1,155 @@
-from mcp.server.fastmcp import FastMCP
 import pandas as pd
 from agent.conversation_agent import conversation_agent
 from langchain.output_parsers import PydanticOutputParser
 from agent.prompts import build_common_context
 from config.logging import log_exception, setup_logger
+from config.tracing import TracedFastMCP, span
 from agent.hotel_search_agent import hotel_search_agent
 from agent.check_hotel_availability_agent import check_hotel_availability_agent
 from agent.book_hotel_agent import check_hotel_availability_agent as book_hotel_agent
+from agent.analytics_agent import analytics_agent
+from agent.predictive_availability_agent import predictive_availability_agent
+from agent.registry import get_memory
+from server.inventory import InventoryIndex, normalize
+from server.search_filter import HotelCatalog, count_tokens
+from server.text_index import TextIndex
+from server.booking_journal import BookingJournal, file_lock
+from server.transactions import PAYMENT_STATUSES, BookingTransactions
+from server.booking_index import BookingIndex, booking_lookup_message
+from server.snapshot import load_frame, dataset_version
+from server.response_cache import ResponseCache, default_embedder
+from server.structured_responses import (
+    RESPONSE_MODES, availability_key, availability_message, availability_report, batch_availability_message,
+    batch_availability_report, booking_message, booking_summary, requested_stay, requested_weekdays, room_prices,
+)
+from server.analytics import BookingAnalytics, location_availability
+from server.pricing import PricingEngine, pricing_message
+from server.alternatives import AlternativesEngine, alternatives_message
+from server.forecast import AvailabilityForecast, forecast_path, refit
+from config.concurrency import LoopLagMonitor, run_blocking
+from contextlib import asynccontextmanager
+import atexit
 import json
 import asyncio
 import redis
 import os
 import datetime
 
-mcp = FastMCP("HotelList")
 logger = setup_logger("data-server")
+# Warns when something holds the event loop past LOOP_LAG_THRESHOLD_MS
+loop_monitor = LoopLagMonitor("data-server")
 
-df = pd.read_excel("./data/hotels.xlsx")
+
+@asynccontextmanager
+async def lifespan(server):
+    loop_monitor.start()
+    try:
+        yield {}
+    finally:
+        await loop_monitor.stop()
+
+
+# Tool calls continue the client's trace; see config.tracing
+mcp = TracedFastMCP("HotelList", lifespan=lifespan)
+
+# Workbooks load through memory-mapped snapshots, rebuilt when the Excel changes
+df = load_frame("./data/hotels.xlsx")
 data = df.to_dict(orient="records")
-df1 = pd.read_excel("./data/empty_rooms_5000.xlsx")
+df1 = load_frame("./data/empty_rooms_5000.xlsx")
 data1 = df1.to_dict(orient="records")
 
 # Path to the bookings Excel file
-BOOKINGS_FILE = "./data/bookings.xlsx"
+BOOKINGS_FILE = os.getenv("BOOKINGS_FILE", "./data/bookings.xlsx")
+
+# Deterministic pre-filter so hotel_search only sends matching rows to the LLM
+catalog = HotelCatalog(df, TextIndex.load_or_build("./data/hotels.xlsx", df))
+SEARCH_TOP_K = int(os.getenv("HOTEL_SEARCH_TOP_K", "20"))
+
+# Revenue, occupancy and payment rollups over the booking history; the journal
+# feeds them every booking made since, by this worker or any other
+booking_history = load_frame("./data/hotel_bookings.xlsx")
+analytics = BookingAnalytics(
+    booking_history,
+    price_lookup=lambda hotel, room_type: room_prices(catalog, hotel).get(room_type),
+)
+
+# Free rooms per (hotel, room_type, night), net of bookings already taken:
+# the Excel export plus anything journaled since its last compaction
+inventory = InventoryIndex.from_frame(df1)
+journal = BookingJournal(BOOKINGS_FILE)
+# Recommended price per (hotel, room_type, night) from demand; quotes are table lookups
+pricing = PricingEngine(inventory, analytics, catalog)
+# Booking id, guest name and email lookups over the history plus every booking since
+bookings = BookingIndex(booking_history)
+
+
+def apply_status_updates(updates: list[dict]):
+    for before, after in bookings.apply_status(updates):
+        analytics.restate(before, after)
+
+
+journal.subscribe(analytics.add_bookings)
+journal.subscribe(pricing.add_bookings)
+journal.subscribe(bookings.add_bookings)
+journal.subscribe_status(apply_status_updates)
+with span("journal.recover"):
+    journal.recover(inventory)
+pricing.refresh(full=True)
+journal.start()
+atexit.register(journal.close)
+transactions = BookingTransactions(inventory, journal, bookings)
+# Other dates, room types and nearby hotels when a stay cannot be booked as asked
+alternatives = AlternativesEngine(inventory, catalog, as_of=pricing.as_of)
+
+# Availability forecasts per (hotel, room_type), fitted once per booking-history
+# workbook and refitted nightly by whichever worker gets the lock first
+forecaster = AvailabilityForecast(forecast_path())
+with file_lock(f"{forecaster.path}.lock"):
+    if not forecaster.load():
+        refit(analytics, forecaster.path)
+forecaster.start_nightly(lambda: refit(analytics, forecaster.path), f"{forecaster.path}.lock")
+hotel_names = {normalize(name) for name in df["Hotel_Name"]}
+
+# Conversation memory is per session; the client fills session_id in for
+# every tool call (it is hidden from the LLM), so this only covers direct callers
+DEFAULT_SESSION_ID = "default-session"
+
+# How hotel_availability and create_booking answer; see server.structured_responses
+RESPONSE_MODE = os.getenv("TOOL_RESPONSE_MODE", "llm")
+if RESPONSE_MODE not in RESPONSE_MODES:
+    logger.warning("Unknown TOOL_RESPONSE_MODE %r, using 'llm'", RESPONSE_MODE)
+    RESPONSE_MODE = "llm"
+_background_tasks = set()
+
+
+def phrase_in_background(chain, chain_input: dict, memory, user_input: str):
+    """Let the LLM phrase an answer that was already returned, and keep that phrasing in memory"""
+    async def run():
+        try:
+            output = await chain.ainvoke(chain_input)
+            if memory:
+                await memory.asave_context({"input": user_input}, {"output": output})
+        except Exception as e:
+            log_exception(logger, e, "Background phrasing error")
+
+    task = asyncio.create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+# Answers for repeated search/availability questions; availability entries are
+# keyed on the hotel's inventory version, so any booking makes them stale
+response_cache = ResponseCache(embedder=default_embedder())
+HOTELS_VERSION = dataset_version("./data/hotels.xlsx")
 
 @mcp.tool()
-async def conversation_assistant(user_message: str):
+async def conversation_assistant(user_message: str, session_id: str = DEFAULT_SESSION_ID):
     """this tool is used for normal conversation with user"""
     try:
         available_tools = "\n".join([
             "- search_hotels: Find hotels by city, price, amenities, room type",
             "- check_availability: Check room availability for dates and room type",
+            "- batch_availability: Compare availability across several hotels and dates",
+            "- find_alternatives: Nearest open dates, rooms or nearby hotels for a sold-out stay",
             "- get_hotel_details: Retrieve details and recent bookings for a hotel",
             "- create_booking: Create a booking and return a quote/summary",
             "- get_booking_details: Fetch details for a specific booking",
@@ -54,10 +173,10 @@ async def conversation_assistant(user_message: str):
             "- loyalty_program: Personalized loyalty offer design",
         ])
         
-        chain, memory = conversation_agent("ved")
+        chain, memory = await run_blocking(conversation_agent, session_id)
         context = build_common_context()
-        history = memory.load_memory_variables({}).get('history', '') if memory else ""
-        logger.info("History: %s", history)
+        history = (await memory.aload_memory_variables({})).get('history', '') if memory else ""
+        logger.debug("History: %s", history)
         chain_input = {
             "input": user_message,
             "context": context,
@@ -67,7 +186,7 @@ async def conversation_assistant(user_message: str):
         
         output = await chain.ainvoke(chain_input)
         if memory:
-            memory.save_context({"input": user_message}, {"output": output})
+            await memory.asave_context({"input": user_message}, {"output": output})
         
         return output
         
@@ -76,20 +195,38 @@ async def conversation_assistant(user_message: str):
         return {"error": str(e)}
 
 @mcp.tool()
-async def hotel_search(question: str) -> dict:
-    """Search hotels in the local Excel dataset by natural language."""
+async def hotel_search(question: str, page: int = 1, session_id: str = DEFAULT_SESSION_ID) -> dict:
+    """Search hotels in the local Excel dataset by natural language. Use page for further results."""
     try:
-        chain, memory = hotel_search_agent("ved")
-        history = memory.load_memory_variables({}).get('history', '') if memory else ""
-        logger.info("History: %s", history)
+        chain, memory = await run_blocking(hotel_search_agent, session_id)
+        query_key = f"{catalog.parse(question).key()}|page={page}"
+        cached = response_cache.get("hotel_search", query_key, HOTELS_VERSION, question)
+        if cached is not None:
+            logger.info("hotel_search cache hit %s", response_cache.stats())
+            if memory:
+                await memory.asave_context({"input": question}, {"output": cached})
+            return cached
+        matches = catalog.search(question, top_k=SEARCH_TOP_K, page=page)
+        if not matches["total_matches"]:
+            return {
+                "message": "No hotels found matching your criteria.",
+                "suggestions": "Try broadening your search (e.g., different dates, higher budget, or other locations)."
+            }
+        matches_json = json.dumps(matches)
+        prompt_tokens = count_tokens(matches_json)
+        logger.info(
+            "hotel_search sent %d of %d rows (%d tokens, %d saved vs full dataset)",
+            len(matches["hotels"]), catalog.n_rows, prompt_tokens, catalog.full_prompt_tokens - prompt_tokens,
+        )
+        # Answers are cached for every session, so no session's history goes into the prompt
         output = await chain.ainvoke({
-            "data": json.dumps(data),
+            "data": matches_json,
             "question": question,
-            "history": history
+            "history": ""
         })
         
         if memory:
-            memory.save_context({"input": question}, {"output": output})
+            await memory.asave_context({"input": question}, {"output": output})
         
         # If no hotels found, suggest alternatives
         if not output or "error" in output:
@@ -98,47 +235,120 @@ async def hotel_search(question: str) -> dict:
                 "suggestions": "Try broadening your search (e.g., different dates, higher budget, or other locations)."
             }
         
+        response_cache.put("hotel_search", query_key, HOTELS_VERSION, question, output)
         return output
     except Exception as e:
         log_exception(logger, e, "Hotel search tool error")
         return {"error": str(e), "suggestions": "Try broadening your search criteria."}
 
 @mcp.tool()
-async def hotel_availability(question: str, hotel_name: str) -> dict:
+async def hotel_availability(question: str, hotel_name: str, session_id: str = DEFAULT_SESSION_ID) -> dict:
     """Check room availability in the local Excel dataset by natural language."""
     try:
-        chain, memory = check_hotel_availability_agent("ved")
-        history = memory.load_memory_variables({}).get('history', '') if memory else ""
-        logger.info("History: %s", history)
-        output = await chain.ainvoke({
-            "empty_rooms": data1,
-            "hotels": data,
+        # Replays other workers' bookings, which bumps the inventory version the cache is keyed on
+        await run_blocking(journal.refresh)
+        chain, memory = await run_blocking(check_hotel_availability_agent, session_id)
+        query_key = availability_key(catalog, hotel_name, question)
+        version = (HOTELS_VERSION, inventory.hotel_version(hotel_name))
+        if RESPONSE_MODE == "llm":
+            cached = response_cache.get("hotel_availability", query_key, version, question)
+            if cached is not None:
+                logger.info("hotel_availability cache hit %s", response_cache.stats())
+                if memory:
+                    await memory.asave_context({"input": question}, {"output": cached})
+                return cached
+        report = availability_report(inventory, catalog, hotel_name, question)
+        if "check_in" in report and report["room_types"] and not any(room["available"] for room in report["room_types"]):
+            asked = report["room_types"][0]["room_type"] if len(report["room_types"]) == 1 else None
+            report["alternatives"] = await run_blocking(
+                alternatives.suggest, hotel_name, asked, report["check_in"], report["check_out"],
+            )
+        hotel_records = [item for item in data if normalize(item["Hotel_Name"]) == normalize(hotel_name)]
+        chain_input = {
+            "empty_rooms": json.dumps(report),
+            "hotels": json.dumps(hotel_records),
             "hotel_name": hotel_name,
-            "history": history
-        })
+            # Answers are cached for every session, so no session's history goes into the prompt
+            "history": ""
+        }
+        if RESPONSE_MODE != "llm":
+            message = availability_message(report)
+            if "alternatives" in report:
+                message += " " + alternatives_message(report["alternatives"])
+            if RESPONSE_MODE == "background":
+                phrase_in_background(chain, chain_input, memory, question)
+            elif memory:
+                await memory.asave_context({"input": question}, {"output": message})
+            return report if RESPONSE_MODE == "structured" else {**report, "message": message}
+        output = await chain.ainvoke(chain_input)
         
         if memory:
-            memory.save_context({"input": question}, {"output": output})
+            await memory.asave_context({"input": question}, {"output": output})
         
         # If no availability, suggest checking other dates or hotels
         if not output or "error" in output:
             return {
                 "message": f"No availability for {hotel_name}.",
-                "suggestions": "Try different dates or another hotel."
+                "suggestions": alternatives_message(report["alternatives"]) if "alternatives" in report
+                else "Try different dates or another hotel."
             }
         
+        # Alternatives depend on other hotels' rooms, which the cache version does not cover
+        if "alternatives" not in report:
+            response_cache.put("hotel_availability", query_key, version, question, output, tags=[normalize(hotel_name)])
         return output
     except Exception as e:
         log_exception(logger, e, "Hotel availability tool error")
         return {"error": str(e), "suggestions": "Try different dates or another hotel."}
 
 @mcp.tool()
-async def create_booking(booking_request: str, hotel_name: str, room_type: str, check_in: str, check_out: str, guest_name: str) -> dict:
+async def batch_availability(question: str, hotel_names: list[str], room_types: list[str] | None = None, start_date: str = "", end_date: str = "", nights: int = 1, weekdays: list[str] | None = None, session_id: str = DEFAULT_SESSION_ID) -> dict:
+    """Check several hotels at once: rooms bookable for a stay of `nights` from every check-in date between start_date and end_date (YYYY-MM-DD), optionally only for some room types and check-in weekdays (e.g. ["Fri", "Sat"] for weekends)"""
+    try:
+        await run_blocking(journal.refresh)
+        if not (start_date and end_date):
+            stay = requested_stay(question)
+            start_date, end_date = stay if stay else (str(pricing.as_of), str(pricing.as_of + 30))
+        room_types = room_types or []
+        weekdays = weekdays or requested_weekdays(question)
+        report = await run_blocking(
+            batch_availability_report, inventory, catalog, hotel_names, room_types, start_date, end_date, nights, weekdays,
+        )
+        if "error" in report:
+            return report
+        chain, memory = await run_blocking(check_hotel_availability_agent, session_id)
+        if RESPONSE_MODE != "llm":
+            message = batch_availability_message(report)
+            if memory:
+                await memory.asave_context({"input": question}, {"output": message})
+            return report if RESPONSE_MODE == "structured" else {**report, "message": message}
+        # One summarizing call for the whole matrix, with only the hotels' identity rather than their full rows
+        history = (await memory.aload_memory_variables({})).get('history', '') if memory else ""
+        hotel_info = [
+            {key: catalog.records[rows[0]][key] for key in ("Hotel_Name", "City", "State")}
+            for hotel in report["hotels"]
+            if len(rows := catalog.by_hotel.get(normalize(hotel["hotel_name"]), []))
+        ]
+        output = await chain.ainvoke({
+            "empty_rooms": json.dumps(report),
+            "hotels": json.dumps(hotel_info),
+            "hotel_name": ", ".join(hotel["hotel_name"] for hotel in report["hotels"]),
+            "history": history
+        })
+        if memory:
+            await memory.asave_context({"input": question}, {"output": output})
+        return output
+    except Exception as e:
+        log_exception(logger, e, "Batch availability tool error")
+        return {"error": str(e)}
+
+@mcp.tool()
+async def create_booking(booking_request: str, hotel_name: str, room_type: str, check_in: str, check_out: str, guest_name: str, session_id: str = DEFAULT_SESSION_ID) -> dict:
     """Create a hotel booking and add it to the bookings Excel file."""
     try:
-        chain, memory = book_hotel_agent("ved")
-        history = memory.load_memory_variables({}).get('history', '') if memory else ""
-        logger.info("History: %s", history)
+        chain, memory = await run_blocking(book_hotel_agent, session_id)
+        history = (await memory.aload_memory_variables({})).get('history', '') if memory else ""
+        logger.debug("History: %s", history)
         
         # Validate input
         try:
@@ -150,27 +360,11 @@ async def create_booking(booking_request: str, hotel_name: str, room_type: str,
             return {"error": "Invalid date format. Use YYYY-MM-DD"}
         
         # Check if the hotel and room type are valid
-        hotel_data = next((item for item in data if item["name"].lower() == hotel_name.lower()), None)
-        if not hotel_data:
+        if normalize(hotel_name) not in hotel_names:
             return {"error": f"Hotel {hotel_name} not found"}
         
-        # Check availability for all dates in range
-        current_date = check_in_date
-        while current_date <= check_out_date:
-            date_str = current_date.strftime("%Y-%m-%d")
-            availability = next(
-                (item for item in data1 if item["hotel_name"].lower() == hotel_name.lower() and 
-                 item["room_type"].lower() == room_type.lower() and 
-                 item["date"] == date_str), None
-            )
-            if not availability or availability["available_rooms"] <= 0:
-                return {"error": f"No {room_type} rooms available at {hotel_name} on {date_str}"}
-            current_date += datetime.timedelta(days=1)
-        
-        # Create booking entry
-        booking_id = f"BK{len(data1) + 1:06d}"
-        booking_entry = {
-            "booking_id": booking_id,
+        # Reserve every night of the stay and journal it as one transaction
+        result = await transactions.book({
             "hotel_name": hotel_name,
             "room_type": room_type,
             "check_in": check_in,
@@ -178,33 +372,38 @@ async def create_booking(booking_request: str, hotel_name: str, room_type: str,
             "guest_name": guest_name,
             "status": "confirmed",
             "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        
-        # Append to bookings Excel
-        bookings_df = pd.read_excel(BOOKINGS_FILE) if os.path.exists(BOOKINGS_FILE) else pd.DataFrame()
-        bookings_df = pd.concat([bookings_df, pd.DataFrame([booking_entry])], ignore_index=True)
-        bookings_df.to_excel(BOOKINGS_FILE, index=False)
-        
-        # Update availability for all dates
-        current_date = check_in_date
-        while current_date <= check_out_date:
-            date_str = current_date.strftime("%Y-%m-%d")
-            for item in data1:
-                if (item["hotel_name"].lower() == hotel_name.lower() and 
-                    item["room_type"].lower() == room_type.lower() and 
-                    item["date"] == date_str):
-                    item["available_rooms"] -= 1
-            current_date += datetime.timedelta(days=1)
-        pd.DataFrame(data1).to_excel("./data/empty_rooms_5000.xlsx", index=False)
+        })
+        if not result.ok:
+            if result.reason == "sold_out":
+                options = await run_blocking(alternatives.suggest, hotel_name, room_type, check_in, check_out)
+                return {
+                    "error": f"No {room_type} rooms available at {hotel_name} on {result.sold_out_on}",
+                    "suggestions": alternatives_message(options),
+                    "alternatives": options,
+                }
+            return {"error": "This room is in high demand right now. Please try again."}
+        booking_entry = booking_summary(result.booking, catalog)
+        response_cache.invalidate(normalize(hotel_name))
         
-        # Generate confirmation
-        output = await chain.ainvoke({
+        chain_input = {
             "booking_request": booking_request,
             "history": history
-        })
+        }
+        if RESPONSE_MODE != "llm":
+            message = booking_message(booking_entry)
+            if RESPONSE_MODE == "background":
+                phrase_in_background(chain, chain_input, memory, booking_request)
+            elif memory:
+                await memory.asave_context({"input": booking_request}, {"output": message})
+            if RESPONSE_MODE == "structured":
+                return {"booking_details": booking_entry}
+            return {"booking_confirmation": message, "booking_details": booking_entry}
+        
+        # Generate confirmation
+        output = await chain.ainvoke(chain_input)
         
         if memory:
-            memory.save_context({"input": booking_request}, {"output": output})
+            await memory.asave_context({"input": booking_request}, {"output": output})
         
         return {
             "booking_confirmation": output,
@@ -214,5 +413,178 @@ async def create_booking(booking_request: str, hotel_name: str, room_type: str,
         log_exception(logger, e, "Create booking tool error")
         return {"error": str(e)}
 
+@mcp.tool()
+async def find_alternatives(question: str, hotel_name: str, room_type: str = "", check_in: str = "", check_out: str = "", session_id: str = DEFAULT_SESSION_ID) -> dict:
+    """Closest bookable options when a stay is sold out: nearest open dates at the hotel, other room types on the same dates, and the same room at hotels in the same city or county (dates YYYY-MM-DD)"""
+    try:
+        await run_blocking(journal.refresh)
+        if not (check_in and check_out):
+            stay = requested_stay(question)
+            if stay is None:
+                return {"error": "Give the check-in and check-out dates (YYYY-MM-DD)"}
+            check_in, check_out = stay
+        options = await run_blocking(alternatives.suggest, hotel_name, room_type or None, check_in, check_out)
+        if "error" in options:
+            return options
+        message = alternatives_message(options)
+        memory = await run_blocking(get_memory, session_id)
+        if memory:
+            await memory.asave_context({"input": question}, {"output": message})
+        return {**options, "message": message}
+    except Exception as e:
+        log_exception(logger, e, "Find alternatives tool error")
+        return {"error": str(e)}
+
+async def answer_analytics(question: str, aggregate: dict, session_id: str):
+    """Have the LLM explain a computed aggregate; raw booking rows never reach the prompt"""
+    if "error" in aggregate or RESPONSE_MODE != "llm":
+        return aggregate
+    chain, memory = await run_blocking(analytics_agent, session_id)
+    history = (await memory.aload_memory_variables({})).get('history', '') if memory else ""
+    analytics_data = json.dumps(aggregate)
+    logger.info("Analytics prompt carries %d tokens of aggregates", count_tokens(analytics_data))
+    output = await chain.ainvoke({
+        "analytics_data": analytics_data,
+        "question": question,
+        "history": history
+    })
+    if memory:
+        await memory.asave_context({"input": question}, {"output": output})
+    return output
+
+@mcp.tool()
+async def get_hotel_analytics(question: str, hotel_name: str = "", start_date: str = "", end_date: str = "", session_id: str = DEFAULT_SESSION_ID):
+    """Revenue, room-nights, average daily rate, room popularity and payment status mix for one hotel or all hotels (dates YYYY-MM-DD, optional)"""
+    try:
+        await run_blocking(journal.refresh)
+        aggregate = await run_blocking(analytics.hotel_analytics, hotel_name or None, start_date or None, end_date or None)
+        return await answer_analytics(question, aggregate, session_id)
+    except Exception as e:
+        log_exception(logger, e, "Hotel analytics tool error")
+        return {"error": str(e)}
+
+@mcp.tool()
+async def get_revenue_report(question: str, hotel_name: str = "", period: str = "month", start_date: str = "", end_date: str = "", session_id: str = DEFAULT_SESSION_ID):
+    """Revenue per month or day (period), for one hotel or all hotels, with the payment status breakdown"""
+    try:
+        await run_blocking(journal.refresh)
+        aggregate = await run_blocking(analytics.revenue_report, hotel_name or None, period, start_date or None, end_date or None)
+        return await answer_analytics(question, aggregate, session_id)
+    except Exception as e:
+        log_exception(logger, e, "Revenue report tool error")
+        return {"error": str(e)}
+
+@mcp.tool()
+async def analyze_booking_trends(question: str, hotel_name: str = "", session_id: str = DEFAULT_SESSION_ID):
+    """Monthly arrivals and revenue with month-over-month change, busiest months, popular room types and cancellation rate"""
+    try:
+        await run_blocking(journal.refresh)
+        aggregate = await run_blocking(analytics.booking_trends, hotel_name or None)
+        return await answer_analytics(question, aggregate, session_id)
+    except Exception as e:
+        log_exception(logger, e, "Booking trends tool error")
+        return {"error": str(e)}
+
+@mcp.tool()
+async def get_availability_report(question: str, location: str, date: str = "", session_id: str = DEFAULT_SESSION_ID):
+    """Free rooms per hotel and room type in a city, county or state on one night (date YYYY-MM-DD, optional)"""
+    try:
+        await run_blocking(journal.refresh)
+        aggregate = await run_blocking(location_availability, inventory, catalog, location, date or None)
+        return await answer_analytics(question, aggregate, session_id)
+    except Exception as e:
+        log_exception(logger, e, "Availability report tool error")
+        return {"error": str(e)}
+
+@mcp.tool()
+async def dynamic_pricing(question: str, hotel_name: str, room_type: str = "", check_in: str = "", check_out: str = "", session_id: str = DEFAULT_SESSION_ID) -> dict:
+    """Recommended nightly prices for a stay based on demand: occupancy, recent bookings and how soon the stay is (dates YYYY-MM-DD; without dates the next 7 nights)"""
+    try:
+        await run_blocking(journal.refresh)
+        if not (check_in and check_out):
+            stay = requested_stay(question)
+            check_in, check_out = stay if stay else (str(pricing.as_of), str(pricing.as_of + 7))
+        quote = await run_blocking(pricing.quote, hotel_name, room_type or None, check_in, check_out)
+        if "error" in quote:
+            return quote
+        memory = await run_blocking(get_memory, session_id)
+        message = pricing_message(quote)
+        if memory:
+            await memory.asave_context({"input": question}, {"output": message})
+        return {**quote, "message": message}
+    except Exception as e:
+        log_exception(logger, e, "Dynamic pricing tool error")
+        return {"error": str(e)}
+
+@mcp.tool()
+async def predictive_availability(question: str, hotel_name: str, room_type: str = "", check_in: str = "", check_out: str = "", session_id: str = DEFAULT_SESSION_ID):
+    """Forecast room availability for a hotel beyond the known inventory (dates YYYY-MM-DD; without dates the first 14 forecast days)"""
+    try:
+        if not (check_in and check_out):
+            stay = requested_stay(question)
+            check_in, check_out = stay if stay else ("", "")
+        forecast = await run_blocking(forecaster.predict, hotel_name, room_type or None, check_in or None, check_out or None)
+        if "error" in forecast or RESPONSE_MODE != "llm":
+            return forecast
+        chain, memory = await run_blocking(predictive_availability_agent, session_id)
+        history = (await memory.aload_memory_variables({})).get('history', '') if memory else ""
+        output = await chain.ainvoke({
+            "predictive_data": json.dumps({"question": question, **forecast}),
+            "history": history
+        })
+        if memory:
+            await memory.asave_context({"input": question}, {"output": output})
+        return output
+    except Exception as e:
+        log_exception(logger, e, "Predictive availability tool error")
+        return {"error": str(e)}
+
+@mcp.tool()
+async def get_booking_details(question: str, booking_id: str = "", guest_name: str = "", contact_email: str = "", session_id: str = DEFAULT_SESSION_ID) -> dict:
+    """Look up bookings by booking ID, or by guest name or contact email (a prefix such as "guest_12" matches every name starting with it)"""
+    try:
+        # The booking may have been made through another worker
+        await run_blocking(journal.refresh)
+        if booking_id:
+            booking = await run_blocking(bookings.get, booking_id)
+            if booking is None:
+                return {"error": f"Booking {booking_id} not found"}
+            total, found = 1, [booking]
+        elif guest_name or contact_email:
+            field, text = ("guest_name", guest_name) if guest_name else ("contact_email", contact_email)
+            total, found = await run_blocking(bookings.search, field, text)
+        else:
+            return {"error": "Give a booking ID, guest name or contact email"}
+        message = booking_lookup_message(total, found)
+        memory = await run_blocking(get_memory, session_id)
+        if memory:
+            await memory.asave_context({"input": question}, {"output": message})
+        return {"total_matches": total, "bookings": found, "message": message}
+    except Exception as e:
+        log_exception(logger, e, "Booking details tool error")
+        return {"error": str(e)}
+
+@mcp.tool()
+async def update_booking_status(question: str, booking_id: str, payment_status: str, session_id: str = DEFAULT_SESSION_ID) -> dict:
+    """Set a booking's payment status to Paid, Pending or Cancelled; cancelling frees the booked rooms"""
+    try:
+        result = await transactions.update_status(booking_id, payment_status)
+        if not result.ok:
+            if result.reason == "invalid_status":
+                return {"error": f"Payment status must be one of {', '.join(PAYMENT_STATUSES)}"}
+            if result.reason == "not_found":
+                return {"error": f"Booking {booking_id} not found"}
+            return {"error": f"Booking {booking_id} is already cancelled"}
+        if result.deltas:
+            response_cache.invalidate(normalize(result.booking["hotel_name"]))
+        message = f"Booking {result.booking['booking_id']} is now {result.booking['payment_status']}."
+        memory = await run_blocking(get_memory, session_id)
+        if memory:
+            await memory.asave_context({"input": question}, {"output": message})
+        return {"booking_details": result.booking, "message": message}
+    except Exception as e:
+        log_exception(logger, e, "Update booking status tool error")
+        return {"error": str(e)}
+
 if __name__ == "__main__":
     mcp.run(transport="stdio")
\ No newline at end of file
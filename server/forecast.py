@@ -0,0 +1,319 @@
+"""Fit availability forecasts for every (hotel, room_type) and persist them.
+
+Run nightly from cron (the servers also refit once a day on their own):
+
+    python -m server.forecast --horizon 90 --workers 4
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from config.logging import log_exception, setup_logger
+from server.booking_journal import file_lock
+from server.inventory import normalize, to_day
+from server.snapshot import artifact_path
+
+logger = setup_logger("forecast")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOKINGS_HISTORY = "./data/hotel_bookings.xlsx"
+FORECAST_FILE = "availability_forecast.npz"
+FORECAST_HORIZON_DAYS = int(os.getenv("FORECAST_HORIZON_DAYS", "90"))
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", "0")) or os.cpu_count() or 1
+FORECAST_REFIT_HOUR = int(os.getenv("FORECAST_REFIT_HOUR", "3"))
+SEASON = 7
+ALPHAS = np.array([0.01, 0.05, 0.1, 0.2, 0.4])
+GAMMAS = np.array([0.0, 0.02, 0.05, 0.15])
+CHUNKS_PER_WORKER = 4
+# Below this many series per worker, starting the pool costs more than the fit
+MIN_SERIES_PER_WORKER = 1000
+# How much a candidate must beat the long-run mean on validation to be picked over it
+SELECTION_MARGIN = 0.1
+
+
+def seasonal_baselines(history: np.ndarray, horizon: int, offset: int) -> np.ndarray:
+    """``[rows, 2, horizon]`` forecasts from the long-run mean and from the per-weekday mean.
+
+    ``offset`` is the index of the first forecast night, which sets its weekday.
+    """
+    rows, nights = history.shape
+    flat = np.repeat(history.mean(axis=1, keepdims=True), horizon, axis=1)
+    weekday = np.zeros((rows, SEASON))
+    for day in range(SEASON):
+        nights_of_day = history[:, day::SEASON]
+        weekday[:, day] = nights_of_day.mean(axis=1) if nights_of_day.shape[1] else 0.0
+    steps = (offset + np.arange(horizon)) % SEASON
+    return np.stack([flat, weekday[:, steps]], axis=1)
+
+
+def fit_seasonal(history: np.ndarray, horizon: int) -> tuple[np.ndarray, np.ndarray]:
+    """Pick the best of weekly-seasonal exponential smoothing and seasonal baselines per row.
+
+    The candidates are additive Holt-Winters (level plus weekday term, without
+    trend) for every (alpha, gamma) pair of the grid, plus the long-run and
+    per-weekday means. All rows and candidates are filtered together, one
+    vectorized step per night. Each row keeps the candidate whose forecast
+    from ``validation`` nights before the end came closest to what happened
+    (the long-run mean wins ties within ``SELECTION_MARGIN``), refitted
+    through the end. Returns the ``[rows, horizon]`` forecast and the
+    validation root-mean-square error.
+    """
+    rows, nights = history.shape
+    alpha = np.repeat(ALPHAS, len(GAMMAS))[None, :]
+    gamma = np.tile(GAMMAS, len(ALPHAS))[None, :]
+    # Start from the first four weeks: their mean, and each weekday's average offset from it
+    weeks = max(min(nights // SEASON, 4), 1)
+    warmup = np.zeros((rows, weeks * SEASON))
+    warmup[:, :min(nights, weeks * SEASON)] = history[:, :weeks * SEASON]
+    mean = warmup.mean(axis=1, keepdims=True)
+    level = np.repeat(mean, alpha.shape[1], axis=1)
+    weekday = warmup.reshape(rows, weeks, SEASON).mean(axis=1) - mean
+    season = np.repeat(weekday[:, None, :], alpha.shape[1], axis=1)
+    validation = min(horizon, nights // 4)
+    split = nights - validation
+    error = np.zeros((rows, alpha.shape[1] + 2))
+
+    for t in range(nights):
+        if t == split and validation:
+            steps = (split + np.arange(validation)) % SEASON
+            predicted = np.concatenate([
+                level[:, :, None] + season[:, :, steps],
+                seasonal_baselines(history[:, :split], validation, split),
+            ], axis=1)
+            error = np.sqrt(((np.clip(predicted, 0, None) - history[:, None, split:]) ** 2).mean(axis=2))
+            flat = alpha.shape[1]
+            error[:, np.arange(error.shape[1]) != flat] *= 1 + SELECTION_MARGIN
+        observed = history[:, t, None]
+        seasonal = season[:, :, t % SEASON]
+        residual = observed - level - seasonal
+        level = level + alpha * residual
+        season[:, :, t % SEASON] = seasonal + gamma * (observed - level - seasonal)
+
+    steps = (nights + np.arange(horizon)) % SEASON
+    candidates = np.concatenate([
+        level[:, :, None] + season[:, :, steps],
+        seasonal_baselines(history, horizon, nights),
+    ], axis=1)
+    best = np.argmin(error, axis=1)
+    picked = np.arange(rows)
+    return np.clip(candidates[picked, best], 0, None), error[picked, best]
+
+
+def _fit_chunk(args):
+    history, horizon = args
+    return fit_seasonal(history, horizon)
+
+
+def _fit_in_pool(history: np.ndarray, horizon: int, workers: int) -> tuple[np.ndarray, np.ndarray]:
+    chunks = np.array_split(history, min(len(history), workers * CHUNKS_PER_WORKER))
+    # spawn: the servers fork from threaded processes (journal writer, Redis pools)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        results = list(pool.map(_fit_chunk, [(chunk, horizon) for chunk in chunks]))
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def fit_all(history: np.ndarray, horizon: int, workers: int = FORECAST_WORKERS) -> tuple[np.ndarray, np.ndarray]:
+    """``fit_seasonal`` over chunks of series spread across a process pool.
+
+    The pool runs under a separate ``python -m server.forecast --fit`` process:
+    spawned workers re-import their parent's main module, and the servers' main
+    module loads the workbooks, starts the journal and takes file locks on import.
+    """
+    workers = min(workers, len(history) // MIN_SERIES_PER_WORKER)
+    if workers <= 1:
+        return fit_seasonal(history, horizon)
+    with tempfile.TemporaryDirectory(prefix="forecast-") as tmp:
+        source, fitted = os.path.join(tmp, "history.npy"), os.path.join(tmp, "fitted.npz")
+        np.save(source, history)
+        subprocess.run(
+            [sys.executable, "-m", "server.forecast", "--fit", source, fitted,
+             "--horizon", str(horizon), "--workers", str(workers)],
+            cwd=PROJECT_ROOT, check=True,
+        )
+        with np.load(fitted, allow_pickle=False) as result:
+            return result["sold"], result["error"]
+
+
+def forecast_path() -> str:
+    """Next to the snapshot of the booking history, so a new workbook means a fresh fit"""
+    try:
+        return artifact_path(BOOKINGS_HISTORY, FORECAST_FILE)
+    except OSError as e:
+        logger.warning("Snapshot cache unavailable (%s); keeping forecasts in the temp directory", e)
+        return os.path.join(tempfile.gettempdir(), FORECAST_FILE)
+
+
+def refit(analytics, path: str | None = None, horizon: int = FORECAST_HORIZON_DAYS,
+          workers: int = FORECAST_WORKERS) -> str:
+    """Fit every series of ``analytics`` and atomically replace the persisted forecast"""
+    started = time.perf_counter()
+    path = path or forecast_path()
+    keys, first_night, history = analytics.series_history()
+    sold, error = fit_all(history, horizon, workers)
+    # Rooms a series has: the most it ever had sold on one night
+    capacity = np.maximum(history.max(axis=1, initial=0), 1)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            keys=np.array([f"{hotel}\t{room_type}" for hotel, room_type in keys]),
+            start=np.array(str(first_night + history.shape[1])),
+            sold=sold.astype(np.float32),
+            capacity=capacity.astype(np.float32),
+            error=error.astype(np.float32),
+            fitted_at=np.array(time.time()),
+        )
+    os.replace(tmp_path, path)
+    logger.info("Fitted %d availability forecasts (%d days) in %.2fs with %d workers",
+                len(keys), horizon, time.perf_counter() - started, workers)
+    return path
+
+
+class AvailabilityForecast:
+    """Persisted per-series forecasts, reloaded whenever the file is replaced.
+
+    ``sold[series, day]`` is the expected rooms sold from ``start``; predicted
+    free rooms are the series' capacity minus that.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = None
+        self.series: dict[tuple[str, str], int] = {}
+        self.start = None
+        self.sold = self.capacity = self.error = None
+        self.fitted_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self) -> bool:
+        """Reload if the file changed; False when there is nothing persisted yet"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            if mtime == self.mtime:
+                return True
+            with np.load(self.path, allow_pickle=False) as saved:
+                self.series = {tuple(key.split("\t")): i for i, key in enumerate(saved["keys"])}
+                self.start = to_day(str(saved["start"]))
+                self.sold = saved["sold"]
+                self.capacity = saved["capacity"]
+                self.error = saved["error"]
+                self.fitted_at = float(saved["fitted_at"])
+            self.mtime = mtime
+        return True
+
+    @property
+    def end(self):
+        return self.start + self.sold.shape[1]
+
+    def predict(self, hotel: str, room_type: str | None, check_in=None, check_out=None) -> dict:
+        """Predicted free rooms per night for one room type or all of a hotel's, from the precomputed table"""
+        if not self.load():
+            return {"error": "Availability forecasts are still being prepared. Please try again shortly."}
+        hotel_key = normalize(hotel)
+        with self._lock:
+            rows = [
+                (room, row) for (h, room), row in self.series.items()
+                if h == hotel_key and (not room_type or room == normalize(room_type))
+            ]
+            if not rows:
+                return {"error": f"No booking history to forecast {room_type + ' at ' if room_type else ''}{hotel}"}
+            first = to_day(check_in) if check_in else self.start
+            last = to_day(check_out) if check_out else first + 14
+            lo = int(np.clip((first - self.start) // np.timedelta64(1, "D"), 0, self.sold.shape[1]))
+            hi = int(np.clip((last - self.start) // np.timedelta64(1, "D"), lo, self.sold.shape[1]))
+            if hi == lo:
+                return {"error": f"Forecasts cover {self.start} to {self.end}; check earlier dates with hotel_availability"}
+            report = {
+                "hotel_name": hotel,
+                "from": str(self.start + lo),
+                "to": str(self.start + hi),
+                "fitted_at": datetime.datetime.fromtimestamp(self.fitted_at).strftime("%Y-%m-%d %H:%M"),
+                "room_types": [],
+            }
+            for room, row in sorted(rows):
+                sold = self.sold[row, lo:hi]
+                free = np.clip(self.capacity[row] - sold, 0, None)
+                report["room_types"].append({
+                    "room_type": room.title(),
+                    "rooms": int(self.capacity[row]),
+                    "expected_free_min": round(float(free.min()), 1),
+                    "expected_free_avg": round(float(free.mean()), 1),
+                    "tightest_night": str(self.start + lo + int(np.argmin(free))),
+                    "sellout_risk": round(float((sold / self.capacity[row]).max()), 2),
+                    "typical_error": round(float(self.error[row]), 2),
+                })
+            return report
+
+    def start_nightly(self, refit_fn, lock_path: str):
+        """Refit once a day at ``FORECAST_REFIT_HOUR``; one worker refits, the others reload"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                now = datetime.datetime.now()
+                due = now.replace(hour=FORECAST_REFIT_HOUR, minute=0, second=0, microsecond=0)
+                if due <= now:
+                    due += datetime.timedelta(days=1)
+                if self._stop.wait((due - now).total_seconds()):
+                    return
+                try:
+                    with file_lock(lock_path, blocking=False) as acquired:
+                        if acquired is not None:
+                            refit_fn()
+                    self.load()
+                except Exception as e:
+                    log_exception(logger, e, "Nightly forecast refit failed")
+
+        self._thread = threading.Thread(target=run, name="forecast-refit", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    from server.analytics import BookingAnalytics
+    from server.booking_journal import BookingJournal
+    from server.inventory import InventoryIndex
+    from server.snapshot import load_frame
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--horizon", type=int, default=FORECAST_HORIZON_DAYS, help="days to forecast (30-90)")
+    parser.add_argument("--workers", type=int, default=FORECAST_WORKERS)
+    parser.add_argument("--fit", nargs=2, metavar=("HISTORY", "OUTPUT"),
+                        help="only fit the series saved in HISTORY (.npy) and save them to OUTPUT (.npz); used by fit_all")
+    args = parser.parse_args()
+
+    if args.fit:
+        source, fitted = args.fit
+        sold, error = _fit_in_pool(np.load(source, allow_pickle=False), args.horizon, args.workers)
+        with open(fitted, "wb") as f:
+            np.savez(f, sold=sold, error=error)
+        return
+
+    # History plus every booking taken since, as the servers see it
+    analytics = BookingAnalytics(load_frame(BOOKINGS_HISTORY))
+    journal = BookingJournal(os.getenv("BOOKINGS_FILE", "./data/bookings.xlsx"))
+    journal.subscribe(analytics.add_bookings)
+    journal.recover(InventoryIndex.from_frame(load_frame("./data/empty_rooms_5000.xlsx")))
+    print(refit(analytics, horizon=args.horizon, workers=args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+
+LOCK_STRIPES = 64
+
+
+def normalize(value) -> str:
+    return str(value).strip().lower()
+
+
+def to_day(value) -> np.datetime64:
+    if isinstance(value, np.datetime64):
+        return value.astype("datetime64[D]")
+    if isinstance(value, (datetime.date, datetime.datetime, pd.Timestamp)):
+        return np.datetime64(pd.Timestamp(value).date(), "D")
+    return np.datetime64(str(value)[:10], "D")
+
+
+class InventoryIndex:
+    """Nightly room counts per (hotel, room_type), held in one NumPy matrix.
+
+    ``empty_rooms_5000.xlsx`` lists one row per free room with an
+    ``Available_From``/``Available_To`` window. Rows are folded into
+    ``counts[series, day]`` with a difference array, so a stay
+    ``[check_in, check_out)`` is a slice of one row of the matrix: the minimum
+    over the slice is the bookable count and a reservation is a slice decrement.
+    """
+
+    def __init__(self, keys: list[tuple[str, str]], display: dict, start: np.datetime64, counts: np.ndarray):
+        self.series = {key: i for i, key in enumerate(keys)}
+        self.display = display
+        self.start = start
+        self.counts = counts
+        self.version = 0
+        # Bumped on every change to a series, for optimistic compare-and-swap
+        self.versions = np.zeros(len(keys), dtype=np.int64)
+        self.hotel_rows: dict[str, list[int]] = {}
+        for i, (hotel, _) in enumerate(keys):
+            self.hotel_rows.setdefault(hotel, []).append(i)
+        self._lock = threading.Lock()
+        self._series_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "InventoryIndex":
+        rooms = frame[frame["Status"].map(normalize) == "available"]
+        hotels = rooms["Hotel_Name"].map(normalize).to_numpy()
+        room_types = rooms["Room_Type"].map(normalize).to_numpy()
+        starts = pd.to_datetime(rooms["Available_From"]).to_numpy().astype("datetime64[D]")
+        ends = pd.to_datetime(rooms["Available_To"]).to_numpy().astype("datetime64[D]")
+
+        display = {}
+        for name, room_type in zip(rooms["Hotel_Name"], rooms["Room_Type"]):
+            display.setdefault(normalize(name), str(name).strip())
+            display.setdefault(normalize(room_type), str(room_type).strip())
+
+        pairs = pd.MultiIndex.from_arrays([hotels, room_types])
+        codes, keys = pd.factorize(pairs, sort=True)
+        start = starts.min() if len(starts) else np.datetime64("today", "D")
+        n_days = int((ends.max() - start).astype(int)) + 1 if len(ends) else 1
+
+        # +1 on the first free night, -1 on the day the room stops being free
+        diff = np.zeros((len(keys), n_days + 1), dtype=np.int32)
+        np.add.at(diff, (codes, (starts - start).astype(int)), 1)
+        np.add.at(diff, (codes, (ends - start).astype(int)), -1)
+        counts = np.cumsum(diff, axis=1)[:, :n_days].astype(np.int32)
+        return cls(list(keys), display, start, counts)
+
+    @property
+    def end(self) -> np.datetime64:
+        return self.start + self.counts.shape[1]
+
+    def _slice(self, check_in, check_out) -> tuple[int, int, int, int]:
+        """Clip a stay to the indexed calendar; returns (lo, hi, pad_lo, pad_hi)"""
+        first = int((to_day(check_in) - self.start).astype(int))
+        last = int((to_day(check_out) - self.start).astype(int))
+        lo, hi = max(first, 0), min(last, self.counts.shape[1])
+        return lo, hi, lo - first, last - max(hi, lo)
+
+    def has_hotel(self, hotel: str) -> bool:
+        key = normalize(hotel)
+        return any(h == key for h, _ in self.series)
+
+    def room_types(self, hotel: str) -> list[str]:
+        key = normalize(hotel)
+        return [self.display.get(r, r) for h, r in self.series if h == key]
+
+    def nightly(self, hotel: str, room_type: str, check_in, check_out) -> np.ndarray:
+        """Free rooms for each night of ``[check_in, check_out)``, zero outside the calendar"""
+        row = self.series.get((normalize(hotel), normalize(room_type)))
+        lo, hi, pad_lo, pad_hi = self._slice(check_in, check_out)
+        window = self.counts[row, lo:hi] if row is not None and hi > lo else np.zeros(0, dtype=np.int32)
+        return np.concatenate([np.zeros(pad_lo, np.int32), window, np.zeros(pad_hi, np.int32)])
+
+    def min_available(self, hotel: str, room_type: str, check_in, check_out) -> int:
+        nights = self.nightly(hotel, room_type, check_in, check_out)
+        return int(nights.min()) if len(nights) else 0
+
+    def first_sold_out(self, hotel: str, room_type: str, check_in, check_out) -> str | None:
+        nights = self.nightly(hotel, room_type, check_in, check_out)
+        empty = np.flatnonzero(nights <= 0)
+        if not len(empty):
+            return None
+        return str(to_day(check_in) + int(empty[0]))
+
+    def stay_matrix(self, pairs: list[tuple[str, str]], first_check_in, last_check_in, nights: int = 1) -> np.ndarray:
+        """Bookable rooms for a ``nights`` stay from every check-in day, for many series at once.
+
+        Returns ``[len(pairs), days]`` where column ``d`` is the stay checking
+        in ``first_check_in + d``: the minimum of each series over a sliding
+        window of ``nights`` nights. Unknown series and nights outside the
+        calendar count as zero.
+        """
+        nights = max(int(nights), 1)
+        days = int((to_day(last_check_in) - to_day(first_check_in)).astype(int)) + 1
+        if days <= 0 or not pairs:
+            return np.zeros((len(pairs), max(days, 0)), dtype=np.int32)
+        rows = np.asarray([self.series.get((normalize(h), normalize(r)), -1) for h, r in pairs], dtype=np.int64)
+        lo, hi, pad_lo, _ = self._slice(first_check_in, to_day(last_check_in) + nights)
+        window = np.zeros((len(pairs), days + nights - 1), dtype=np.int32)
+        known = rows >= 0
+        if hi > lo and known.any():
+            window[known, pad_lo:pad_lo + hi - lo] = self.counts[rows[known], lo:hi]
+        return np.lib.stride_tricks.sliding_window_view(window, nights, axis=1).min(axis=2)
+
+    def _series_lock(self, row: int) -> threading.Lock:
+        return self._series_locks[row % LOCK_STRIPES]
+
+    def version_of(self, hotel: str, room_type: str) -> int:
+        row = self.series.get((normalize(hotel), normalize(room_type)))
+        return -1 if row is None else int(self.versions[row])
+
+    def hotel_version(self, hotel: str) -> int:
+        """Sum of the hotel's series versions; changes whenever any of its rooms do"""
+        rows = self.hotel_rows.get(normalize(hotel))
+        return -1 if not rows else int(self.versions[rows].sum())
+
+    def reserve(self, hotel: str, room_type: str, check_in, check_out, rooms: int = 1,
+                expected_version: int | None = None) -> bool:
+        """Atomically take ``rooms`` for every night of the stay if all nights have them.
+
+        With ``expected_version`` the reservation also fails if the series
+        changed since that version was read (compare-and-swap).
+        """
+        row = self.series.get((normalize(hotel), normalize(room_type)))
+        lo, hi, pad_lo, pad_hi = self._slice(check_in, check_out)
+        if row is None or pad_lo or pad_hi or hi <= lo:
+            return False
+        with self._series_lock(row):
+            if expected_version is not None and self.versions[row] != expected_version:
+                return False
+            window = self.counts[row, lo:hi]
+            if window.min() < rooms:
+                return False
+            window -= rooms
+            self.versions[row] += 1
+            self.version += 1
+        return True
+
+    def adjust(self, hotel: str, room_type: str, check_in, check_out, rooms: int):
+        """Unconditionally add ``rooms`` (negative to take) to every night of the stay"""
+        row = self.series.get((normalize(hotel), normalize(room_type)))
+        lo, hi, _, _ = self._slice(check_in, check_out)
+        if row is None or hi <= lo:
+            return
+        with self._series_lock(row):
+            self.counts[row, lo:hi] += rooms
+            self.versions[row] += 1
+            self.version += 1
+
+    def release(self, hotel: str, room_type: str, check_in, check_out, rooms: int = 1):
+        self.adjust(hotel, room_type, check_in, check_out, rooms)
+
+    def apply_bookings(self, bookings: pd.DataFrame):
+        """Subtract already confirmed bookings from the free-room supply in one pass"""
+        if bookings.empty:
+            return
+        confirmed = bookings[bookings["status"].map(normalize) == "confirmed"]
+        rows = [
+            self.series.get((normalize(h), normalize(r)), -1)
+            for h, r in zip(confirmed["hotel_name"], confirmed["room_type"])
+        ]
+        rows = np.asarray(rows, dtype=np.int64)
+        first = (pd.to_datetime(confirmed["check_in"]).to_numpy().astype("datetime64[D]") - self.start).astype(int)
+        last = (pd.to_datetime(confirmed["check_out"]).to_numpy().astype("datetime64[D]") - self.start).astype(int)
+        n_days = self.counts.shape[1]
+        keep = (rows >= 0) & (last > 0) & (first < n_days)
+        diff = np.zeros((self.counts.shape[0], n_days + 1), dtype=np.int32)
+        np.add.at(diff, (rows[keep], np.clip(first[keep], 0, n_days)), -1)
+        np.add.at(diff, (rows[keep], np.clip(last[keep], 0, n_days)), 1)
+        touched = np.unique(rows[keep])
+        with self._lock:
+            self.counts += np.cumsum(diff, axis=1)[:, :n_days].astype(np.int32)
+            self.versions[touched] += 1
+            self.version += 1
+
+    def availability_summary(self, hotel: str) -> dict:
+        """Compact per-room-type view of free windows for one hotel"""
+        key = normalize(hotel)
+        summary = {}
+        for (h, r), row in self.series.items():
+            if h != key:
+                continue
+            counts = self.counts[row]
+            free = np.concatenate([[False], counts > 0, [False]])
+            edges = np.flatnonzero(np.diff(free.astype(np.int8)))
+            summary[self.display.get(r, r)] = [
+                {
+                    "from": str(self.start + int(lo)),
+                    "to": str(self.start + int(hi)),
+                    "min_rooms": int(counts[lo:hi].min()),
+                    "max_rooms": int(counts[lo:hi].max()),
+                }
+                for lo, hi in zip(edges[::2], edges[1::2])
+            ]
+        return summary
@@ -0,0 +1,228 @@
+import re
+import threading
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache
+
+LEVELS = ("state", "county", "city")
+_WORD = re.compile(r"[a-z0-9]+")
+# Memoized corrections and resolutions kept per index
+MEMO_SIZE = 4096
+_MISSING = object()
+
+US_STATES = {
+    "al": "alabama", "ak": "alaska", "az": "arizona", "ar": "arkansas", "ca": "california", "co": "colorado",
+    "ct": "connecticut", "de": "delaware", "fl": "florida", "ga": "georgia", "hi": "hawaii", "id": "idaho",
+    "il": "illinois", "in": "indiana", "ia": "iowa", "ks": "kansas", "ky": "kentucky", "la": "louisiana",
+    "me": "maine", "md": "maryland", "ma": "massachusetts", "mi": "michigan", "mn": "minnesota",
+    "ms": "mississippi", "mo": "missouri", "mt": "montana", "ne": "nebraska", "nv": "nevada",
+    "nh": "new hampshire", "nj": "new jersey", "nm": "new mexico", "ny": "new york", "nc": "north carolina",
+    "nd": "north dakota", "oh": "ohio", "ok": "oklahoma", "or": "oregon", "pa": "pennsylvania",
+    "ri": "rhode island", "sc": "south carolina", "sd": "south dakota", "tn": "tennessee", "tx": "texas",
+    "ut": "utah", "vt": "vermont", "va": "virginia", "wa": "washington", "wv": "west virginia",
+    "wi": "wisconsin", "wy": "wyoming",
+}
+# Abbreviations that are also everyday words are never read as states
+_AMBIGUOUS_ABBREVIATIONS = {"in", "me", "or", "ok", "hi", "oh", "id", "la", "ma", "pa", "de", "co", "al", "mi", "wa"}
+CITY_ALIASES = {
+    "nyc": "new york",
+    "vegas": "las vegas",
+    "sf": "san francisco",
+    "frisco": "san francisco",
+    "l a": "los angeles",
+    "chi town": "chicago",
+}
+
+
+def location_key(value) -> str:
+    """Lowercase words only: "Miami-Dade" and "miami dade" are the same place"""
+    return " ".join(_WORD.findall(str(value).lower()))
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance counting a swap of neighbours as one edit ("yrok" -> "york"),
+    or ``limit + 1`` as soon as it must exceed ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class LocationMatch:
+    """A place found in a question, with the hotel rows it covers"""
+
+    name: str
+    levels: tuple[str, ...]
+    rows: np.ndarray
+    start: int = 0
+    end: int = 0
+    says_county: bool = False
+    corrected_from: str | None = None
+    children: list[str] = field(default_factory=list)
+
+
+class LocationIndex:
+    """State -> County -> City tree over the catalog with row ids at every node.
+
+    Names are normalized with ``location_key``; state abbreviations and a few
+    city nicknames resolve to the canonical name. A misspelling such as
+    "chicgo" is resolved by fetching the names that share character trigrams
+    with it and keeping the closest one (same first letter) within an
+    edit-distance budget that grows with the name's length. A county or state
+    covers the rows of everything under it, so "Cook County" matches all its
+    cities. Resolutions are memoized, so repeated lookups cost a dict hit.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.display: dict[str, str] = {}
+        self.nodes: dict[tuple[str, str], np.ndarray] = {}
+        self.children: dict[tuple[str, str], set[str]] = {}
+        keys = {}
+        for level in LEVELS:
+            keys[level] = frame[level.title()].map(location_key).to_numpy()
+            for key, value in zip(keys[level], frame[level.title()]):
+                self.display.setdefault(key, str(value).strip())
+            for key in pd.unique(keys[level]):
+                self.nodes[(level, key)] = np.flatnonzero(keys[level] == key)
+        for state, county, city in zip(keys["state"], keys["county"], keys["city"]):
+            self.children.setdefault(("state", state), set()).add(county)
+            self.children.setdefault(("county", county), set()).add(city)
+
+        self.levels: dict[str, tuple[str, ...]] = {}
+        for level, key in self.nodes:
+            self.levels[key] = self.levels.get(key, ()) + (level,)
+        self.aliases = {alias: name for alias, name in CITY_ALIASES.items() if name in self.levels}
+        self.aliases.update({
+            abbreviation: state for abbreviation, state in US_STATES.items()
+            if ("state", state) in self.nodes and abbreviation not in _AMBIGUOUS_ABBREVIATIONS
+        })
+        self.names = sorted(self.levels)
+        self.max_words = max((len(name.split()) for name in list(self.names) + list(self.aliases)), default=1)
+        self._by_trigram: dict[str, list[int]] = {}
+        for i, name in enumerate(self.names):
+            for gram in _trigrams(name):
+                self._by_trigram.setdefault(gram, []).append(i)
+        # Per-instance memo tables, so an index and its cache are dropped together
+        self._corrections = LRUCache(maxsize=MEMO_SIZE)
+        self._resolved = LRUCache(maxsize=MEMO_SIZE)
+        self._memo_lock = threading.Lock()
+
+    def _memoized(self, cache: LRUCache, key: str, compute):
+        with self._memo_lock:
+            value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute(key)
+            with self._memo_lock:
+                cache[key] = value
+        return value
+
+    def rows(self, name: str, level: str | None = None) -> np.ndarray:
+        """Row ids under a place at any level (or one level), empty if unknown"""
+        key = location_key(name)
+        key = self.aliases.get(key, key)
+        parts = [self.nodes[(lvl, key)] for lvl in ([level] if level else LEVELS) if (lvl, key) in self.nodes]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts))
+
+    def rollup(self, name: str) -> dict:
+        """Hotel rows per child place, e.g. the cities of a county with their hotel counts"""
+        key = location_key(name)
+        key = self.aliases.get(key, key)
+        summary = {}
+        for level in self.levels.get(key, ()):
+            below = sorted(self.children.get((level, key), ()))
+            if below:
+                child_level = LEVELS[LEVELS.index(level) + 1]
+                rows = self.nodes[(level, key)]
+                summary[level] = {
+                    self.display[child]: int(np.isin(self.nodes[(child_level, child)], rows).sum()) for child in below
+                }
+        return summary
+
+    def correct(self, phrase: str) -> str | None:
+        """Canonical name ``phrase`` is a misspelling of, if any is close enough"""
+        return self._memoized(self._corrections, phrase, self._correct)
+
+    def _correct(self, phrase: str) -> str | None:
+        if len(phrase) < 5:
+            return None
+        counts: dict[int, int] = {}
+        for gram in _trigrams(phrase):
+            for i in self._by_trigram.get(gram, ()):
+                counts[i] = counts.get(i, 0) + 1
+        best, best_distance = None, None
+        for i in sorted(counts, key=counts.get, reverse=True)[:8]:
+            name = self.names[i]
+            # Typos rarely hit the first letter; requiring it keeps "range" from becoming "orange"
+            if name[0] != phrase[0]:
+                continue
+            limit = 1 if len(name) < 9 else 2
+            distance = edit_distance(phrase, name, limit)
+            if distance <= limit and (best_distance is None or distance < best_distance):
+                best, best_distance = name, distance
+        return best
+
+    def resolve(self, text: str) -> LocationMatch | None:
+        """One place name (exact, alias or misspelled) to its rows"""
+        return self._memoized(self._resolved, text, self._resolve)
+
+    def _resolve(self, text: str) -> LocationMatch | None:
+        key = location_key(text)
+        name = key if key in self.levels else self.aliases.get(key) or self.correct(key)
+        if name is None:
+            return None
+        return LocationMatch(
+            name=name,
+            levels=self.levels[name],
+            rows=self.rows(name),
+            corrected_from=key if name != key and key not in self.aliases else None,
+            children=[self.display[c] for level in self.levels[name] for c in sorted(self.children.get((level, name), ()))],
+        )
+
+    def find(self, text: str, reserved: frozenset = frozenset()) -> list[LocationMatch]:
+        """Every place mentioned in ``text``, longest phrase first, with its character span.
+
+        Words in ``reserved`` (room types, amenities) are never fuzzy-matched.
+        """
+        words = [(m.group(), m.start(), m.end()) for m in _WORD.finditer(text.lower())]
+        found, i = [], 0
+        while i < len(words):
+            match = None
+            for n in range(min(self.max_words, len(words) - i), 0, -1):
+                phrase = " ".join(w for w, _, _ in words[i:i + n])
+                exact = phrase in self.levels or phrase in self.aliases
+                if not exact and (n > 1 and any(w in reserved for w, _, _ in words[i:i + n]) or phrase in reserved):
+                    continue
+                match = self.resolve(phrase)
+                if match is not None:
+                    break
+            if match is None:
+                i += 1
+                continue
+            following = words[i + n][0] if i + n < len(words) else ""
+            found.append(LocationMatch(
+                name=match.name, levels=match.levels, rows=match.rows,
+                start=words[i][1], end=words[i + n - 1][2],
+                says_county=following == "county",
+                corrected_from=match.corrected_from, children=match.children,
+            ))
+            i += n
+        return found
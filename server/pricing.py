@@ -0,0 +1,175 @@
+import datetime
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+
+from server.inventory import InventoryIndex, normalize, to_day
+from server.search_filter import HotelCatalog
+from server.structured_responses import room_prices, stay_nights
+
+TARGET_OCCUPANCY = float(os.getenv("PRICING_TARGET_OCCUPANCY", "0.7"))
+MIN_MULTIPLIER = float(os.getenv("PRICING_MIN_MULTIPLIER", "0.8"))
+MAX_MULTIPLIER = float(os.getenv("PRICING_MAX_MULTIPLIER", "1.5"))
+PICKUP_WINDOW_DAYS = float(os.getenv("PRICING_PICKUP_WINDOW_DAYS", "7"))
+REFRESH_SEC = float(os.getenv("PRICING_REFRESH_SEC", "300"))
+OCCUPANCY_WEIGHT = 0.6
+PICKUP_WEIGHT = 0.15
+LEAD_SCALE_DAYS = 21
+# Bookings per day added to both sides of the pickup ratio, so one booking on a quiet room is not a surge
+PICKUP_PRIOR = 0.1
+
+
+class PricingEngine:
+    """Recommended nightly price for every (hotel, room_type, night) of the inventory.
+
+    ``prices[series, day]`` is the listed price times a demand multiplier built
+    from three signals:
+
+    - occupancy: rooms sold (booking history) over rooms sold plus rooms still free
+    - pickup: bookings taken in the last ``PICKUP_WINDOW_DAYS`` above the room's usual rate
+    - lead time: how close the night is, which scales the occupancy signal
+
+    The whole table is computed in one vectorized pass. After that, only the
+    series whose inventory version changed (any booking, in any worker) are
+    recomputed, lazily at the next quote. A quote is then just a slice of the
+    table.
+    """
+
+    def __init__(self, inventory: InventoryIndex, analytics, catalog: HotelCatalog, as_of=None):
+        self.inventory = inventory
+        self.analytics = analytics
+        self.keys = sorted(inventory.series, key=inventory.series.get)
+        self.as_of = to_day(as_of or os.getenv("PRICING_AS_OF") or np.datetime64("today", "D"))
+        if self.as_of >= inventory.end:
+            # A historical dataset: price it as seen from its first night
+            self.as_of = inventory.start
+        prices_by_hotel: dict[str, dict] = {}
+        self.base = np.array([
+            prices_by_hotel.setdefault(hotel, room_prices(catalog, hotel)).get(room_type, np.nan)
+            for hotel, room_type in self.keys
+        ])
+        days = inventory.counts.shape[1]
+        self.prices = np.full((len(self.keys), days), np.nan, dtype=np.float32)
+        self.occupancy = np.zeros((len(self.keys), days), dtype=np.float32)
+        self.pickup = np.ones(len(self.keys), dtype=np.float32)
+        self.versions = np.full(len(self.keys), -1, dtype=np.int64)
+        self.refreshed_at = 0.0
+        self._recent: dict[int, deque] = {}
+        self._lock = threading.Lock()
+
+    def add_bookings(self, bookings: list[dict]):
+        """Journal listener: remember when bookings were taken, for the pickup signal"""
+        horizon = time.time() - PICKUP_WINDOW_DAYS * 86400
+        with self._lock:
+            for booking in bookings:
+                row = self.inventory.series.get((normalize(booking.get("hotel_name")), normalize(booking.get("room_type"))))
+                created = booking.get("created_at")
+                if row is None or not created:
+                    continue
+                try:
+                    taken = datetime.datetime.strptime(str(created)[:19], "%Y-%m-%d %H:%M:%S").timestamp()
+                except ValueError:
+                    continue
+                if taken >= horizon:
+                    self._recent.setdefault(row, deque()).append(taken)
+
+    def _pickup_rates(self, rows: np.ndarray) -> np.ndarray:
+        """Bookings per day over the pickup window; called with the lock held"""
+        horizon = time.time() - PICKUP_WINDOW_DAYS * 86400
+        rates = np.zeros(len(rows))
+        for i, row in enumerate(rows):
+            recent = self._recent.get(int(row))
+            while recent and recent[0] < horizon:
+                recent.popleft()
+            rates[i] = len(recent) / PICKUP_WINDOW_DAYS if recent else 0.0
+        return rates
+
+    def _compute(self, rows: np.ndarray):
+        """Recompute the given series; called with the lock held"""
+        days = self.prices.shape[1]
+        versions = self.inventory.versions[rows].copy()
+        free = self.inventory.counts[rows].astype(np.float32)
+        sold, usual = self.analytics.demand([self.keys[r] for r in rows], self.inventory.start, days)
+        supply = sold + free
+        occupancy = np.divide(sold, supply, out=np.full(free.shape, TARGET_OCCUPANCY, dtype=np.float32), where=supply > 0)
+
+        nights = self.inventory.start + np.arange(days)
+        lead = np.maximum((nights - self.as_of) // np.timedelta64(1, "D"), 0)
+        urgency = np.exp(-lead / LEAD_SCALE_DAYS)
+        # Only a surge counts: a quiet window may just mean this worker started recently
+        pickup = np.clip((self._pickup_rates(rows) + PICKUP_PRIOR) / (usual + PICKUP_PRIOR), 1.0, 3.0)
+
+        demand = OCCUPANCY_WEIGHT * (occupancy - TARGET_OCCUPANCY) * (0.5 + urgency) + PICKUP_WEIGHT * (pickup[:, None] - 1)
+        multiplier = np.clip(1 + demand, MIN_MULTIPLIER, MAX_MULTIPLIER)
+        self.prices[rows] = np.round(self.base[rows, None] * multiplier, 2)
+        self.occupancy[rows] = occupancy
+        self.pickup[rows] = pickup
+        self.versions[rows] = versions
+
+    def refresh(self, full: bool = False):
+        """Recompute stale series, or the whole table when ``full`` or every ``REFRESH_SEC``"""
+        with self._lock:
+            if full or time.time() - self.refreshed_at > REFRESH_SEC:
+                rows = np.arange(len(self.keys))
+                self.refreshed_at = time.time()
+            else:
+                rows = np.flatnonzero(self.versions != self.inventory.versions)
+            if len(rows):
+                self._compute(rows)
+
+    def quote(self, hotel: str, room_type: str | None, check_in, check_out) -> dict:
+        """Recommended prices per night of ``[check_in, check_out)`` for one room type or all of them"""
+        self.refresh()
+        hotel_key = normalize(hotel)
+        rows = [
+            row for row in self.inventory.hotel_rows.get(hotel_key, [])
+            if not room_type or self.keys[row][1] == normalize(room_type)
+        ]
+        if not rows:
+            return {"error": f"No {room_type + ' ' if room_type else ''}rooms listed for {hotel}"}
+        first = int((to_day(check_in) - self.inventory.start) // np.timedelta64(1, "D"))
+        last = int((to_day(check_out) - self.inventory.start) // np.timedelta64(1, "D"))
+        if first < 0 or last > self.prices.shape[1] or last <= first:
+            return {"error": f"Prices are available from {self.inventory.start} to {self.inventory.end}"}
+
+        quote = {
+            "hotel_name": self.inventory.display.get(hotel_key, hotel),
+            "check_in": str(to_day(check_in)),
+            "check_out": str(to_day(check_out)),
+            "nights": stay_nights(check_in, check_out),
+            "lead_days": max(int((to_day(check_in) - self.as_of) // np.timedelta64(1, "D")), 0),
+            "room_types": [],
+        }
+        with self._lock:
+            for row in rows:
+                prices = self.prices[row, first:last]
+                base = self.base[row]
+                if np.isnan(base):
+                    continue
+                quote["room_types"].append({
+                    "room_type": self.inventory.display.get(self.keys[row][1], self.keys[row][1]),
+                    "listed_price": float(base),
+                    "recommended_total": round(float(prices.sum()), 2),
+                    "change": round(float(prices.sum() / (base * len(prices)) - 1), 3),
+                    "pickup": round(float(self.pickup[row]), 2),
+                    "per_night": [
+                        {"date": str(to_day(check_in) + i), "price": round(float(p), 2), "occupancy": round(float(o), 2),
+                         "rooms_left": int(n)}
+                        for i, (p, o, n) in enumerate(zip(prices, self.occupancy[row, first:last],
+                                                          self.inventory.counts[row, first:last]))
+                    ],
+                })
+        if not quote["room_types"]:
+            return {"error": f"No listed prices for {hotel}"}
+        return quote
+
+
+def pricing_message(quote: dict) -> str:
+    parts = []
+    for room in quote["room_types"]:
+        change = room["change"]
+        trend = "at the listed rate" if abs(change) < 0.005 else f"{abs(change):.0%} {'above' if change > 0 else 'below'} the listed rate"
+        parts.append(f"{room['room_type']} ${room['recommended_total']:,.0f} total ({trend})")
+    return f"{quote['hotel_name']}, {quote['check_in']} to {quote['check_out']}: " + "; ".join(parts) + "."
@@ -0,0 +1,139 @@
+import os
+import re
+import threading
+import zlib
+import numpy as np
+from cachetools import TTLCache
+
+from config.tracing import record_cache
+
+CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+CACHE_TTL_SEC = float(os.getenv("RESPONSE_CACHE_TTL_SEC", "600"))
+SEMANTIC_ENABLED = os.getenv("RESPONSE_CACHE_SEMANTIC", "0") == "1"
+SEMANTIC_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.85"))
+# Optional sentence-transformers model name; the hashing embedder is used otherwise
+EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "")
+
+_STOPWORDS = {
+    "a", "an", "the", "in", "at", "of", "for", "to", "me", "my", "i", "please", "show", "find",
+    "suggest", "list", "any", "some", "can", "you", "is", "are", "there", "with", "and", "what",
+}
+
+
+def canonical_text(text: str) -> str:
+    """Lowercased, punctuation-free, stopword-free, order-insensitive form of a question"""
+    tokens = re.findall(r"[a-z0-9_]+", str(text).lower())
+    return " ".join(sorted(t for t in tokens if t not in _STOPWORDS))
+
+
+class HashingEmbedder:
+    """CPU-only character trigram embeddings hashed into a fixed-size vector"""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def embed(self, text: str) -> np.ndarray:
+        padded = f"  {canonical_text(text)}  "
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for i in range(len(padded) - 2):
+            vector[zlib.crc32(padded[i:i + 3].encode()) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.model.encode(text, normalize_embeddings=True)
+
+
+def default_embedder():
+    if not SEMANTIC_ENABLED:
+        return None
+    if EMBEDDING_MODEL:
+        try:
+            return SentenceTransformerEmbedder(EMBEDDING_MODEL)
+        except Exception:
+            pass
+    return HashingEmbedder()
+
+
+class ResponseCache:
+    """TTL + LRU cache of tool responses with tag invalidation.
+
+    The exact tier is keyed by (tool, structured query, dataset version,
+    canonical question). The optional semantic tier only compares questions
+    that parsed to the same structured query and version, so paraphrases hit
+    while a different price or city never does.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float = CACHE_TTL_SEC,
+                 embedder=None, threshold: float = SEMANTIC_THRESHOLD):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.embedder = embedder
+        self.threshold = threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._tags: dict[str, set] = {}
+        self._buckets: dict[tuple, list[tuple[np.ndarray, tuple]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tool: str, query_key: str, version, text: str):
+        bucket = (tool, query_key, version)
+        key = bucket + (canonical_text(text),)
+        with self._lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.hits += 1
+                record_cache(tool, "hit")
+                return value
+            if self.embedder is not None and bucket in self._buckets:
+                vector = self.embedder.embed(text)
+                live = [(v, k) for v, k in self._buckets[bucket] if k in self.entries]
+                self._buckets[bucket] = live
+                if live:
+                    scores = np.stack([v for v, _ in live]) @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.threshold:
+                        self.hits += 1
+                        self.semantic_hits += 1
+                        record_cache(tool, "semantic_hit")
+                        return self.entries[live[best][1]]
+            self.misses += 1
+            record_cache(tool, "miss")
+            return None
+
+    def put(self, tool: str, query_key: str, version, text: str, value, tags: list[str] = ()):
+        bucket = (tool, query_key, version)
+        key = bucket + (canonical_text(text),)
+        vector = self.embedder.embed(text) if self.embedder is not None else None
+        with self._lock:
+            self.entries[key] = value
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            if vector is not None:
+                self._buckets.setdefault(bucket, []).append((vector, key))
+
+    def invalidate(self, tag: str) -> int:
+        """Drop every entry tagged with ``tag``; returns how many were live"""
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+            dropped = 0
+            for key in keys:
+                if self.entries.pop(key, None) is not None:
+                    dropped += 1
+            return dropped
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
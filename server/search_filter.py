@@ -0,0 +1,230 @@
+import json
+import re
+from dataclasses import dataclass, field, asdict
+import numpy as np
+import pandas as pd
+
+from server.inventory import normalize
+from server.text_index import MIN_PREFIX, TextIndex, tokenize
+from server.location_index import LocationIndex
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its encoding cannot be fetched
+    _encoding = None
+
+AMENITY_SYNONYMS = {
+    "wi-fi": "wifi",
+    "internet": "wifi",
+    "ac": "air conditioning",
+    "a/c": "air conditioning",
+    "aircon": "air conditioning",
+    "fitness": "gym",
+    "swimming": "pool",
+    "television": "tv",
+    "free parking": "parking",
+}
+
+_MONEY = r"\$?\s*(\d+(?:\.\d+)?)"
+_BETWEEN = re.compile(rf"(?:between|from)\s+{_MONEY}\s*(?:and|to|-)\s*{_MONEY}")
+_RANGE = re.compile(rf"{_MONEY}\s*(?:-|to)\s*{_MONEY}")
+_MAX = re.compile(rf"(?:under|below|less than|cheaper than|up to|max(?:imum)?|at most|within|<=?)\s*{_MONEY}")
+_MIN = re.compile(rf"(?:over|above|more than|at least|min(?:imum)?|from|>=?)\s*{_MONEY}")
+_HOTEL = re.compile(r"\bhotel[_\s]?(\d+)\b")
+_DATE = re.compile(r"\d{4}-\d{1,2}-\d{1,2}")
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class HotelQuery:
+    """Structured filters pulled out of a free-text search request"""
+
+    locations: list[str] = field(default_factory=list)
+    counties: list[str] = field(default_factory=list)
+    room_types: list[str] = field(default_factory=list)
+    amenities: list[str] = field(default_factory=list)
+    hotel_names: list[str] = field(default_factory=list)
+    min_price: float | None = None
+    max_price: float | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not any(asdict(self).values())
+
+    def key(self) -> str:
+        return json.dumps({k: sorted(v) if isinstance(v, list) else v for k, v in asdict(self).items()}, sort_keys=True)
+
+
+def _phrase_pattern(phrase: str) -> re.Pattern:
+    return re.compile(rf"(?<![\w-]){re.escape(phrase)}(?![\w-])")
+
+
+class HotelCatalog:
+    """``hotels.xlsx`` with per-column lookup tables for deterministic pre-filtering.
+
+    Each location, room type, hotel name and amenity maps to the row ids that
+    carry it, prices are kept sorted for range lookups, and a request is answered
+    by intersecting those row-id sets before anything is sent to the LLM. Places
+    resolve through a ``LocationIndex`` (typos, abbreviations, county and state
+    rollups), and the rows that pass are ranked by BM25 over Amenities and Details.
+    """
+
+    def __init__(self, frame: pd.DataFrame, text_index: TextIndex | None = None):
+        self.frame = frame.reset_index(drop=True)
+        self.records = self.frame.to_dict(orient="records")
+        self.n_rows = len(self.frame)
+
+        self.by_city = self._lookup(self.frame["City"])
+        self.by_state = self._lookup(self.frame["State"])
+        self.by_county = self._lookup(self.frame["County"])
+        self.by_room_type = self._lookup(self.frame["Room_Type"])
+        self.by_hotel = self._lookup(self.frame["Hotel_Name"])
+        self.locations = LocationIndex(self.frame)
+
+        amenity_lists = self.frame["Amenities"].fillna("").map(
+            lambda value: [normalize(a) for a in str(value).split(",") if a.strip()]
+        )
+        postings: dict[str, list[int]] = {}
+        for row, amenities in enumerate(amenity_lists):
+            for amenity in amenities:
+                postings.setdefault(amenity, []).append(row)
+        self.by_amenity = {k: np.asarray(v, dtype=np.int64) for k, v in postings.items()}
+        # Single words of each amenity, for prefix matches such as "park" or "breakf"
+        self.amenity_words = sorted({(word, amenity) for amenity in self.by_amenity for word in tokenize(amenity)})
+        self.text_index = text_index or TextIndex.build(self.frame)
+
+        prices = self.frame["Price"].to_numpy(dtype=float)
+        self.price_order = np.argsort(prices, kind="stable")
+        self.sorted_prices = prices[self.price_order]
+
+        self.room_type_terms = sorted(self.by_room_type, key=len, reverse=True)
+        self.amenity_terms = sorted(set(self.by_amenity) | set(AMENITY_SYNONYMS), key=len, reverse=True)
+        self._patterns = {
+            term: _phrase_pattern(term)
+            for term in set(self.room_type_terms) | set(self.amenity_terms)
+        }
+        # Never read as misspelled places
+        self.reserved_words = frozenset(
+            word for term in set(self.room_type_terms) | set(self.amenity_terms) for word in tokenize(term)
+        )
+        self.full_prompt_tokens = count_tokens(json.dumps(self.records))
+
+    @staticmethod
+    def _lookup(column: pd.Series) -> dict[str, np.ndarray]:
+        keys = column.map(normalize).to_numpy()
+        return {key: np.flatnonzero(keys == key) for key in pd.unique(keys)}
+
+    def parse(self, question: str) -> HotelQuery:
+        text = normalize(question)
+        query = HotelQuery()
+
+        for term in self.room_type_terms:
+            if self._patterns[term].search(text):
+                query.room_types.append(term)
+
+        places = self.locations.find(text, self.reserved_words)
+        for place in places:
+            if place.says_county and "county" in place.levels:
+                query.counties.append(place.name)
+            elif place.name in query.room_types and not {"city", "state"} & set(place.levels):
+                # "king" is both a county and a room type; a bare mention means the room
+                continue
+            else:
+                query.locations.append(place.name)
+        for place in reversed(places):
+            text = text[:place.start] + " " + text[place.end:]
+
+        for term in self.amenity_terms:
+            if self._patterns[term].search(text):
+                amenity = AMENITY_SYNONYMS.get(term, term)
+                if amenity in self.by_amenity and amenity not in query.amenities:
+                    query.amenities.append(amenity)
+
+        for token in tokenize(text):
+            if len(token) < MIN_PREFIX:
+                continue
+            for word, amenity in self.amenity_words:
+                if (word.startswith(token) or word == token.rstrip("s")) and amenity not in query.amenities:
+                    query.amenities.append(amenity)
+
+        query.hotel_names = [f"hotel_{n}" for n in _HOTEL.findall(text)]
+        query.hotel_names = [h for h in query.hotel_names if h in self.by_hotel]
+
+        # Dates and hotel numbers are not prices
+        text = _DATE.sub(" ", _HOTEL.sub(" ", text))
+
+        if match := _BETWEEN.search(text) or _RANGE.search(text):
+            low, high = sorted(float(v) for v in match.groups())
+            query.min_price, query.max_price = low, high
+        else:
+            if match := _MAX.search(text):
+                query.max_price = float(match.group(1))
+            if match := _MIN.search(text):
+                query.min_price = float(match.group(1))
+        return query
+
+    def _union(self, table: dict[str, np.ndarray], keys: list[str]) -> np.ndarray:
+        parts = [table[k] for k in keys if k in table]
+        return np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def filter(self, query: HotelQuery) -> np.ndarray:
+        """Row ids matching every filter in ``query``, cheapest first"""
+        if query.min_price is not None or query.max_price is not None:
+            lo = np.searchsorted(self.sorted_prices, query.min_price, "left") if query.min_price is not None else 0
+            hi = np.searchsorted(self.sorted_prices, query.max_price, "right") if query.max_price is not None else self.n_rows
+            rows = self.price_order[lo:hi]
+        else:
+            rows = self.price_order
+
+        # Each named place may be a city, county or state ("new york"), any of which matches
+        for location in query.locations:
+            rows = rows[np.isin(rows, self.locations.rows(location))]
+        if query.counties:
+            counties = [self.locations.rows(county, "county") for county in query.counties]
+            rows = rows[np.isin(rows, np.concatenate(counties))]
+        if query.room_types:
+            rows = rows[np.isin(rows, self._union(self.by_room_type, query.room_types))]
+        if query.hotel_names:
+            rows = rows[np.isin(rows, self._union(self.by_hotel, query.hotel_names))]
+        for amenity in query.amenities:
+            rows = rows[np.isin(rows, self.by_amenity.get(amenity, np.zeros(0, dtype=np.int64)))]
+        return rows
+
+    def search(self, question: str, top_k: int = 20, page: int = 1) -> dict:
+        """Pre-filter the catalog for ``question`` and return one page of matches"""
+        query = self.parse(question)
+        rows = self.filter(query)
+        relaxed = False
+        if not len(rows) and (query.amenities or query.room_types or query.min_price or query.max_price):
+            # Keep the place and hotel the guest named, drop the finer filters
+            rows = self.filter(HotelQuery(
+                locations=query.locations, counties=query.counties, hotel_names=query.hotel_names,
+            ))
+            relaxed = True
+
+        rows = self.text_index.rank(question, rows)
+
+        total = len(rows)
+        pages = max(1, -(-total // top_k))
+        page = min(max(1, page), pages)
+        selected = rows[(page - 1) * top_k:page * top_k]
+        return {
+            "filters": asdict(query),
+            "relaxed": relaxed,
+            "total_matches": total,
+            "page": page,
+            "pages": pages,
+            # What a county or state covers, so the answer can name its cities
+            "places": {
+                self.locations.display.get(name, name): rollup
+                for name in query.locations + query.counties
+                if (rollup := self.locations.rollup(name))
+            },
+            "hotels": [self.records[i] for i in selected],
+        }
@@ -0,0 +1,176 @@
+import json
+import os
+import shutil
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from config.logging import setup_logger
+from config.tracing import traced
+
+try:
+    import xxhash
+
+    def _hasher():
+        return xxhash.xxh64()
+except ImportError:
+    import hashlib
+
+    def _hasher():
+        return hashlib.blake2b(digest_size=8)
+
+logger = setup_logger("snapshot")
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "./data/.snapshots")
+FORMAT_VERSION = 1
+
+
+def file_hash(path: str) -> str:
+    digest = _hasher()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _pointer_path(source: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{os.path.basename(source)}.json")
+
+
+def _read_pointer(source: str) -> dict | None:
+    try:
+        with open(_pointer_path(source), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if meta.get("format") != FORMAT_VERSION or not os.path.isdir(meta.get("dir", "")):
+        return None
+    return meta
+
+
+def _write_pointer(source: str, meta: dict):
+    tmp_path = f"{_pointer_path(source)}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, _pointer_path(source))
+
+
+def _column_to_array(series: pd.Series) -> tuple[str, np.ndarray, np.ndarray | None]:
+    """Turn a column into a fixed-width array that ``np.load`` can memory-map"""
+    if pd.api.types.is_bool_dtype(series) and not series.isna().any():
+        return "bool", series.to_numpy(dtype=bool), None
+    if pd.api.types.is_numeric_dtype(series):
+        return "num", series.to_numpy(), None
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime", series.to_numpy(dtype="datetime64[ns]"), None
+    mask = series.isna().to_numpy()
+    values = series.astype(object).where(~mask, "").map(str).to_numpy(dtype=str)
+    return "str", values, mask if mask.any() else None
+
+
+def build(source: str, frame: pd.DataFrame | None = None) -> dict:
+    """Write a columnar snapshot of ``source`` and point the cache at it"""
+    started = time.perf_counter()
+    stat = os.stat(source)
+    digest = file_hash(source)
+    if frame is None:
+        frame = pd.read_excel(source)
+
+    target = os.path.join(SNAPSHOT_DIR, f"{os.path.basename(source)}-{digest}")
+    columns = []
+    if not os.path.isdir(target):
+        tmp_dir = f"{target}.{os.getpid()}.tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        for i, name in enumerate(frame.columns):
+            kind, values, mask = _column_to_array(frame[name])
+            np.save(os.path.join(tmp_dir, f"{i}.npy"), values, allow_pickle=False)
+            if mask is not None:
+                np.save(os.path.join(tmp_dir, f"{i}.mask.npy"), mask, allow_pickle=False)
+            columns.append({"name": str(name), "kind": kind, "masked": mask is not None})
+        with open(os.path.join(tmp_dir, "columns.json"), "w", encoding="utf-8") as f:
+            json.dump({"rows": len(frame), "columns": columns}, f)
+        try:
+            os.rename(tmp_dir, target)
+        except OSError:
+            # Another worker published the same snapshot first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "source": os.path.abspath(source),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "hash": digest,
+        "dir": target,
+    }
+    _write_pointer(source, meta)
+    _prune(source, keep=target)
+    logger.info("Built snapshot of %s in %.2fs", source, time.perf_counter() - started)
+    return meta
+
+
+def _prune(source: str, keep: str):
+    prefix = f"{os.path.basename(source)}-"
+    for entry in os.listdir(SNAPSHOT_DIR):
+        path = os.path.join(SNAPSHOT_DIR, entry)
+        if entry.startswith(prefix) and path != keep and not entry.endswith(".tmp"):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def current(source: str) -> dict:
+    """Snapshot metadata for ``source``, rebuilding it if the workbook changed"""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    stat = os.stat(source)
+    meta = _read_pointer(source)
+    if meta and (meta["mtime_ns"], meta["size"]) == (stat.st_mtime_ns, stat.st_size):
+        return meta
+    if meta and meta["size"] == stat.st_size and file_hash(source) == meta["hash"]:
+        # Touched but not changed (e.g. copied or checked out again)
+        meta["mtime_ns"] = stat.st_mtime_ns
+        _write_pointer(source, meta)
+        return meta
+    return build(source)
+
+
+@traced("load_frame")
+def load_frame(source: str) -> pd.DataFrame:
+    """Load an Excel workbook through its snapshot, memory-mapping every column"""
+    try:
+        meta = current(source)
+    except OSError as e:
+        # A read-only data directory still has to serve requests
+        logger.warning("Snapshot cache unavailable for %s (%s); reading Excel directly", source, e)
+        return pd.read_excel(source)
+
+    with open(os.path.join(meta["dir"], "columns.json"), "r", encoding="utf-8") as f:
+        layout = json.load(f)
+    data = {}
+    for i, column in enumerate(layout["columns"]):
+        values = np.load(os.path.join(meta["dir"], f"{i}.npy"), mmap_mode="r", allow_pickle=False)
+        if column["kind"] == "str":
+            values = values.astype(object)
+            if column["masked"]:
+                mask = np.load(os.path.join(meta["dir"], f"{i}.mask.npy"), mmap_mode="r")
+                values[mask] = None
+        data[column["name"]] = values
+    return pd.DataFrame(data, index=pd.RangeIndex(layout["rows"]))
+
+
+def artifact_path(source: str, name: str) -> str:
+    """Path for a derived artifact stored next to the current snapshot of ``source``"""
+    return os.path.join(current(source)["dir"], name)
+
+
+def dataset_version(source: str) -> str:
+    """Content hash of ``source``, taken from its snapshot pointer when one is current"""
+    try:
+        return current(source)["hash"]
+    except OSError:
+        return file_hash(source)
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or ["./data/hotels.xlsx", "./data/empty_rooms_5000.xlsx", "./data/hotel_bookings.xlsx"]:
+        meta = current(path)
+        print(f"{path} -> {meta['dir']}")
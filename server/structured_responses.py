@@ -0,0 +1,243 @@
+import re
+import json
+import numpy as np
+
+from server.inventory import InventoryIndex, normalize, to_day
+from server.search_filter import HotelCatalog
+
+_DATE = re.compile(r"\b(\d{4}-\d{1,2}-\d{1,2})\b")
+_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+_WEEKDAY = re.compile(r"\b(mon|tue|wed|thu|fri|sat|sun)[a-z]*\b|\b(weekends?)\b", re.IGNORECASE)
+# Longest check-in window one batch availability call may cover
+BATCH_MAX_DAYS = 92
+
+# How the availability and booking tools answer:
+#   llm        - the LLM phrases every answer (slowest)
+#   structured - computed JSON only
+#   template   - computed JSON plus a templated sentence
+#   background - like template, with the LLM phrasing saved to memory afterwards
+RESPONSE_MODES = ("llm", "structured", "template", "background")
+
+
+def stay_nights(check_in, check_out) -> int:
+    return int((to_day(check_out) - to_day(check_in)) // np.timedelta64(1, "D"))
+
+
+def room_prices(catalog: HotelCatalog, hotel_name: str) -> dict[str, float]:
+    """Listed nightly price per room type of one hotel"""
+    rows = catalog.by_hotel.get(normalize(hotel_name), [])
+    return {normalize(catalog.records[i]["Room_Type"]): float(catalog.records[i]["Price"]) for i in rows}
+
+
+def requested_stay(question: str) -> tuple[str, str] | None:
+    """``(check_in, check_out)`` from the dates in a question; one date means one night"""
+    dates = []
+    for value in _DATE.findall(question or ""):
+        try:
+            dates.append(to_day(value))
+        except ValueError:
+            continue
+    if not dates:
+        return None
+    check_in = min(dates)
+    check_out = max(dates) if len(dates) > 1 and max(dates) > check_in else check_in + 1
+    return str(check_in), str(check_out)
+
+
+def availability_key(catalog: HotelCatalog, hotel_name: str, question: str = "") -> str:
+    """Response cache key for an availability question: the hotel, stay and room types it asks about"""
+    stay = requested_stay(question)
+    return json.dumps({
+        "hotel": normalize(hotel_name),
+        "stay": list(stay) if stay else None,
+        "room_types": sorted(catalog.parse(question).room_types) if question else [],
+    }, sort_keys=True)
+
+
+def availability_report(inventory: InventoryIndex, catalog: HotelCatalog, hotel_name: str, question: str = "") -> dict:
+    """Computed availability for one hotel.
+
+    With dates in the question every room type (or the ones asked about) gets
+    free rooms per night, the bookable count and the stay price; without
+    dates each room type lists its free windows.
+    """
+    prices = room_prices(catalog, hotel_name)
+    asked = catalog.parse(question).room_types if question else []
+    stay = requested_stay(question)
+    report = {"hotel_name": hotel_name}
+
+    if stay is None:
+        summary = inventory.availability_summary(hotel_name)
+        report["room_types"] = [
+            {"room_type": room_type, "price_per_night": prices.get(normalize(room_type)), "windows": windows}
+            for room_type, windows in summary.items()
+            if not asked or normalize(room_type) in asked
+        ]
+        return report
+
+    check_in, check_out = stay
+    nights = stay_nights(check_in, check_out)
+    report.update({"check_in": check_in, "check_out": check_out, "nights": nights})
+    rooms = []
+    for room_type in inventory.room_types(hotel_name):
+        if asked and normalize(room_type) not in asked:
+            continue
+        nightly = inventory.nightly(hotel_name, room_type, check_in, check_out)
+        price = prices.get(normalize(room_type))
+        bookable = int(nightly.min()) if len(nightly) else 0
+        rooms.append({
+            "room_type": room_type,
+            "available": bookable > 0,
+            "rooms": bookable,
+            "price_per_night": price,
+            "total_price": price * nights if price is not None else None,
+            "sold_out_on": None if bookable > 0 else inventory.first_sold_out(hotel_name, room_type, check_in, check_out),
+            "per_night": [{"date": str(to_day(check_in) + i), "rooms": int(n)} for i, n in enumerate(nightly)],
+        })
+    report["room_types"] = rooms
+    return report
+
+
+def requested_weekdays(question: str) -> list[str]:
+    """Check-in weekdays named in a question; "weekend" means Friday or Saturday"""
+    days = []
+    for day, weekend in _WEEKDAY.findall(question or ""):
+        for name in (("fri", "sat") if weekend else (day.lower(),)):
+            if name not in days:
+                days.append(name)
+    return days
+
+
+def batch_availability_report(inventory: InventoryIndex, catalog: HotelCatalog, hotel_names: list[str],
+                              room_types: list[str], start_date, end_date, nights: int = 1,
+                              weekdays: list[str] | None = None) -> dict:
+    """Availability matrix for several hotels and room types over a window of check-in dates.
+
+    Every (hotel, room type) row holds the rooms bookable for a ``nights``
+    stay from each check-in date in ``check_in_dates``, computed in one
+    vectorized pass over the inventory. ``weekdays`` keeps only check-ins on
+    those days (e.g. ``["fri", "sat"]``).
+    """
+    nights = max(int(nights), 1)
+    first, last = to_day(start_date), to_day(end_date)
+    if last < first:
+        return {"error": f"end_date {last} is before start_date {first}"}
+    if int((last - first).astype(int)) >= BATCH_MAX_DAYS:
+        return {"error": f"Check at most {BATCH_MAX_DAYS} days of check-in dates at once"}
+    wanted = {str(day).strip().lower()[:3] for day in weekdays or []}
+    unknown_days = wanted - set(_WEEKDAYS)
+    if unknown_days:
+        return {"error": f"Unknown weekdays: {', '.join(sorted(unknown_days))}"}
+
+    hotels = [name for name in dict.fromkeys(str(n).strip() for n in hotel_names) if name]
+    asked = {normalize(room_type) for room_type in room_types or [] if str(room_type).strip()}
+    known = [hotel for hotel in hotels if inventory.has_hotel(hotel)]
+    pairs = [
+        (hotel, room_type)
+        for hotel in known
+        for room_type in inventory.room_types(hotel)
+        if not asked or normalize(room_type) in asked
+    ]
+
+    matrix = inventory.stay_matrix(pairs, first, last, nights)
+    dates = first + np.arange(matrix.shape[1])
+    if wanted:
+        # 1970-01-01 was a Thursday
+        keep = np.isin((dates.astype(np.int64) + 3) % 7, [_WEEKDAYS.index(day) for day in wanted])
+        dates, matrix = dates[keep], matrix[:, keep]
+
+    report = {
+        "start_date": str(first), "end_date": str(last), "nights": nights,
+        "weekdays": [day for day in _WEEKDAYS if day in wanted],
+        "check_in_dates": [str(day) for day in dates],
+        "hotels": [],
+    }
+    prices = {hotel: room_prices(catalog, hotel) for hotel in known}
+    by_hotel = {}
+    for (hotel, room_type), rooms in zip(pairs, matrix):
+        price = prices[hotel].get(normalize(room_type))
+        free = np.flatnonzero(rooms > 0)
+        by_hotel.setdefault(hotel, []).append({
+            "room_type": room_type,
+            "price_per_night": price,
+            "total_price": price * nights if price is not None else None,
+            "available_dates": len(free),
+            "first_available": str(dates[free[0]]) if len(free) else None,
+            "rooms": rooms.tolist(),
+        })
+    report["hotels"] = [{"hotel_name": hotel, "room_types": by_hotel.get(hotel, [])} for hotel in known]
+    if len(known) < len(hotels):
+        report["unknown_hotels"] = [hotel for hotel in hotels if hotel not in known]
+    return report
+
+
+def format_money(value) -> str:
+    """Whole-dollar price for templated messages"""
+    return "price n/a" if value is None else f"${value:,.0f}"
+
+
+def availability_message(report: dict) -> str:
+    hotel = report["hotel_name"]
+    rooms = report["room_types"]
+    if not rooms:
+        return f"{hotel} has no rooms of that type listed."
+    if "check_in" not in report:
+        parts = []
+        for room in rooms:
+            if room["windows"]:
+                first = room["windows"][0]
+                more = f" (+{len(room['windows']) - 1} more windows)" if len(room["windows"]) > 1 else ""
+                parts.append(f"{room['room_type']} ({format_money(room['price_per_night'])}/night) free {first['from']} to {first['to']}{more}")
+            else:
+                parts.append(f"{room['room_type']} is fully booked")
+        return f"{hotel}: " + "; ".join(parts) + ". Share your dates to check a specific stay."
+    stay = f"{report['check_in']} to {report['check_out']} ({report['nights']} night{'s' if report['nights'] != 1 else ''})"
+    parts = [
+        f"{room['room_type']} available ({room['rooms']} left, {format_money(room['total_price'])} total)"
+        if room["available"] else f"{room['room_type']} sold out on {room['sold_out_on']}"
+        for room in rooms
+    ]
+    return f"{hotel}, {stay}: " + "; ".join(parts) + "."
+
+
+def batch_availability_message(report: dict) -> str:
+    days = len(report["check_in_dates"])
+    stay = f"{report['nights']}-night stays"
+    window = f"{report['start_date']} to {report['end_date']}"
+    if report["weekdays"]:
+        window += f" ({', '.join(day.title() for day in report['weekdays'])} check-ins)"
+    lines = []
+    for hotel in report["hotels"]:
+        parts = []
+        for room in hotel["room_types"]:
+            if room["available_dates"]:
+                parts.append(
+                    f"{room['room_type']} free on {room['available_dates']} of {days} dates, "
+                    f"first {room['first_available']} ({format_money(room['total_price'])} total)"
+                )
+            else:
+                parts.append(f"{room['room_type']} fully booked")
+        lines.append(f"{hotel['hotel_name']}: " + ("; ".join(parts) if parts else "no rooms of that type listed"))
+    if report.get("unknown_hotels"):
+        lines.append(f"Not found: {', '.join(report['unknown_hotels'])}")
+    return f"{stay}, check-in {window}. " + ". ".join(lines) + "."
+
+
+def booking_summary(booking: dict, catalog: HotelCatalog) -> dict:
+    """Booking details plus the nightly and total price of the stay"""
+    nights = stay_nights(booking["check_in"], booking["check_out"])
+    price = room_prices(catalog, booking["hotel_name"]).get(normalize(booking["room_type"]))
+    return {
+        **booking,
+        "nights": nights,
+        "price_per_night": price,
+        "total_price": price * nights if price is not None else None,
+    }
+
+
+def booking_message(summary: dict) -> str:
+    return (
+        f"Booking {summary['booking_id']} confirmed for {summary['guest_name']}: {summary['room_type']} room at "
+        f"{summary['hotel_name']}, {summary['check_in']} to {summary['check_out']} "
+        f"({summary['nights']} night{'s' if summary['nights'] != 1 else ''}, {format_money(summary['total_price'])} total)."
+    )
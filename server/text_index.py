@@ -0,0 +1,123 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from config.logging import setup_logger
+from server.snapshot import artifact_path
+
+logger = setup_logger("text-index")
+
+INDEX_FILE = "text_index.v1.npz"
+BM25_K1 = 1.2
+BM25_B = 0.75
+MIN_PREFIX = 3
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "any", "are", "at", "by", "for", "from", "has", "have", "i", "in", "is", "it", "me",
+    "my", "near", "of", "on", "or", "show", "that", "the", "to", "want", "with", "find", "need", "some",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN.findall(str(text).lower()) if t not in STOPWORDS]
+
+
+class TextIndex:
+    """BM25 index over the free text of each catalog row (Amenities and Details).
+
+    Postings are stored CSR-style: ``vocab`` is sorted, so the terms
+    starting with a prefix form one contiguous range found by binary search.
+    Term ``i`` owns ``docs[offsets[i]:offsets[i + 1]]`` (row ids, ascending)
+    and the matching ``tfs``. Scoring a query touches only the postings of its
+    terms.
+    """
+
+    def __init__(self, vocab: np.ndarray, offsets: np.ndarray, docs: np.ndarray, tfs: np.ndarray,
+                 doc_len: np.ndarray):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.n_docs = len(doc_len)
+        self.avg_len = float(doc_len.mean()) if self.n_docs else 0.0
+        df = np.diff(offsets)
+        self.idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+        self._norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / max(self.avg_len, 1e-9))
+
+    @classmethod
+    def build(cls, frame: pd.DataFrame, columns: tuple[str, ...] = ("Amenities", "Details")) -> "TextIndex":
+        text = frame[list(columns)].fillna("").astype(str).agg(" ".join, axis=1)
+        counts: dict[str, dict[int, int]] = {}
+        doc_len = np.zeros(len(frame), dtype=np.uint16)
+        for row, value in enumerate(text):
+            tokens = tokenize(value)
+            doc_len[row] = len(tokens)
+            for token in tokens:
+                postings = counts.setdefault(token, {})
+                postings[row] = postings.get(row, 0) + 1
+        vocab = sorted(counts)
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(counts[t]) for t in vocab])
+        docs = np.fromiter((row for t in vocab for row in counts[t]), dtype=np.uint32, count=int(offsets[-1]))
+        tfs = np.fromiter((tf for t in vocab for tf in counts[t].values()), dtype=np.uint16, count=int(offsets[-1]))
+        return cls(np.array(vocab, dtype=str), offsets, docs, tfs, doc_len)
+
+    @classmethod
+    def load_or_build(cls, source: str, frame: pd.DataFrame) -> "TextIndex":
+        """Load the index persisted with the current snapshot of ``source``, building it if missing"""
+        try:
+            path = artifact_path(source, INDEX_FILE)
+        except OSError as e:
+            logger.warning("Snapshot cache unavailable for %s (%s); building the text index in memory", source, e)
+            return cls.build(frame)
+        if os.path.exists(path):
+            with np.load(path, allow_pickle=False) as saved:
+                return cls(saved["vocab"], saved["offsets"], saved["docs"], saved["tfs"], saved["doc_len"])
+        index = cls.build(frame)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, vocab=index.vocab, offsets=index.offsets, docs=index.docs, tfs=index.tfs, doc_len=index.doc_len)
+        os.replace(tmp_path, path)
+        logger.info("Built text index for %s: %d terms, %d postings", source, len(index.vocab), len(index.docs))
+        return index
+
+    def terms(self, token: str) -> range:
+        """Vocabulary ids for ``token``: the exact term, or every term it is a prefix of"""
+        lo = int(np.searchsorted(self.vocab, token, "left"))
+        if lo < len(self.vocab) and self.vocab[lo] == token:
+            return range(lo, lo + 1)
+        if len(token) < MIN_PREFIX:
+            return range(0)
+        # Every term starting with ``token`` sorts before token + U+10FFFF
+        hi = int(np.searchsorted(self.vocab, token + "\U0010ffff", "left"))
+        return range(lo, hi)
+
+    def postings(self, token: str) -> np.ndarray:
+        """Row ids containing ``token`` (or a term it prefixes)"""
+        ids = self.terms(token)
+        if len(ids) == 1:
+            return self.docs[self.offsets[ids[0]]:self.offsets[ids[0] + 1]]
+        if not len(ids):
+            return np.zeros(0, dtype=np.uint32)
+        return np.unique(self.docs[self.offsets[ids.start]:self.offsets[ids.stop]])
+
+    def scores(self, text: str) -> np.ndarray:
+        """BM25 score of every row for the query ``text``"""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for token in set(tokenize(text)):
+            for term in self.terms(token):
+                lo, hi = self.offsets[term], self.offsets[term + 1]
+                docs, tf = self.docs[lo:hi], self.tfs[lo:hi].astype(np.float32)
+                scores[docs] += self.idf[term] * tf * (BM25_K1 + 1) / (tf + self._norm[docs])
+        return scores
+
+    def rank(self, text: str, rows: np.ndarray) -> np.ndarray:
+        """``rows`` ordered by BM25 score for ``text``; ties keep their given order"""
+        if not len(rows):
+            return rows
+        scores = self.scores(text)[rows]
+        if not scores.any():
+            return rows
+        return rows[np.argsort(-scores, kind="stable")]
@@ -0,0 +1,125 @@
+import asyncio
+import datetime
+import os
+import random
+from dataclasses import dataclass, field
+
+from server.inventory import InventoryIndex
+from server.booking_journal import BookingJournal
+from server.booking_index import BookingIndex
+from config.concurrency import run_blocking
+
+PAYMENT_STATUSES = ("Paid", "Pending", "Cancelled")
+MAX_ATTEMPTS = int(os.getenv("BOOKING_MAX_ATTEMPTS", "5"))
+BACKOFF_BASE_SEC = float(os.getenv("BOOKING_BACKOFF_MS", "2")) / 1000
+
+
+@dataclass
+class BookingResult:
+    ok: bool
+    booking: dict | None = None
+    seq: int | None = None
+    attempts: int = 0
+    sold_out_on: str | None = None
+    reason: str | None = None
+    deltas: list[dict] = field(default_factory=list)
+
+
+class BookingTransactions:
+    """Overbooking-safe booking commits on top of the inventory index and journal.
+
+    A booking reads the series version and availability without any lock,
+    then commits inside ``journal.transaction()`` (which first applies other
+    workers' bookings) with a compare-and-swap on that version. If anything
+    touched the series in between, the attempt is retried with jittered
+    exponential backoff, up to ``max_attempts`` times.
+
+    Status updates are journaled the same way: one record carrying the new
+    status and, for a cancelled live booking, the rooms it gives back.
+    """
+
+    def __init__(self, inventory: InventoryIndex, journal: BookingJournal, bookings: BookingIndex | None = None,
+                 max_attempts: int = MAX_ATTEMPTS, backoff: float = BACKOFF_BASE_SEC):
+        self.inventory = inventory
+        self.journal = journal
+        self.bookings = bookings
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.conflicts = 0
+
+    def try_reserve(self, booking: dict, rooms: int = 1, expected_version: int | None = None):
+        """One commit attempt; returns (result, future) where future resolves once durable"""
+        hotel, room_type = booking["hotel_name"], booking["room_type"]
+        check_in, check_out = booking["check_in"], booking["check_out"]
+        delta = {"hotel_name": hotel, "room_type": room_type,
+                 "check_in": check_in, "check_out": check_out, "rooms": -rooms}
+        with self.journal.transaction():
+            if self.inventory.min_available(hotel, room_type, check_in, check_out) < rooms:
+                sold_out_on = self.inventory.first_sold_out(hotel, room_type, check_in, check_out)
+                return BookingResult(False, sold_out_on=sold_out_on, reason="sold_out"), None
+            if not self.inventory.reserve(hotel, room_type, check_in, check_out, rooms, expected_version):
+                self.conflicts += 1
+                return BookingResult(False, reason="conflict"), None
+            try:
+                booking = {"booking_id": booking.get("booking_id") or self.journal.next_booking_id(), **booking}
+                future = self.journal.append_locked(booking=booking, deltas=[delta])
+            except Exception:
+                self.inventory.release(hotel, room_type, check_in, check_out, rooms)
+                raise
+        return BookingResult(True, booking=booking, seq=future.seq, deltas=[delta]), future
+
+    async def book(self, booking: dict, rooms: int = 1) -> BookingResult:
+        """Reserve and durably journal ``booking``, retrying on write conflicts"""
+        hotel, room_type = booking["hotel_name"], booking["room_type"]
+        for attempt in range(1, self.max_attempts + 1):
+            expected = self.inventory.version_of(hotel, room_type)
+            # The journal transaction may wait on another worker's file lock
+            result, future = await run_blocking(self.try_reserve, booking, rooms, expected)
+            result.attempts = attempt
+            if result.ok:
+                await asyncio.wrap_future(future)
+                return result
+            if result.reason != "conflict":
+                return result
+            await asyncio.sleep(self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+        return BookingResult(False, attempts=self.max_attempts, reason="contention")
+
+    def try_update_status(self, booking_id: str, payment_status: str):
+        """Journal a payment status change; returns (result, future) where future resolves once durable"""
+        status = payment_status.strip().title()
+        if status not in PAYMENT_STATUSES:
+            return BookingResult(False, reason="invalid_status"), None
+        with self.journal.transaction():
+            current = self.bookings.get(booking_id)
+            if current is None:
+                return BookingResult(False, reason="not_found"), None
+            if str(current.get("payment_status")).title() == "Cancelled":
+                return BookingResult(False, booking=current, reason="already_cancelled"), None
+            update = {
+                "booking_id": current["booking_id"],
+                "payment_status": status,
+                "updated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            deltas = []
+            # Only journaled bookings hold inventory; the history workbook never did
+            if status == "Cancelled" and current.get("status") == "confirmed":
+                update["status"] = "cancelled"
+                deltas.append({"hotel_name": current["hotel_name"], "room_type": current["room_type"],
+                               "check_in": current["check_in"], "check_out": current["check_out"], "rooms": 1})
+                self.inventory.release(current["hotel_name"], current["room_type"],
+                                       current["check_in"], current["check_out"], 1)
+            try:
+                future = self.journal.append_locked(deltas=deltas, status_update=update)
+            except Exception:
+                for delta in deltas:
+                    self.inventory.adjust(delta["hotel_name"], delta["room_type"], delta["check_in"],
+                                          delta["check_out"], -delta["rooms"])
+                raise
+        return BookingResult(True, booking={**current, **update}, seq=future.seq, deltas=deltas), future
+
+    async def update_status(self, booking_id: str, payment_status: str) -> BookingResult:
+        """Durably change a booking's payment status; cancelling a live booking frees its rooms"""
+        result, future = await run_blocking(self.try_update_status, booking_id, payment_status)
+        if result.ok:
+            await asyncio.wrap_future(future)
+        return result
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from mcp.client.stdio import stdio_client
+from mcp import ClientSession
+from langchain_mcp_adapters.tools import load_mcp_tools
+
+from config.tracing import METRICS_URI, span
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+POOL_MAX_WAITERS = int(os.getenv("MCP_POOL_MAX_WAITERS", "32"))
+CHECKOUT_TIMEOUT_SEC = float(os.getenv("MCP_POOL_CHECKOUT_TIMEOUT", "30"))
+HEALTH_CHECK_INTERVAL_SEC = float(os.getenv("MCP_POOL_HEALTH_INTERVAL", "15"))
+HEALTH_CHECK_TIMEOUT_SEC = 5
+STARTUP_TIMEOUT_SEC = 60
+
+
+class PoolBusyError(RuntimeError):
+    """Raised when the wait queue is full or no worker frees up in time"""
+
+
+class TracedClientSession(ClientSession):
+    """Client session that times each tool call and hands its trace context to the server"""
+
+    async def call_tool(self, name, arguments=None, read_timeout_seconds=None, progress_callback=None, *, meta=None):
+        with span(f"mcp.{name}") as current:
+            return await super().call_tool(name, arguments, read_timeout_seconds, progress_callback,
+                                           meta={**(meta or {}), "traceparent": current.traceparent})
+
+
+class MCPWorker:
+    """One warm ``server.data_server`` process with its session, tools and agent.
+
+    The stdio transport is owned by a background task so its cancel scopes are
+    entered and exited from the same task.
+    """
+
+    def __init__(self, worker_id: int, server_params, agent_factory):
+        self.worker_id = worker_id
+        self.server_params = server_params
+        self.agent_factory = agent_factory
+        self.session: ClientSession | None = None
+        self.tools = []
+        self.agent = None
+        self.turns_served = 0
+        self.restarts = 0
+        self.last_healthy = 0.0
+        self._ready = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._runner: asyncio.Task | None = None
+        self._error: BaseException | None = None
+
+    @property
+    def alive(self) -> bool:
+        return (
+            self._runner is not None
+            and not self._runner.done()
+            and self._ready.is_set()
+            and self._error is None
+        )
+
+    async def start(self):
+        self._ready.clear()
+        self._stopping.clear()
+        self._error = None
+        self._runner = asyncio.create_task(self._run(), name=f"mcp-worker-{self.worker_id}")
+        await asyncio.wait_for(self._ready.wait(), timeout=STARTUP_TIMEOUT_SEC)
+        if self._error is not None:
+            raise RuntimeError(f"MCP worker {self.worker_id} failed to start: {self._error}") from self._error
+        self.last_healthy = time.monotonic()
+
+    async def stop(self):
+        if self._runner is None:
+            return
+        self._stopping.set()
+        try:
+            await asyncio.wait_for(self._runner, timeout=HEALTH_CHECK_TIMEOUT_SEC)
+        except Exception:
+            self._runner.cancel()
+        finally:
+            self._runner = None
+            self.session = None
+            self.agent = None
+
+    async def restart(self):
+        logger.warning(f"Restarting MCP worker {self.worker_id}")
+        self.restarts += 1
+        await self.stop()
+        await self.start()
+
+    async def health_check(self) -> bool:
+        if not self.alive:
+            return False
+        if time.monotonic() - self.last_healthy < HEALTH_CHECK_INTERVAL_SEC:
+            return True
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=HEALTH_CHECK_TIMEOUT_SEC)
+        except Exception as e:
+            logger.error(f"MCP worker {self.worker_id} failed health check: {e}")
+            return False
+        self.last_healthy = time.monotonic()
+        return True
+
+    async def _run(self):
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                async with TracedClientSession(read, write) as session:
+                    # The server answers initialize only once its workbooks and indexes are loaded
+                    with span("mcp.initialize", worker=self.worker_id):
+                        await session.initialize()
+                    self.session = session
+                    with span("mcp.load_tools", worker=self.worker_id):
+                        self.tools = await load_mcp_tools(session)
+                    self.agent = self.agent_factory(self.tools)
+                    self._ready.set()
+                    await self._stopping.wait()
+        except Exception as e:
+            logger.error(f"MCP worker {self.worker_id} session error: {e}")
+            self._error = e
+        finally:
+            self._ready.set()
+
+
+class MCPSessionPool:
+    """Keeps ``size`` warm MCP workers and hands them out one turn at a time.
+
+    Idle workers are kept in FIFO order so turns rotate across processes, waiters
+    beyond ``max_waiters`` are rejected instead of queueing unboundedly, and a
+    worker that fails its health check is restarted before it is handed out.
+    """
+
+    def __init__(
+        self,
+        server_params,
+        agent_factory,
+        size: int = POOL_SIZE,
+        max_waiters: int = POOL_MAX_WAITERS,
+        checkout_timeout: float = CHECKOUT_TIMEOUT_SEC,
+    ):
+        self.size = max(1, size)
+        self.max_waiters = max_waiters
+        self.checkout_timeout = checkout_timeout
+        self.workers = [MCPWorker(i, server_params, agent_factory) for i in range(self.size)]
+        self._idle: deque[MCPWorker] = deque()
+        self._available = asyncio.Condition()
+        self._waiters = 0
+        self._started = False
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    @property
+    def tools(self):
+        return self.workers[0].tools
+
+    async def start(self):
+        if self._started:
+            return
+        results = await asyncio.gather(*(w.start() for w in self.workers), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, BaseException)]
+        if len(failed) == len(self.workers):
+            raise failed[0]
+        for worker, result in zip(self.workers, results):
+            if isinstance(result, BaseException):
+                logger.error(f"MCP worker {worker.worker_id} unavailable at startup: {result}")
+        self._idle.extend(self.workers)
+        self._started = True
+        logger.info(f"MCP session pool started with {self.size - len(failed)}/{self.size} workers")
+
+    async def stop(self):
+        self._started = False
+        self._idle.clear()
+        await asyncio.gather(*(w.stop() for w in self.workers), return_exceptions=True)
+
+    async def _acquire(self) -> MCPWorker:
+        async with self._available:
+            if not self._idle:
+                if self._waiters >= self.max_waiters:
+                    raise PoolBusyError("All assistants are busy. Please try again shortly.")
+                self._waiters += 1
+                try:
+                    await asyncio.wait_for(
+                        self._available.wait_for(lambda: bool(self._idle)),
+                        timeout=self.checkout_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    raise PoolBusyError("Timed out waiting for a free assistant.")
+                finally:
+                    self._waiters -= 1
+            return self._idle.popleft()
+
+    async def _release(self, worker: MCPWorker):
+        async with self._available:
+            self._idle.append(worker)
+            self._available.notify()
+
+    @asynccontextmanager
+    async def checkout(self):
+        """Borrow a healthy worker for the duration of one turn"""
+        if not self._started:
+            await self.start()
+        with span("pool.checkout"):
+            worker = await self._acquire()
+        try:
+            if not await worker.health_check():
+                await worker.restart()
+            yield worker
+            worker.turns_served += 1
+        finally:
+            await self._release(worker)
+
+    async def metrics_snapshots(self) -> list[tuple[dict, dict]]:
+        """Metrics of every live worker process, labelled by worker id"""
+        snapshots = []
+        for worker in self.workers:
+            if not worker.alive:
+                continue
+            try:
+                result = await asyncio.wait_for(worker.session.read_resource(METRICS_URI), HEALTH_CHECK_TIMEOUT_SEC)
+                snapshots.append(({"process": f"mcp-{worker.worker_id}"}, json.loads(result.contents[0].text)))
+            except Exception as e:
+                logger.warning(f"No metrics from MCP worker {worker.worker_id}: {e}")
+        return snapshots
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "waiters": self._waiters,
+            "workers": [
+                {
+                    "id": w.worker_id,
+                    "alive": w.alive,
+                    "turns_served": w.turns_served,
+                    "restarts": w.restarts,
+                }
+                for w in self.workers
+            ],
+        }
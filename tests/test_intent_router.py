@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from intent_router import IntentRouter
+from server.search_filter import HotelCatalog
+
+
+@pytest.fixture(scope="module")
+def router():
+    frame = pd.DataFrame([
+        {
+            "ID": i, "Hotel_ID": hotel_id, "Hotel_Name": f"Hotel_{hotel_id}", "Details": "Quiet rooms",
+            "State": "Illinois", "County": "Cook", "City": "Chicago", "Address": f"{hotel_id} Main St",
+            "Contact_Info": "555-0100", "Room_Type": room_type, "Price": 100 + i, "Amenities": "WiFi, Pool",
+        }
+        for i, (hotel_id, room_type) in enumerate(
+            (hotel_id, room_type) for hotel_id in (1, 2) for room_type in ("Single", "Double")
+        )
+    ])
+    return IntentRouter(HotelCatalog(frame))
+
+
+def test_booking_with_every_detail_is_routed(router):
+    route = router.route("Book Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe")
+    assert route is not None
+    assert route.tool == "create_booking"
+    assert route.arguments == {
+        "booking_request": "Book Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe",
+        "hotel_name": "Hotel_1",
+        "room_type": "Single",
+        "check_in": "2025-09-20",
+        "check_out": "2025-09-23",
+        "guest_name": "John Doe",
+    }
+
+
+@pytest.mark.parametrize("message", [
+    "Don't book Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe",
+    "Dont book Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe",
+    "Don’t book Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe",
+    "Do not book Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe",
+    "Never mind, don't reserve Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe",
+    "Cancel the booking at Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe",
+    "Should I book Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe",
+    "Book Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe if it has a pool",
+    "Can you book Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe?",
+    "Book Hotel_1 Single 2025-09-20 to 2025-09-23 for John Doe ?  ",
+])
+def test_negated_conditional_or_question_bookings_go_to_the_agent(router, message):
+    assert router.route(message) is None
+
+
+def test_booking_with_missing_details_goes_to_the_agent(router):
+    assert router.route("Book Hotel_1 Single for John Doe") is None
+
+
+def test_availability_question_is_still_routed(router):
+    route = router.route("Is Hotel_2 available on 2025-09-20?")
+    assert route is not None
+    assert route.tool == "hotel_availability"
+    assert route.arguments["hotel_name"] == "Hotel_2"
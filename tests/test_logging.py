@@ -0,0 +1,21 @@
+import logging
+
+import numpy as np
+
+from config.logging import LOG_MAX_FIELD_CHARS, DeferredQueueHandler, truncate
+
+
+def _prepared(msg, *args):
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None)
+    return DeferredQueueHandler(None).prepare(record)
+
+
+def test_numbers_and_exceptions_format_as_usual():
+    assert _prepared("%d rooms at %.2f", np.int64(5), np.float32(2.5)).getMessage() == "5 rooms at 2.50"
+    assert _prepared("%s: %s", "Booking failed", ValueError("bad date")).getMessage() == "Booking failed: bad date"
+
+
+def test_long_strings_and_containers_are_bounded():
+    assert len(truncate("x" * (LOG_MAX_FIELD_CHARS * 10))) < LOG_MAX_FIELD_CHARS + 50
+    assert truncate(list(range(1000))).endswith("...]")
+    assert truncate([1, 2]) == [1, 2]
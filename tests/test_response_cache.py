@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from server.response_cache import HashingEmbedder, ResponseCache
+from server.search_filter import HotelCatalog
+from server.structured_responses import availability_key
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return HotelCatalog(pd.DataFrame([
+        {
+            "ID": i, "Hotel_ID": 1, "Hotel_Name": "Hotel_1", "Details": "Quiet rooms", "State": "Illinois",
+            "County": "Cook", "City": "Chicago", "Address": "1 Main St", "Contact_Info": "555-0100",
+            "Room_Type": room_type, "Price": 100 + i, "Amenities": "WiFi, Pool",
+        }
+        for i, room_type in enumerate(("Single", "Double"))
+    ]))
+
+
+def test_semantic_tier_does_not_answer_a_different_stay(catalog):
+    cache = ResponseCache(embedder=HashingEmbedder(), threshold=0.85)
+    asked = "Hotel_1 available 2025-09-20 to 2025-09-23"
+    shifted = "Hotel_1 available 2025-09-21 to 2025-09-24"
+    cache.put("hotel_availability", availability_key(catalog, "Hotel_1", asked), 1, asked, "Sep 20-23")
+    assert cache.get("hotel_availability", availability_key(catalog, "Hotel_1", shifted), 1, shifted) is None
+
+
+def test_availability_key_covers_room_types(catalog):
+    single = availability_key(catalog, "Hotel_1", "Single at Hotel_1 on 2025-09-20")
+    double = availability_key(catalog, "Hotel_1", "Double at Hotel_1 on 2025-09-20")
+    assert single != double
+    assert single == availability_key(catalog, "hotel_1", "Is a Single free at Hotel_1 on 2025-09-20?")